@@ -0,0 +1,201 @@
+"""
+Startup cost of the generated code
+
+Generates models from synthetic schemas of increasing size, then imports each of them in a fresh python process and
+measures the import time, the configure_mappers() time and the peak resident memory. Results can be compared to a
+baseline to catch regressions before a release:
+
+    python benchmark.py --sizes 10,100,1000 --output baseline.json
+    python benchmark.py --sizes 10,100,1000 --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy_grt import DdlSchema, generateExport
+
+PROBE = '\n'.join([
+    'import importlib, json, sys, time',
+    'try:',
+    '    import resource',
+    'except ImportError:',
+    '    resource = None',
+    'sys.path.insert(0, sys.argv[1])',
+    'start = time.perf_counter()',
+    'import sqlalchemy.orm',
+    'sqlalchemy_time = time.perf_counter() - start',
+    'start = time.perf_counter()',
+    'importlib.import_module(sys.argv[2])',
+    'import_time = time.perf_counter() - start',
+    'start = time.perf_counter()',
+    'sqlalchemy.orm.configure_mappers()',
+    'configure_time = time.perf_counter() - start',
+    'rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0',
+    "rss = rss if sys.platform == 'darwin' else rss * 1024",
+    "print(json.dumps({'sqlalchemy': sqlalchemy_time, 'import': import_time, 'configure_mappers': configure_time,",
+    "                  'rss': rss}))",
+])
+
+METRICS = ('import', 'configure_mappers', 'rss')
+
+
+def syntheticScript(size, columns=6):
+    """Synthetic schema
+
+    Every table has typed columns, an index and foreign keys to its previous table and to its parent in a binary tree
+    of tables. Every tenth table is an association between its two neighbours.
+
+    Arguments:
+        size {int} -- The number of tables
+
+    Keyword Arguments:
+        columns {int} -- The number of typed columns per table (default: {6})
+
+    Returns:
+        generator<str> -- The lines of a SQL script
+    """
+    types = ['int(11)', 'varchar(45)', 'decimal(10,2)', 'datetime', 'tinyint(1)', 'text', 'bigint(20)', 'date']
+    for index in range(size):
+        name = 'table_%s' % index
+        yield 'CREATE TABLE `%s` (\n' % name
+        if index % 10 == 9 and index + 1 < size:
+            yield '  `id_previous` int(11) NOT NULL,\n'
+            yield '  `id_next` int(11) NOT NULL,\n'
+            yield '  PRIMARY KEY (`id_previous`,`id_next`),\n'
+            yield '  FOREIGN KEY (`id_previous`) REFERENCES `table_%s` (`id`),\n' % (index - 1)
+            yield '  FOREIGN KEY (`id_next`) REFERENCES `table_%s` (`id`)\n' % (index + 1)
+            yield ');\n'
+            continue
+
+        yield '  `id` int(11) NOT NULL AUTO_INCREMENT,\n'
+        for column in range(columns):
+            yield '  `value_%s` %s DEFAULT NULL,\n' % (column, types[(index + column) % len(types)])
+        parents = sorted(set([parent for parent in (index - 1, (index - 1) // 2) if parent >= 0 and parent % 10 != 9]))
+        for parent in parents:
+            yield '  `id_table_%s` int(11) DEFAULT NULL,\n' % parent
+            yield '  FOREIGN KEY (`id_table_%s`) REFERENCES `table_%s` (`id`),\n' % (parent, parent)
+        yield '  KEY `i_%s` (`value_0`),\n' % name
+        yield '  PRIMARY KEY (`id`)\n'
+        yield ') ENGINE=InnoDB;\n'
+
+
+def writeModels(size, directory):
+    """Generates the models of a synthetic schema
+
+    Arguments:
+        size {int} -- The number of tables
+        directory {str} -- Where to write the module
+
+    Returns:
+        str -- The name of the module
+    """
+    schema = DdlSchema('benchmark')
+    schema.read(syntheticScript(size))
+    with contextlib.redirect_stdout(io.StringIO()):
+        export = generateExport(schema.getSnapshot())
+
+    name = 'models_%s' % size
+    with open(os.path.join(directory, '%s.py' % name), 'w') as module:
+        module.write('\n'.join(export))
+    return name
+
+
+def measure(directory, name, repeat=5):
+    """Measures the startup cost of a generated module, the median of repeat fresh processes
+
+    Arguments:
+        directory {str} -- Where the module is
+        name {str} -- The name of the module
+
+    Keyword Arguments:
+        repeat {int} -- The number of processes (default: {5})
+
+    Returns:
+        dict -- import and configure_mappers times in seconds, peak resident memory in bytes
+    """
+    runs = [json.loads(subprocess.check_output(
+        [sys.executable, '-c', PROBE, directory, name], env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    )) for _ in range(repeat)]
+    return dict([(key, sorted([run[key] for run in runs])[len(runs) // 2]) for key in runs[0]])
+
+
+def run(sizes, repeat=5):
+    """Benchmarks the generated code
+
+    Arguments:
+        sizes {list<int>} -- The numbers of tables of the synthetic schemas
+
+    Keyword Arguments:
+        repeat {int} -- The number of processes per schema (default: {5})
+
+    Returns:
+        dict -- The measures per number of tables
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        return dict([(str(size), measure(directory, writeModels(size, directory), repeat)) for size in sizes])
+    finally:
+        shutil.rmtree(directory)
+
+
+def regressions(results, baseline, tolerance=0.2):
+    """Measures exceeding the baseline by more than tolerance
+
+    Arguments:
+        results {dict} -- The measures per number of tables
+        baseline {dict} -- The reference measures per number of tables
+
+    Keyword Arguments:
+        tolerance {float} -- The allowed relative increase (default: {0.2})
+
+    Returns:
+        list<str> -- A description of every regression
+    """
+    found = []
+    for size, measures in sorted(results.items(), key=lambda item: int(item[0])):
+        for metric in METRICS:
+            reference = baseline.get(size, {}).get(metric)
+            if reference and measures[metric] > reference * (1 + tolerance):
+                found.append('%s tables, %s: %.4g > %.4g' % (size, metric, measures[metric], reference))
+    return found
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Startup cost of the generated code')
+    parser.add_argument('--sizes', default='10,100,1000', help='numbers of tables, comma separated')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh processes per schema')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results to this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative increase over the baseline')
+    arguments = parser.parse_args(arguments)
+
+    results = run([int(size) for size in arguments.sizes.split(',')], arguments.repeat)
+    print('%8s %12s %12s %20s %10s' % ('tables', 'sqlalchemy', 'import', 'configure_mappers', 'rss (MB)'))
+    for size, measures in sorted(results.items(), key=lambda item: int(item[0])):
+        print('%8s %11.3fs %11.3fs %19.3fs %10.1f' % (
+            size, measures['sqlalchemy'], measures['import'], measures['configure_mappers'],
+            measures['rss'] / 1024.0 / 1024.0
+        ))
+
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline:
+            found = regressions(results, json.load(baseline), arguments.tolerance)
+        for regression in found:
+            print('Regression: %s' % regression)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Schema catalog loader
+
+Reads the catalog written next to the model by sqlalchemy_grt (model.mwb.catalog.json, and model.mwb.catalog.marshal
+when the binary form is written) without importing the generated models nor SQLAlchemy. This module has no dependency
+and can be copied in any tool:
+
+    import catalog
+    schema = catalog.load('model.mwb.catalog')
+    for column in schema['customers']['columns']:
+        print(column['name'], column['sql_type'], column['python_type'])
+"""
+
+import json
+import marshal
+import os
+from collections import OrderedDict
+
+FORMAT = 1
+MAGIC = b'WBALCAT'
+
+
+class Catalog(object):
+    """Catalog
+
+    The tables of a catalog, in foreign key dependency order, reachable by table or class name. Tables, columns,
+    indices, foreign keys and relationships are plain dicts, see SchemaCatalog in sqlalchemy_grt.
+    """
+
+    def __init__(self, data):
+        """Constructor
+
+        Arguments:
+            data {dict} -- The catalog as written by SchemaCatalog
+        """
+        if data.get('format', 0) > FORMAT:
+            raise ValueError('Catalog format %s is newer than this loader (%s)' % (data.get('format'), FORMAT))
+        self.data = data
+        self.fingerprint = data['fingerprint']
+        self.schema = data['schema']
+        self.options = data['options']
+        self.tables = OrderedDict([(table['name'], table) for table in data['tables']])
+        self.classes = dict([(table['class'], table) for table in data['tables']])
+
+    def __getitem__(self, name):
+        if name in self.tables:
+            return self.tables[name]
+        return self.classes[name]
+
+    def __contains__(self, name):
+        return name in self.tables or name in self.classes
+
+    def __iter__(self):
+        return iter(self.tables.values())
+
+    def __len__(self):
+        return len(self.tables)
+
+    def column(self, table, name):
+        """Retrieves a column by its name or its attribute name
+
+        Arguments:
+            table {str} -- The name of the table or of its class
+            name {str} -- The name of the column or of its attribute
+
+        Returns:
+            dict -- The column requested or None
+        """
+        for column in self[table]['columns']:
+            if name in (column['name'], column['attribute']):
+                return column
+        return None
+
+    def referencing(self, table):
+        """Tables having a foreign key to a table
+
+        Arguments:
+            table {str} -- The name of the table or of its class
+
+        Returns:
+            list<dict> -- The referencing tables
+        """
+        name = self[table]['name']
+        return [t for t in self if len([fk for fk in t['foreign_keys'] if fk['table'] == name])]
+
+
+def readBinary(path):
+    """Reads a binary catalog
+
+    Arguments:
+        path {str} -- The path of the .marshal file
+
+    Returns:
+        dict -- The catalog or None if it was written by an interpreter of another marshal version
+    """
+    with open(path, 'rb') as source:
+        data = source.read()
+    if data[:len(MAGIC) + 1] != MAGIC + bytes(bytearray([marshal.version])):
+        return None
+    return marshal.loads(data[len(MAGIC) + 1:])
+
+
+def load(path):
+    """Loads a catalog
+
+    Without extension, the binary catalog is preferred when it exists and the marshal versions match, the JSON one
+    being read otherwise.
+
+    Arguments:
+        path {str} -- The path of the catalog, with or without extension
+
+    Returns:
+        Catalog -- The catalog
+    """
+    if path.endswith('.json'):
+        with open(path) as source:
+            return Catalog(json.load(source))
+    if path.endswith('.marshal'):
+        data = readBinary(path)
+        if data is None:
+            raise ValueError('%s was written with another marshal version, load its .json' % path)
+        return Catalog(data)
+
+    if os.path.exists('%s.marshal' % path):
+        data = readBinary('%s.marshal' % path)
+        if data is not None:
+            return Catalog(data)
+    return load('%s.json' % path)
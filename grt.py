@@ -3,6 +3,36 @@ from mock import MagicMock
 root = MagicMock()
 modules = MagicMock()
 
+TABLE_DEFAULTS = {
+    'partitionType': '',
+    'partitionExpression': '',
+    'partitionCount': 0,
+    'partitionDefinitions': [],
+    'subpartitionType': '',
+    'subpartitionExpression': '',
+    'subpartitionCount': 0,
+    'rowFormat': '',
+    'keyBlockSize': '',
+    'avgRowLength': '',
+    'maxRows': '',
+    'minRows': '',
+    'packKeys': '',
+    'checksum': 0,
+    'delayKeyWrite': 0,
+    'statsPersistent': '',
+    'statsAutoRecalc': '',
+    'statsSamplePages': 0,
+    'defaultCollationName': '',
+}
+
+COLUMN_DEFAULTS = {
+    'generated': 0,
+    'generatedStorage': '',
+    'expression': '',
+    'characterSetName': '',
+    'collationName': '',
+}
+
 
 def get_grt_foreignKey(fk_name, columns=None, referencedColumns=None, deleteRule='NO ACTION', updateRule='SET NULL'):
     """Mock a foreign key
@@ -31,7 +61,7 @@ def get_grt_foreignKey(fk_name, columns=None, referencedColumns=None, deleteRule
     return fk
 
 
-def get_grt_index(name, index_type='PRIMARY', columns=None):
+def get_grt_index(name, index_type='PRIMARY', columns=None, lengths=None):
     """Mock an index
 
     Returns a Mock object representing the basic needs of an index
@@ -42,19 +72,71 @@ def get_grt_index(name, index_type='PRIMARY', columns=None):
     Keyword Arguments:
         index_type {str} -- The type of index (default: {'PRIMARY'})
         columns {list} -- The local colums this index binds to (default: {None})
+        lengths {dict} -- Prefix lengths per column name (default: {None})
 
     Returns:
         MagicMock -- GRT Compatible Index
     """
     indx = MagicMock(
-        columns=[MagicMock(referencedColumn=c) for c in (columns or [])],
+        columns=[MagicMock(referencedColumn=c, columnLength=(lengths or {}).get(c.name, 0)) for c in (columns or [])],
         indexType=index_type
     )
     indx.name = name
     return indx
 
 
-def get_grt_table(table_name, columns=None, indices=None, foreignKeys=None, tableEngine=None, charset='utf8', comment=None):
+def get_grt_schema(schema_name, tables=None, comment=''):
+    """Mock a schema
+
+    Returns a Mock object representing the basic needs of a schema
+
+    Arguments:
+        schema_name {str} -- The name of the schema
+
+    Keyword Arguments:
+        tables {list} -- All the tables of the schema (default: {None})
+        comment {str} -- Comment (default: {''})
+
+    Returns:
+        MagicMock -- GRT Compatible Schema
+    """
+    schema = MagicMock(
+        tables=tables or [],
+        comment=comment,
+        defaultCharacterSetName='utf8',
+        defaultCollationName=''
+    )
+    schema.name = schema_name
+    for t in schema.tables:
+        t.owner = schema
+    return schema
+
+
+def get_grt_partition(name, value='', subpartitions=None):
+    """Mock a partition definition
+
+    Returns a Mock object representing the basic needs of a partition definition
+
+    Arguments:
+        name {str} -- The name of the partition
+
+    Keyword Arguments:
+        value {str} -- The value of the partition, eg: the limit of a RANGE partition (default: {''})
+        subpartitions {list} -- The names of the subpartitions (default: {None})
+
+    Returns:
+        MagicMock -- GRT Compatible Partition Definition
+    """
+    partition = MagicMock(
+        value=value,
+        subpartitionDefinitions=[get_grt_partition(s) for s in (subpartitions or [])]
+    )
+    partition.name = name
+    return partition
+
+
+def get_grt_table(table_name, columns=None, indices=None, foreignKeys=None, tableEngine=None, charset='utf8',
+                  comment=None, **attributes):
     """Mock a table
 
     Returns a Mock object representing the basic needs of a table
@@ -69,16 +151,20 @@ def get_grt_table(table_name, columns=None, indices=None, foreignKeys=None, tabl
         tableEngine {str} -- Table engine if required (default: {None})
         charset {str} -- Charset (default: {'utf8'})
         comment {str} -- Comment (default: {None})
+        attributes {dict} -- Any other GRT table attribute, see TABLE_DEFAULTS (default: {{}})
 
     Returns:
         MagicMock -- GRT Compatible Table
     """
+    table_attributes = dict(TABLE_DEFAULTS)
+    table_attributes.update(attributes)
     table = MagicMock(
         tableEngine=tableEngine,
         defaultCharacterSetName=charset,
         columns=columns or [],
         indices=indices or [],
-        foreignKeys=foreignKeys or []
+        foreignKeys=foreignKeys or [],
+        **table_attributes
     )
     table.name = table_name
     if comment is not None:
@@ -88,7 +174,8 @@ def get_grt_table(table_name, columns=None, indices=None, foreignKeys=None, tabl
     return table
 
 
-def get_grt_column(column_name, table_name, sql_type, defaultValue=None, comment=None, isNotNull=0, autoIncrement=0):
+def get_grt_column(column_name, table_name, sql_type, defaultValue=None, comment=None, isNotNull=0, autoIncrement=0,
+                   **attributes):
     """Mock a column
 
     Returns a Mock object representing the basic needs of a column
@@ -103,17 +190,21 @@ def get_grt_column(column_name, table_name, sql_type, defaultValue=None, comment
         comment {str} -- Comment (default: {None})
         isNotNull {number} -- Is not null (default: {0})
         autoIncrement {number} -- Auto Increment (default: {0})
+        attributes {dict} -- Any other GRT column attribute, see COLUMN_DEFAULTS (default: {{}})
 
     Returns:
         MagicMock -- GRT Compatible Column
     """
+    column_attributes = dict(COLUMN_DEFAULTS)
+    column_attributes.update(attributes)
     column = MagicMock(
         owner=get_grt_table(table_name),
         defaultValue=defaultValue,
         formattedType=sql_type,
         formattedRawType=sql_type,
         isNotNull=isNotNull,
-        autoIncrement=autoIncrement
+        autoIncrement=autoIncrement,
+        **column_attributes
     )
     column.name = column_name
     if comment is not None:
@@ -4,8 +4,37 @@
 # Written in MySQL Workbench 6.2.3
 
 import grt
+import hashlib
+import heapq
+import json
+import marshal
+import mmap
+import os
 import re
-from collections import defaultdict
+import tempfile
+import threading
+from collections import defaultdict, OrderedDict
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+try:
+    intern
+except NameError:
+    from sys import intern
+
+try:
+    from os import replace
+except ImportError:
+    def replace(source, destination):
+        # python 2 renames over an existing file on POSIX only
+        if os.name == 'nt' and os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
 
 VERSION = '0.4'
 
@@ -17,7 +46,7 @@ AVAILABLE_TYPES = [
     'DECIMAL', 'DOUBLE', 'ENUM', 'FLOAT', 'INTEGER', 'LONGBLOB', 'LONGTEXT', 'MEDIUMBLOB',
     'MEDIUMINT', 'MEDIUMTEXT', 'NCHAR', 'NUMERIC', 'NVARCHAR', 'REAL', 'SET', 'SMALLINT',
     'TEXT', 'TIME', 'TIMESTAMP', 'TINYBLOB', 'TINYINT', 'TINYTEXT', 'VARBINARY', 'VARCHAR',
-    'YEAR']
+    'YEAR', 'JSON']
 
 
 def camelize(string):
@@ -255,17 +284,33 @@ class SqlaType(object):
     """
 
     SQLALCHEMY_TYPESMAP = {
-        'Varchar': 'String',
-        'Text': 'String',
-        'Tinyint': 'Integer',
-        'Bigint': 'Integer',
-        'Timestamp': 'DateTime',
-        'Datetime': 'DateTime',
-        'Double': 'Float',
-        'Blob': 'Binary',
-        'Longblob': 'Binary',
+        'BIGINT': 'BigInteger', 'BIT': 'BigInteger', 'INTEGER': 'Integer', 'MEDIUMINT': 'Integer',
+        'SMALLINT': 'SmallInteger', 'TINYINT': 'SmallInteger', 'YEAR': 'SmallInteger',
+        'BOOLEAN': 'Boolean',
+        'DECIMAL': 'Numeric', 'NUMERIC': 'Numeric', 'DOUBLE': 'Double', 'FLOAT': 'Float', 'REAL': 'Float',
+        'DATE': 'Date', 'DATETIME': 'DateTime', 'TIMESTAMP': 'DateTime', 'TIME': 'Time',
+        'CHAR': 'String', 'VARCHAR': 'String', 'NCHAR': 'Unicode', 'NVARCHAR': 'Unicode', 'ENUM': 'Enum',
+        'SET': 'String',
+        'TEXT': 'Text', 'TINYTEXT': 'Text', 'MEDIUMTEXT': 'Text', 'LONGTEXT': 'Text',
+        'BINARY': 'LargeBinary', 'VARBINARY': 'LargeBinary', 'BLOB': 'LargeBinary', 'TINYBLOB': 'LargeBinary',
+        'MEDIUMBLOB': 'LargeBinary', 'LONGBLOB': 'LargeBinary',
+        'JSON': 'JSON',
     }
 
+    UNSIGNED_TYPESMAP = {
+        'SMALLINT': 'Integer', 'INTEGER': 'BigInteger',
+    }
+
+    COLLATED_TYPES = [
+        'CHAR', 'VARCHAR', 'NCHAR', 'NVARCHAR', 'TINYTEXT', 'TEXT', 'MEDIUMTEXT', 'LONGTEXT', 'ENUM', 'SET',
+    ]
+
+    # Types whose MySQL arguments are not the arguments of their portable type
+    WRAPPED_TYPES = [
+        'BIGINT', 'BIT', 'INTEGER', 'MEDIUMINT', 'SMALLINT', 'TINYINT', 'YEAR', 'DOUBLE', 'FLOAT', 'REAL', 'DATETIME',
+        'TIMESTAMP', 'TIME', 'SET',
+    ]
+
     RAW_TYPE_MAP = {
         'BOOL': 'BOOLEAN',
         'BOOLEAN': 'BOOLEAN',
@@ -275,29 +320,67 @@ class SqlaType(object):
         'INT': 'INTEGER',
     }
 
+    PYTHON_TYPES_MAP = {
+        'BIGINT': 'int', 'BIT': 'int', 'INTEGER': 'int', 'MEDIUMINT': 'int', 'SMALLINT': 'int', 'TINYINT': 'int',
+        'YEAR': 'int',
+        'BOOLEAN': 'bool',
+        'DECIMAL': 'decimal.Decimal', 'NUMERIC': 'decimal.Decimal',
+        'DOUBLE': 'float', 'FLOAT': 'float', 'REAL': 'float',
+        'DATE': 'datetime.date', 'DATETIME': 'datetime.datetime', 'TIMESTAMP': 'datetime.datetime',
+        'TIME': 'datetime.time',
+        'BINARY': 'bytes', 'VARBINARY': 'bytes', 'BLOB': 'bytes', 'TINYBLOB': 'bytes', 'MEDIUMBLOB': 'bytes',
+        'LONGBLOB': 'bytes',
+        'SET': 'set',
+        'JSON': 'dict',
+    }
+
+    INTEGER_RANGES = {
+        'TINYINT': 127, 'SMALLINT': 32767, 'MEDIUMINT': 8388607, 'INTEGER': 2147483647,
+    }
+
+    IMPORT_ASYNCIO = False
+    IMPORT_BACKREF = False
+    IMPORT_CACHE = False
     IMPORT_DATETIME = False
+    IMPORT_COMPUTED = False
+    IMPORT_DECIMAL = False
+    IMPORT_ROUTING = False
+    IMPORT_SHARDING = False
+    IMPORT_TEXT = False
+    IMPORT_ROW_TYPES = False
+    IMPORT_JSON = False
+    IMPORT_BASE64 = False
+    IMPORT_UUID = False
     IMPORT_UNIQUE_CONSTRAINT = False
     IMPORT_INDEX = False
-    MIXINS = set()
+    IMPORT_UPSERT = False
+    IMPORT_KEYSET = False
+    IMPORT_FACTORIES = False
+    IMPORT_FETCHED_VALUE = False
+    IMPORT_DDL_SCRIPT = False
+    IMPORT_INSTRUMENTATION = False
 
     def __init__(self):
         """Constructor
 
-        Initialise empty sets for both sqla and mysql types
+        Initialise empty sets for both sqla and mysql types, for the types given a charset or a collation and for
+        the mixins
         """
         self.sqla = set()
         self.mysql = set()
+        self.collated = set()
+        self.MIXINS = set()
 
-    def get(self, column):
-        """Retrieves a formatted column type
+    def parse(self, column):
+        """Parses a column type
 
-        This will return the appropriate type to use in the object descriptions while caching sqla/mysql types.
+        This will resolve the mysql type and size of a column without caching anything.
 
         Arguments:
             column {db_Column} -- The GRT Column to extract the type from
 
         Returns:
-            str -- The Formatted Type
+            tuple<str, str> -- The mysql type and its size (None if there is no size)
         """
         column_type = column.formattedType
         if column.formattedRawType in SqlaType.RAW_TYPE_MAP:
@@ -309,11 +392,68 @@ class SqlaType(object):
 
         assert column_type in AVAILABLE_TYPES
 
-        self.mysql.add(column_type)
+        return column_type, size
+
+    def getPythonType(self, column):
+        """Retrieves the python type of a column
+
+        This will return the python type a driver hands back for this column, based on the type resolved by get.
+
+        Arguments:
+            column {db_Column} -- The GRT Column to extract the type from
+
+        Returns:
+            str -- The python type (eg: int, datetime.datetime)
+        """
+        column_type, _ = self.parse(column)
+        return SqlaType.PYTHON_TYPES_MAP.get(column_type, 'str')
+
+    def getPortable(self, column_type):
+        """Retrieves a portable type
+
+        This will return the expression building the portable type of a wrapped mysql type. Unsigned integers are
+        widened when they would not fit, and sized integers are plain integers on SQLite where only an INTEGER primary
+        key is an alias of the rowid (its storage is sized by value anyway). Charsets and collations are MySQL's, the
+        portable types keep their length only, and the name of an Enum. A SET is a string as long as all its members.
+
+        Arguments:
+            column_type {str} -- The mysql type (eg: TINYINT)
+
+        Returns:
+            str -- The python expression of the portable type
+        """
+        def instance(sqla):
+            if sqla in ('SmallInteger', 'BigInteger'):
+                return "%s().with_variant(Integer(), 'sqlite')" % sqla
+            return "%s()" % sqla
+
+        signed = SqlaType.SQLALCHEMY_TYPESMAP[column_type]
+        if column_type == 'SET':
+            return "%s(len(','.join(args)))" % signed
+        if column_type == 'ENUM':
+            return "%s(*args, name=kwargs.get('name'))" % signed
+        if column_type in self.collated and column_type not in SqlaType.WRAPPED_TYPES:
+            return "%s(*args)" % signed
+
+        unsigned = SqlaType.UNSIGNED_TYPESMAP.get(column_type, signed)
+        if signed == unsigned:
+            return instance(signed)
+        return "%s if kwargs.get('unsigned') else %s" % (instance(unsigned), instance(signed))
+
+    def get(self, column):
+        """Retrieves a formatted column type
+
+        This will return the appropriate type to use in the object descriptions while caching sqla/mysql types.
+
+        Arguments:
+            column {db_Column} -- The GRT Column to extract the type from
+
+        Returns:
+            str -- The Formatted Type
+        """
+        column_type, size = self.parse(column)
 
-        sqla = camelize(column_type)
-        sqla = SqlaType.SQLALCHEMY_TYPESMAP.get(sqla, sqla)
-        self.sqla.add(sqla if sqla == 'Integer' else "%s as %s" % (sqla, column_type))
+        self.mysql.add(column_type)
 
         column_type_obj = AttributeObject(None, column_type)
         if 'UNSIGNED' in column.flags and 'INT' in column_type:
@@ -322,6 +462,27 @@ class SqlaType(object):
         if size and 'INT' not in column_type.upper():
             column_type_obj.args.append(size)
 
+        if column_type in SqlaType.COLLATED_TYPES:
+            if column.characterSetName and not column_type.startswith('N'):
+                column_type_obj.kwargs['charset'] = quote(column.characterSetName)
+            if column.collationName:
+                column_type_obj.kwargs['collation'] = quote(column.collationName)
+            if len(column_type_obj.kwargs):
+                self.collated.add(column_type)
+
+        if column_type == 'ENUM':
+            # PostgreSQL creates a named type for an Enum, MySQL ignores the name
+            column_type_obj.kwargs['name'] = quote('%s_%s' % (column.owner.name, column.name))
+
+        sqla = SqlaType.SQLALCHEMY_TYPESMAP[column_type]
+        if column_type in SqlaType.WRAPPED_TYPES or column_type in self.collated:
+            self.sqla.discard("%s as %s" % (sqla, column_type))
+            self.sqla.update([sqla, SqlaType.UNSIGNED_TYPESMAP.get(column_type, sqla)])
+            if sqla in ('SmallInteger', 'BigInteger'):
+                self.sqla.add('Integer')
+        else:
+            self.sqla.add("%s as %s" % (sqla, column_type))
+
         return str(column_type_obj).replace('()', '')
 
 
@@ -332,7 +493,8 @@ class ColumnObject(object):
     __str__ function will take care of transforming this object to a sqlalchemy compatible python code
     """
 
-    def __init__(self, column, index=False, primary=False, unique=False):
+    def __init__(self, column, index=False, primary=False, unique=False, lazy=None, server_defaults=False,
+                 types=None, primary_keys=None):
         """Constructor
 
         This will initialise the column object. By default, every sqla object with only one primary key will be
@@ -346,26 +508,62 @@ class ColumnObject(object):
             index {bool} -- Sets the index status (default: {False})
             primary {bool} -- Sets the primary status (default: {False})
             unique {bool} -- Sets the unique status (default: {False})
+            lazy {str} -- Loading strategy of the relationship and its backref (default: {None})
+            server_defaults {bool} -- Render CURRENT_TIMESTAMP defaults on the server side (default: {False})
+            types {SqlaType} -- Types and imports of the export (default: {None}, the module USED_TYPES)
+            primary_keys {int} -- The number of primary key columns of the table, counted once by the table
+                                  (default: {None}, counted from the indices of the table)
         """
         self._column = column
+        self.types = types if types is not None else USED_TYPES
         self.index = index
         self.primary = primary
         self.unique = unique
+        self.server_defaults = server_defaults
         self.foreign_key = None
+        self.fetched = False
 
         self.options = options(column.comment)
-        self.column_type = USED_TYPES.get(self._column)
+        self.use_alter = self.options.get('use_alter', 'False') == 'True'
+        self.lazy = self.options.get('lazy', lazy)
+        self.column_type = self.types.get(self._column)
         self.name = self.options.get('alias', column.name)
 
-        primary_keys = len([1
-                            for i in column.owner.indices
-                            for c in i.columns if i.indexType == 'PRIMARY'])
+        if primary_keys is None:
+            primary_keys = len([1 for i in column.owner.indices for c in i.columns if i.indexType == 'PRIMARY'])
 
         if self.primary and primary_keys == 1 and self.name != 'id':
             self.name = 'id'
 
-        if self._column.defaultValue and 'CURRENT_TIMESTAMP' in self._column.defaultValue:
-            USED_TYPES.IMPORT_DATETIME = True
+        if self.isGenerated():
+            self.types.IMPORT_COMPUTED = True
+        elif self._column.defaultValue and 'CURRENT_TIMESTAMP' in self._column.defaultValue:
+            if self.hasServerDefault():
+                self.types.IMPORT_TEXT = True
+            if not self.hasServerDefault() or 'ON UPDATE' in self._column.defaultValue:
+                self.types.IMPORT_DATETIME = True
+
+    def hasServerDefault(self):
+        """Server Default Status
+
+        With server defaults, a CURRENT_TIMESTAMP default is rendered as a server_default instead of a python callable
+
+        Returns:
+            bool -- True if the default is set by the database, False otherwise
+        """
+        default = (self._column.defaultValue or '').split('ON UPDATE')[0]
+        return self.server_defaults and not self.isGenerated() and 'CURRENT_TIMESTAMP' in default
+
+    def isGenerated(self):
+        """Generated Status
+
+        A generated column (virtual or stored) is computed by the database, it is rendered as a Computed column which
+        SQLAlchemy keeps out of INSERT and UPDATE statements.
+
+        Returns:
+            bool -- True if the column is generated, False otherwise
+        """
+        return self._column.generated == 1 and bool(self._column.expression)
 
     def setForeignKey(self, foreign_key):
         """Mark this column as having a foreign key
@@ -375,6 +573,55 @@ class ColumnObject(object):
         """
         self.foreign_key = foreign_key
 
+        relation = self.options.get('relation', True) != 'False' and self.options.get('backref', True) != 'False'
+        if relation and (self.options.get('backrefuselist', True) == 'False' or self.lazy):
+            self.types.IMPORT_BACKREF = True
+
+    def getFactory(self):
+        """Synthetic value factory
+
+        This will return the python expression building the value of this column for the row number i. Values are
+        distinct for every row (within the range of the type) so unique constraints hold.
+
+        Returns:
+            str -- The python expression, None for generated columns
+        """
+        if self.isGenerated():
+            return None
+
+        column_type, size = self.types.parse(self._column)
+        python_type = self.types.getPythonType(self._column)
+        if column_type in SqlaType.INTEGER_RANGES:
+            return 'i %% %s + 1' % SqlaType.INTEGER_RANGES[column_type]
+        if column_type == 'YEAR':
+            return '1901 + i % 255'
+        if column_type == 'BIT':
+            return 'i % 2'
+        if column_type in ('ENUM', 'SET'):
+            return '(%s,)[i %% %s]' % (size, len(re.findall(r"'(?:[^']|'')*'", size)))
+        if python_type in ('int', 'bool'):
+            return {'int': 'i + 1', 'bool': 'i % 2 == 1'}[python_type]
+        if python_type == 'decimal.Decimal':
+            precision, scale = ((size or '10').split(',') + ['0'])[:2]
+            return 'decimal.Decimal(i %% %s)' % 10 ** (int(precision) - int(scale))
+        if python_type == 'float':
+            return 'i * 0.5'
+        if python_type == 'datetime.date':
+            return 'datetime.date(2000, 1, 1) + datetime.timedelta(days=i % 2900000)'
+        if python_type == 'datetime.datetime':
+            return 'datetime.datetime(2000, 1, 1) + datetime.timedelta(seconds=i)'
+        if python_type == 'datetime.time':
+            return 'datetime.time(i // 3600 % 24, i // 60 % 60, i % 60)'
+        if python_type == 'dict':
+            return "{'%s': i}" % self.name
+
+        value = "'%s-%%s' %% i" % self.name
+        if python_type == 'bytes':
+            value = "('%s' % i).encode('utf-8')"
+        if size and size.isdigit():
+            return '(%s)[-%s:]' % (value, size)
+        return value
+
     def to_print(self):
         """To Print Status
 
@@ -424,6 +671,9 @@ class ColumnObject(object):
             if self.options.get('backrefuselist', True) == 'False':
                 backref.kwargs['uselist'] = 'False'
 
+            if self.lazy:
+                backref.kwargs['lazy'] = quote(self.lazy)
+
             attr.kwargs['backref'] = backref.args[0] if len(backref.args) + len(backref.kwargs) == 1 else str(backref)
 
         if self.options.get('uselist', True) == 'False':
@@ -432,8 +682,38 @@ class ColumnObject(object):
         if self.options.get('remote_side', None):
             attr.kwargs['remote_side'] = '[%s]' % self.options.get('remote_side', None)
 
+        if self.lazy:
+            attr.kwargs['lazy'] = quote(self.lazy)
+
         return str(attr)
 
+    def getRelationship(self):
+        """Return the relationship as data
+
+        The relationship rendered by getBackref, described for the tools reading the schema without the models.
+
+        Returns:
+            dict -- The relationship or None if there is no foreign key or the relation is ignored
+        """
+        if not self.foreign_key or self.options.get('relation', True) == 'False':
+            return None
+
+        fktable = self.foreign_key.referencedColumns[0].owner.name
+        backref = None
+        if self.options.get('backref', True) != 'False':
+            backref = self.options.get('backrefname', functionalize(self._column.owner.name))
+
+        return {
+            'name': self.options.get('fkname', functionalize(singular(fktable))),
+            'class': singular(camelize(fktable)),
+            'table': fktable,
+            'foreign_keys': [self.name],
+            'secondary': None,
+            'uselist': False,
+            'backref': backref,
+            'backref_uselist': self.options.get('backrefuselist', True) != 'False',
+        }
+
     def __str__(self):
         """SQLAlchemy representation of that column
 
@@ -459,7 +739,7 @@ class ColumnObject(object):
                 kwargs={ 'name': quote(self.foreign_key.name) }
             )
 
-            if self.options.get('use_alter', False) == 'True':
+            if self.use_alter:
                 fk.kwargs['use_alter'] = 'True'
             if self.foreign_key.deleteRule and self.foreign_key.deleteRule != "NO ACTION":
                 fk.kwargs['ondelete'] = quote(self.foreign_key.deleteRule)
@@ -468,9 +748,17 @@ class ColumnObject(object):
 
             attr.args.append(str(fk))
 
+        if self.isGenerated():
+            attr.args.append(str(AttributeObject(
+                None,
+                'Computed',
+                args=[quote(self._column.expression)],
+                kwargs={'persisted': str(self._column.generatedStorage.upper() == 'STORED')}
+            )))
+
         if self._column.isNotNull == 1:
             attr.kwargs['nullable'] = False
-        if self._column.autoIncrement == 1:
+        if self._column.autoIncrement == 1 and not self.isGenerated():
             attr.kwargs['autoincrement'] = True
         if self.primary and self._column.autoIncrement != 1:
             attr.kwargs['autoincrement'] = False
@@ -480,7 +768,15 @@ class ColumnObject(object):
             attr.kwargs['unique'] = True
         if self.index:
             attr.kwargs['index'] = True
-        if self._column.defaultValue:
+        if self.fetched:
+            # set by the database on insert and update, and fetched back by the flush (eg: a server side version). The
+            # default of the model, ON UPDATE included, stays in the DDL so the database keeps producing new values
+            if self._column.defaultValue:
+                attr.kwargs['server_default'] = 'text(%s)' % quote(self._column.defaultValue.strip())
+            else:
+                attr.kwargs['server_default'] = 'FetchedValue()'
+            attr.kwargs['server_onupdate'] = 'FetchedValue()'
+        elif self._column.defaultValue and not self.isGenerated():
             default = self._column.defaultValue
             onupdate = None
             if "ON UPDATE" in default:
@@ -490,7 +786,10 @@ class ColumnObject(object):
                 default = 'datetime.datetime.utcnow'
             if onupdate and 'CURRENT_TIMESTAMP' in onupdate:
                 onupdate = 'datetime.datetime.utcnow'
-            attr.kwargs['default'] = default
+            if self.hasServerDefault():
+                attr.kwargs['server_default'] = 'text("CURRENT_TIMESTAMP")'
+            else:
+                attr.kwargs['default'] = default
             if onupdate:
                 attr.kwargs['onupdate'] = onupdate
         if self.name == 'id':
@@ -498,250 +797,2929 @@ class ColumnObject(object):
         return str(attr)
 
 
-class TableObject(object):
-    """TableObject
+def snapshotValue(value):
+    """Snapshot Value
 
-    This is a wrapper for a GRT db_Table object. It adds logic around foreign keys, indices and and the
-    __str__ function will take care of transforming this object to a sqlalchemy compatible python code
+    This function will return an interned copy of a GRT string, other values are kept as they are.
+
+    Arguments:
+        value {object} -- The value of a GRT attribute
+
+    Returns:
+        object -- The value to keep in a snapshot
     """
+    return intern(value) if isinstance(value, str) else value
 
-    def __init__(self, table):
-        """Constructor
 
-        This function will initialise the object and sets the appropriate foreign keys, indices and columns
+class Snapshot(object):
+    """Snapshot
+
+    Base of the immutable copies of the GRT objects. Every access to a GRT proxy crosses into the C++ layer, a
+    snapshot reads each attribute of FIELDS once and keeps plain python values, references to other snapshots being
+    given to the constructor.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, grt_object, **references):
+        """Constructor
 
         Arguments:
-            table {[type]} -- [description]
+            grt_object {GrtObject} -- The GRT object to copy
+
+        Keyword Arguments:
+            references {dict} -- Attributes referencing other snapshots (default: {{}})
         """
-        self._table = table
-        self.name = singular(camelize(table.name))
+        for name in self.FIELDS:
+            object.__setattr__(self, name, snapshotValue(getattr(grt_object, name)))
+        for name, value in references.items():
+            object.__setattr__(self, name, value)
 
-        self.options = options(table.comment)
-        self.comments = []
-        self.table_args = {}
-        self.table_args_ext = []
-        self.columns = []
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable, %s cannot be set' % (type(self).__name__, name))
 
-        self.indices = defaultdict(set)
 
-        for index in self._table.indices:
-            columns = [c.referencedColumn.name for c in index.columns]
-            if index.indexType in {'UNIQUE', 'INDEX'} and len(index.columns) > 1:
-                self.table_args_ext.extend([str(AttributeObject(
-                    None,
-                    'UniqueConstraint' if index.indexType == 'UNIQUE' else 'Index',
-                    args=[quote(quote(', ').join(sorted(columns))).replace('\\', '')],
-                    kwargs={ 'name': quote(index.name) }
-                ))])
-
-                if index.indexType == 'UNIQUE':
-                    USED_TYPES.IMPORT_UNIQUE_CONSTRAINT = True
-                else:
-                    USED_TYPES.IMPORT_INDEX = True
+class ColumnSnapshot(Snapshot):
+    """Immutable copy of a GRT db_Column"""
 
-                self.indices['multi'].update(columns)
-            self.indices[index.indexType].update(columns)
+    FIELDS = (
+        'name', 'comment', 'formattedType', 'formattedRawType', 'defaultValue', 'isNotNull', 'autoIncrement',
+        'generated', 'generatedStorage', 'expression', 'characterSetName', 'collationName',
+    )
+    __slots__ = FIELDS + ('owner', 'flags')
 
-        if 'mixins' in self.options:
-            USED_TYPES.MIXINS.update(self.options['mixins'].split(','))
 
-        self._setTableArgs()
-        self._setColumns()
+class IndexColumnSnapshot(Snapshot):
+    """Immutable copy of a GRT db_IndexColumn"""
 
-    def _setTableArgs(self):
-        """private function setTableArgs
+    FIELDS = ('columnLength',)
+    __slots__ = FIELDS + ('referencedColumn',)
 
-        This will set the global options for that table
-        """
-        if self._table.tableEngine:
-            self.table_args['mysql_engine'] = self._table.tableEngine
 
-        charset = self._table.defaultCharacterSetName or self._table.owner.defaultCharacterSetName
-        if charset:
-            self.table_args['mysql_charset'] = charset
+class IndexSnapshot(Snapshot):
+    """Immutable copy of a GRT db_Index"""
 
-        if sum([column.autoIncrement for column in self._table.columns]) > 0:
-            self.table_args['sqlite_autoincrement'] = True
+    FIELDS = ('name', 'indexType')
+    __slots__ = FIELDS + ('columns',)
 
-    def _setColumns(self):
-        """private function setColumns
 
-        This will browse all columns and initialise them with the proper db_Column and options. It also
-        links foreign keys properly
-        """
-        for column in self._table.columns:
-            self.columns.append(ColumnObject(
-                column,
-                primary=column.name in self.indices.get('PRIMARY', []),
-                index=column.name in self.indices.get('INDEX', []) and column.name not in self.indices.get('multi', []),
-                unique=column.name in self.indices.get('UNIQUE', []) and column.name not in self.indices.get('multi', [])
-            ))
+class ForeignKeySnapshot(Snapshot):
+    """Immutable copy of a GRT db_ForeignKey"""
 
-        # link columns together with foreign keys
-        for foreign_key in self._table.foreignKeys:
-            if len(foreign_key.referencedColumns) > 1:
-                self.comments.append('Foreign Key ignored')
-                continue
+    FIELDS = ('name', 'deleteRule', 'updateRule')
+    __slots__ = FIELDS + ('owner', 'columns', 'referencedColumns')
 
-            self.getColumn(foreign_key.columns[0].name).setForeignKey(foreign_key)
 
-    def getColumn(self, name):
-        """Retrieves a Column by name
+class PartitionSnapshot(Snapshot):
+    """Immutable copy of a GRT db_mysql_PartitionDefinition"""
 
-        This function will retrieve a column by name, either the GRT name or the aliased name
+    FIELDS = ('name', 'value')
+    __slots__ = FIELDS + ('subpartitionDefinitions',)
 
-        Arguments:
-            name {str} -- The name of the column to retriev
 
-        Returns:
-            ColumnObject -- The column requested or None
-        """
-        for column in self.columns:
-            if column.name == name:
-                return column
-            if column._column.name == name:
-                return column
-        return None
+class TableSnapshot(Snapshot):
+    """Immutable copy of a GRT db_Table"""
 
-    def __str__(self):
-        """SQLAlchemy representation of that table
+    FIELDS = (
+        'name', 'comment', 'tableEngine', 'defaultCharacterSetName', 'partitionType', 'partitionExpression',
+        'partitionCount', 'subpartitionType', 'subpartitionExpression', 'subpartitionCount', 'rowFormat',
+        'keyBlockSize', 'avgRowLength', 'maxRows', 'minRows', 'packKeys', 'checksum', 'delayKeyWrite',
+        'statsPersistent', 'statsAutoRecalc', 'statsSamplePages', 'defaultCollationName',
+    )
+    __slots__ = FIELDS + ('owner', 'columns', 'indices', 'foreignKeys', 'partitionDefinitions')
 
-        Returns:
-            str -- The SQLAlchemy python code for that table
+
+class SchemaSnapshot(Snapshot):
+    """SchemaSnapshot
+
+    This copies a GRT schema, its tables, columns, indices, foreign keys and partitions in a single extraction pass.
+    Foreign keys and indices reference the snapshots of their columns, the GRT objects are not referenced anymore
+    once it is built. Tables of other schemas referenced by a foreign key are copied with their columns only.
+    """
+
+    FIELDS = ('name', 'comment', 'defaultCharacterSetName', 'defaultCollationName')
+    __slots__ = FIELDS + ('tables',)
+
+    def __init__(self, schema):
+        """Constructor
+
+        Arguments:
+            schema {db_Schema} -- The GRT Schema to copy
         """
-        value = []
+        super(SchemaSnapshot, self).__init__(schema)
+
+        columns = {}
+
+        def snapshotTable(table, owner):
+            snapshot = TableSnapshot(table, owner=owner, indices=(), foreignKeys=(), partitionDefinitions=())
+            object.__setattr__(snapshot, 'columns', tuple([
+                ColumnSnapshot(column, owner=snapshot, flags=tuple([snapshotValue(f) for f in column.flags]))
+                for column in table.columns
+            ]))
+            columns.update([((snapshot.name, column.name), column) for column in snapshot.columns])
+            return snapshot
+
+        def snapshotColumn(column):
+            key = (column.owner.name, column.name)
+            if key not in columns:
+                snapshotTable(column.owner, None)
+            return columns[key]
+
+        def snapshotPartition(partition):
+            return PartitionSnapshot(partition, subpartitionDefinitions=tuple([
+                snapshotPartition(subpartition) for subpartition in partition.subpartitionDefinitions
+            ]))
+
+        tables = [(table, snapshotTable(table, self)) for table in schema.tables]
+        for table, snapshot in tables:
+            object.__setattr__(snapshot, 'indices', tuple([IndexSnapshot(index, columns=tuple([
+                IndexColumnSnapshot(column, referencedColumn=snapshotColumn(column.referencedColumn))
+                for column in index.columns
+            ])) for index in table.indices]))
+            object.__setattr__(snapshot, 'foreignKeys', tuple([ForeignKeySnapshot(
+                foreign_key, owner=snapshot,
+                columns=tuple([snapshotColumn(column) for column in foreign_key.columns]),
+                referencedColumns=tuple([snapshotColumn(column) for column in foreign_key.referencedColumns])
+            ) for foreign_key in table.foreignKeys]))
+            object.__setattr__(snapshot, 'partitionDefinitions', tuple([
+                snapshotPartition(partition) for partition in table.partitionDefinitions
+            ]))
+
+        object.__setattr__(self, 'tables', tuple([snapshot for _, snapshot in tables]))
+
+
+class Record(object):
+    """Record
+
+    A plain object standing for a GRT object, used to rebuild snapshots from their serialized form
+    """
 
-        inherits_from = ['object' if self.options.get('abstract', 'False') == 'True' else 'DECLARATIVE_BASE']
-        if 'mixins' in self.options:
-            inherits_from.extend(self.options['mixins'].split(','))
-        value.append("class %s(%s):" % (
-            self.name,
-            ', '.join(inherits_from)
-        ))
-        for comment in self.comments:
-            value.append(TAB + '# %s' % comment)
-        value.append("")
-        if 'abstract' not in self._table.comment:
-            value.append(TAB + "__tablename__ = '%s'" % self._table.name)
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
 
-        value.append(str(AttributeObject(
-            "__table_args__",
-            None,
-            args=[str(self.table_args)] + self.table_args_ext,
-            tab=TAB,
-            extended=True
-        )))
 
-        value.append('')
-        value.extend([str(c) for c in self.columns])
-        value.append('')
+def dumpSnapshot(schema):
+    """Dump a snapshot
 
-        relations = [br for br in [c.getBackref() for c in self.columns] if br is not None]
-        value.extend(relations)
+    Serializes a schema snapshot in a compact binary form (marshal of tuples). Columns are referenced by their table
+    and column names, tables of other schemas referenced by a foreign key are dumped with their columns only.
 
-        if len(relations):
-            value.append('')
+    Arguments:
+        schema {SchemaSnapshot} -- The schema to serialize
 
-        value.append(TAB + 'def __repr__(self):')
-        value.append(TAB * 2 + 'return self.__str__()')
-        value.append('')
-        value.append(TAB + 'def __str__(self):')
-        attr = AttributeObject(None, self.name, args=['%%(%s)s' % c.name for c in self.columns if c.to_print()])
-        value.append(TAB * 2 + 'return "<%s>" %% self.__dict__' % str(attr))
+    Returns:
+        bytes -- The serialized schema
+    """
+    def fields(snapshot):
+        return tuple([getattr(snapshot, name) for name in snapshot.FIELDS])
+
+    def reference(column):
+        return (column.owner.name, column.name)
+
+    def partition(definition):
+        return fields(definition) + (tuple([partition(p) for p in definition.subpartitionDefinitions]),)
+
+    def table(snapshot):
+        return (
+            fields(snapshot),
+            tuple([(fields(column), column.flags) for column in snapshot.columns]),
+            tuple([fields(index) + (tuple([reference(c.referencedColumn) + fields(c) for c in index.columns]),)
+                   for index in snapshot.indices]),
+            tuple([fields(foreign_key) + (
+                tuple([reference(c) for c in foreign_key.columns]),
+                tuple([reference(c) for c in foreign_key.referencedColumns])
+            ) for foreign_key in snapshot.foreignKeys]),
+            tuple([partition(definition) for definition in snapshot.partitionDefinitions]),
+        )
 
-        return '\n'.join(value)
+    names = set([snapshot.name for snapshot in schema.tables])
+    foreign = {}
+    for snapshot in schema.tables:
+        for foreign_key in snapshot.foreignKeys:
+            for column in foreign_key.referencedColumns:
+                if column.owner.name not in names:
+                    foreign[column.owner.name] = column.owner
 
+    return marshal.dumps((
+        fields(schema),
+        tuple([table(snapshot) for snapshot in schema.tables]),
+        tuple([table(snapshot) for snapshot in foreign.values()]),
+    ))
 
-USED_TYPES = SqlaType()
 
-def generateExport():
-    """Generate an Export
+def loadSnapshot(data):
+    """Load a snapshot
+
+    Rebuilds a schema snapshot from the output of dumpSnapshot, the serialized records going through the same
+    extraction pass as the GRT objects.
 
-    This function will iterate over all tables columns and will return the python file to be copied in the project
+    Arguments:
+        data {bytes} -- The serialized schema (any bytes-like object, eg: a memory map)
 
     Returns:
-        list<str> -- All lines of the python file
+        SchemaSnapshot -- The schema
     """
-    tables = []
-    for table in grt.root.wb.doc.physicalModels[0].catalog.schemata[0].tables:
-        print(" -> Working on %s" % table.name)
-        tables.append(TableObject(table))
+    schema, tables, foreign = marshal.loads(data)
+    columns = {}
 
-    export = []
-    export.append('#!/usr/bin/env python')
-    export.append('#-*- coding: utf-8 -*-')
-    export.append('"""')
-    export.append('This file has been automatically generated with workbench_alchemy v%s' % VERSION)
-    export.append('For more details please check here:')
-    export.append('https://github.com/PiTiLeZarD/workbench_alchemy')
-    export.append('"""')
+    def partition(data):
+        return Record(
+            subpartitionDefinitions=[partition(p) for p in data[-1]],
+            **dict(zip(PartitionSnapshot.FIELDS, data))
+        )
 
+    def table(data, owner):
+        record = Record(owner=owner, indices=[], foreignKeys=[], **dict(zip(TableSnapshot.FIELDS, data[0])))
+        record.partitionDefinitions = [partition(p) for p in data[4]]
+        record.columns = [
+            Record(owner=record, flags=flags, **dict(zip(ColumnSnapshot.FIELDS, values))) for values, flags in data[1]
+        ]
+        columns.update([((record.name, column.name), column) for column in record.columns])
+        return record
+
+    schema = Record(**dict(zip(SchemaSnapshot.FIELDS, schema)))
+    schema.tables = [table(data, schema) for data in tables]
+    for data in foreign:
+        table(data, None)
+
+    for record, data in zip(schema.tables, tables):
+        record.indices = [Record(
+            columns=[Record(
+                referencedColumn=columns[reference[:2]], **dict(zip(IndexColumnSnapshot.FIELDS, reference[2:]))
+            ) for reference in index[-1]],
+            **dict(zip(IndexSnapshot.FIELDS, index))
+        ) for index in data[2]]
+        record.foreignKeys = [Record(
+            columns=[columns[reference] for reference in foreign_key[-2]],
+            referencedColumns=[columns[reference] for reference in foreign_key[-1]],
+            **dict(zip(ForeignKeySnapshot.FIELDS, foreign_key))
+        ) for foreign_key in data[3]]
+
+    return SchemaSnapshot(schema)
+
+
+class SnapshotCache(object):
+    """SnapshotCache
+
+    Schema snapshots kept on disk, keyed by the content hash of the model file and the VERSION of the generator. A
+    model which did not change is never parsed again, its snapshot being read through a memory map. The least recently
+    used snapshots are evicted once the cache grows over max_size bytes.
+    """
 
-    def append_types(types, from_import, tab=TAB):
-        lines = []
-        if not len(types):
-            return lines
-        from_import = "from %s import" % from_import
-        types = pep8_list(types, first_row_pad=len(tab) + len(from_import))
-        lines.append(tab + "%s %s" % (from_import, types[0]))
-        if len(types) > 1:
-            lines[-1] += ' \\'
-        for index in range(1, len(types)):
-            lines.append(tab * 2 + types[index])
-            if index < len(types) - 1:
-                lines[-1] += ' \\'
-        return lines
+    def __init__(self, directory, max_size=256 * 1024 * 1024):
+        """Constructor
 
-    export.append("")
-    export.append("import os")
-    if USED_TYPES.IMPORT_DATETIME:
-        export.append("import datetime")
-    export.append("from sqlalchemy.orm import relationship")
-    export.append("from sqlalchemy import Column, ForeignKey")
+        Arguments:
+            directory {str} -- Where the snapshots are stored
 
-    sqlaschema = []
-    if USED_TYPES.IMPORT_UNIQUE_CONSTRAINT:
-        sqlaschema.append('UniqueConstraint')
-    if USED_TYPES.IMPORT_INDEX:
-        sqlaschema.append('Index')
-    if len(sqlaschema) > 0:
-        export = export + append_types(sqlaschema, 'sqlalchemy.schema', tab='')
+        Keyword Arguments:
+            max_size {int} -- The maximum size of all the snapshots in bytes (default: {256MB})
+        """
+        self.directory = directory
+        self.max_size = max_size
 
-    export.append("from sqlalchemy.ext.declarative import declarative_base")
-    if len(USED_TYPES.MIXINS):
-        export = export + append_types(USED_TYPES.MIXINS, '.mixins', tab='')
-    export.append("")
+    def getPath(self, path):
+        """Path of the snapshot of a model file
 
+        Arguments:
+            path {str} -- The path of the model file
 
-    export.append("if os.environ.get('DB_TYPE', 'MySQL') == 'MySQL':")
-    export = export + append_types(USED_TYPES.mysql, 'sqlalchemy.dialects.mysql')
-    export.append("else:")
-    export = export + append_types(USED_TYPES.sqla, 'sqlalchemy')
-    if 'Integer' in USED_TYPES.sqla:
-        export.append("")
-        export.append("    class INTEGER(Integer):")
-        export.append("        def __init__(self, *args, **kwargs):")
-        export.append("            super(Integer, self).__init__()  # pylint: disable=bad-super-call")
-        export.append("")
+        Returns:
+            str -- The path of its snapshot
+        """
+        # the layout of every snapshot class, a change to any of them makes the snapshots on disk unreadable
+        fields = sorted([(snapshot.__name__, snapshot.FIELDS) for snapshot in Snapshot.__subclasses__()])
+        digest = hashlib.sha1(('%s:%s:%s:' % (VERSION, marshal.version, fields)).encode('utf-8'))
+        with open(path, 'rb') as model:
+            for chunk in iter(lambda: model.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return os.path.join(self.directory, '%s.snapshot' % digest.hexdigest())
 
-        if 'TINYINT' in USED_TYPES.mysql:
-            export.append("    TINYINT = INTEGER")
+    def get(self, path, loader):
+        """Snapshot of a model file
 
-        if 'BIGINT' in USED_TYPES.mysql:
-            export.append("    BIGINT = INTEGER")
+        A snapshot which cannot be read (empty, truncated, corrupt or of another layout) is removed, a cache miss.
 
-    export.append("")
-    export.append("DECLARATIVE_BASE = declarative_base()")
-    export.append("")
+        Arguments:
+            path {str} -- The path of the model file
+            loader {callable} -- Called with path on a miss, returns the SchemaSnapshot of the model
 
-    for table in tables:
-        export.append("")
-        export.append(str(table))
-        export.append("")
+        Returns:
+            SchemaSnapshot -- The schema of the model
+        """
+        snapshot_path = self.getPath(path)
+        try:
+            os.utime(snapshot_path, None)
+            with open(snapshot_path, 'rb') as snapshot:
+                data = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    return loadSnapshot(data)
+                finally:
+                    data.close()
+        except (IOError, OSError):
+            pass
+        except (ValueError, EOFError, TypeError, KeyError, IndexError, AttributeError):
+            try:
+                os.remove(snapshot_path)  # empty, truncated or corrupt, loaded again
+            except OSError:
+                pass
+
+        schema = loader(path)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        descriptor, writing = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(descriptor, 'wb') as snapshot:
+            snapshot.write(dumpSnapshot(schema))
+        os.rename(writing, snapshot_path)
+        self.evict()
+        return schema
+
+    def evict(self):
+        """Removes the least recently used snapshots until the cache fits in max_size"""
+        snapshots = []
+        for name in os.listdir(self.directory):
+            try:
+                if name.endswith('.snapshot'):
+                    stat = os.stat(os.path.join(self.directory, name))
+                    snapshots.append((stat.st_mtime, stat.st_size, os.path.join(self.directory, name)))
+            except OSError:
+                pass  # evicted by a concurrent writer
+        snapshots.sort()
+        size = sum([snapshot[1] for snapshot in snapshots])
+        for _, snapshot_size, snapshot_path in snapshots[:-1]:
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(snapshot_path)
+            except OSError:
+                pass
+            size -= snapshot_size
+
+
+SQL_TOKENS = r"""\\.|'|"|`|--(?=\s|$)|#|/\*|\*/"""
+DDL_TOKENS = re.compile(r"""`(?:[^`]|``)*`|'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|[(),=]|[^\s(),=`'"]+""")
+DDL_TABLE_OPTIONS = {
+    'ENGINE': 'tableEngine', 'CHARSET': 'defaultCharacterSetName', 'CHARACTER SET': 'defaultCharacterSetName',
+    'COLLATE': 'defaultCollationName', 'COMMENT': 'comment', 'ROW_FORMAT': 'rowFormat',
+    'KEY_BLOCK_SIZE': 'keyBlockSize',
+    'AVG_ROW_LENGTH': 'avgRowLength', 'MAX_ROWS': 'maxRows', 'MIN_ROWS': 'minRows', 'PACK_KEYS': 'packKeys',
+    'CHECKSUM': 'checksum', 'DELAY_KEY_WRITE': 'delayKeyWrite', 'STATS_PERSISTENT': 'statsPersistent',
+    'STATS_AUTO_RECALC': 'statsAutoRecalc', 'STATS_SAMPLE_PAGES': 'statsSamplePages',
+}
+
+
+def iterStatements(stream):
+    """Iterate over statements
+
+    This function will stream the statements of a SQL script one at a time, memory being bounded by the largest
+    statement. Quotes, comments and DELIMITER commands (as in mysqldump files) are handled.
 
-    return export
+    Arguments:
+        stream {iterable<str>} -- The lines of the script (eg: an open file)
 
-def copyExportToClipboard(export):
+    Returns:
+        generator<str> -- The statements, without comments nor delimiter
+    """
+    delimiter = ';'
+    tokens = re.compile('%s|%s' % (SQL_TOKENS, re.escape(delimiter)))
+    statement = []
+    content = False
+    quoting = None
+    block = False
+    for line in stream:
+        if quoting is None and not block and not content and line.strip().upper().startswith('DELIMITER '):
+            delimiter = line.split()[1]
+            tokens = re.compile('%s|%s' % (SQL_TOKENS, re.escape(delimiter)))
+            continue
+
+        keep = 0
+        for match in tokens.finditer(line):
+            token = match.group()
+            if block:
+                if token == '*/':
+                    block = False
+                    keep = match.end()
+            elif quoting is not None:
+                if token == quoting:
+                    quoting = None
+            elif token in ("'", '"', '`'):
+                quoting = token
+            elif token == '/*' or token == '#' or token.startswith('--'):
+                statement.append(line[keep:match.start()])
+                content = content or bool(statement[-1].strip())
+                if token != '/*':
+                    statement.append('\n')
+                    keep = len(line)
+                    break
+                block = True
+            elif token == delimiter:
+                statement.append(line[keep:match.start()])
+                if content or statement[-1].strip():
+                    yield ''.join(statement)
+                statement = []
+                content = False
+                keep = match.end()
+
+        if not block:
+            statement.append(line[keep:])
+            content = content or bool(statement[-1].strip())
+
+    if content:
+        yield ''.join(statement)
+
+
+def ddlTokens(text):
+    """DDL tokens of a statement: identifiers, strings, parentheses, commas, equal signs and words"""
+    return DDL_TOKENS.findall(text)
+
+
+def ddlName(token):
+    """Unquoted identifier (the last part of a qualified name)"""
+    token = token.split('.')[-1] if not token.startswith('`') else re.split(r'`\.`', token)[-1]
+    return token.strip('`').replace('``', '`')
+
+
+def ddlString(token):
+    """Value of a quoted string token"""
+    if token[:1] not in ("'", '"'):
+        return token
+    return re.sub(r"\\(.)", r"\1", token[1:-1].replace(token[0] * 2, token[0]))
+
+
+def ddlGroup(tokens, position):
+    """Tokens of the parenthesized group starting at position, and the position following it"""
+    depth = 0
+    for end in range(position, len(tokens)):
+        depth += {'(': 1, ')': -1}.get(tokens[end], 0)
+        if depth == 0:
+            return tokens[position + 1:end], end + 1
+    return tokens[position + 1:], len(tokens)
+
+
+def ddlSplit(tokens):
+    """Lists of tokens separated by the commas at the top level of tokens"""
+    items = [[]]
+    depth = 0
+    for token in tokens:
+        depth += {'(': 1, ')': -1}.get(token, 0)
+        if token == ',' and depth == 0:
+            items.append([])
+        else:
+            items[-1].append(token)
+    return [item for item in items if len(item)]
+
+
+def ddlText(tokens):
+    """SQL text of tokens, parentheses kept next to the function names (MySQL rejects char_length (x) without
+    IGNORE_SPACE)"""
+    return re.sub(r' ?\( | \)| (?=,)| \(', lambda m: m.group().strip(), ' '.join(tokens))
+
+
+def ddlTableRecord(name, owner):
+    """Record of a table with the defaults of a Workbench table"""
+    record = Record(owner=owner, columns=[], indices=[], foreignKeys=[], partitionDefinitions=[])
+    for field in TableSnapshot.FIELDS:
+        setattr(record, field, 0 if field in ('partitionCount', 'subpartitionCount', 'checksum', 'delayKeyWrite',
+                                               'statsSamplePages') else '')
+    record.name = name
+    record.tableEngine = None
+    return record
+
+
+class DdlSchema(object):
+    """DdlSchema
+
+    An input adapter reading the CREATE TABLE (and ALTER TABLE ... ADD) statements of a SQL script into records
+    shaped like the GRT objects, so the script renders exactly as a Workbench model would. Table comments carry the
+    options as in Workbench. Partitions are not read.
+    """
+
+    def __init__(self, name, comment='', charset=None, collation=''):
+        """Constructor
+
+        Arguments:
+            name {str} -- The name of the schema
+
+        Keyword Arguments:
+            comment {str} -- The comment of the schema, carrying the options of every table (default: {''})
+            charset {str} -- The default charset (default: {None}, the one of the server)
+            collation {str} -- The default collation (default: {''})
+        """
+        self.schema = Record(
+            name=name, comment=comment, defaultCharacterSetName=charset, defaultCollationName=collation, tables=[]
+        )
+        self.tables = {}
+        self.pending = []
+
+    def read(self, stream):
+        """Reads a SQL script
+
+        Arguments:
+            stream {iterable<str>} -- The lines of the script (eg: an open file)
+        """
+        for statement in iterStatements(stream):
+            tokens = ddlTokens(statement)
+            keywords = [token.upper() for token in tokens[:6]]
+            if keywords[:1] == ['CREATE'] and 'TABLE' in keywords[1:3]:
+                self.readCreateTable(tokens)
+            elif keywords[:2] == ['ALTER', 'TABLE']:
+                self.readAlterTable(tokens)
+
+    def readCreateTable(self, tokens):
+        """Reads a CREATE TABLE statement, a table read again replacing the previous one
+
+        Arguments:
+            tokens {list<str>} -- The tokens of the statement
+        """
+        position = [token.upper() for token in tokens].index('TABLE') + 1
+        while tokens[position].upper() in ('IF', 'NOT', 'EXISTS'):
+            position += 1
+        if position + 1 >= len(tokens) or tokens[position + 1] != '(':
+            return
+
+        table = ddlTableRecord(ddlName(tokens[position]), self.schema)
+        table.defaultCharacterSetName = self.schema.defaultCharacterSetName
+        definitions, position = ddlGroup(tokens, position + 1)
+        for definition in ddlSplit(definitions):
+            self.readDefinition(table, definition)
+        self.readTableOptions(table, tokens[position:])
+
+        if table.name not in self.tables:
+            self.schema.tables.append(table)
+        self.tables[table.name] = table
+
+    def readAlterTable(self, tokens):
+        """Reads the ADD clauses of an ALTER TABLE statement on a table already read, the others are ignored
+
+        Arguments:
+            tokens {list<str>} -- The tokens of the statement
+        """
+        table = self.tables.get(ddlName(tokens[2])) if len(tokens) > 2 else None
+        if table is None:
+            return
+        for clause in ddlSplit(tokens[3:]):
+            if clause[0].upper() == 'ADD':
+                self.readDefinition(table, clause[1:] if clause[1:2] != ['COLUMN'] else clause[2:])
+
+    def readTableOptions(self, table, tokens):
+        """Reads the options following the definitions of a table (ENGINE, CHARSET, COMMENT...) up to its partitions
+
+        Arguments:
+            table {Record} -- The table
+            tokens {list<str>} -- The tokens following the definitions
+        """
+        position = 0
+        while position < len(tokens):
+            key = tokens[position].upper()
+            if key == 'PARTITION':
+                break
+            if key == 'DEFAULT':
+                position += 1
+                continue
+            if key == 'CHARACTER' and position + 1 < len(tokens):
+                key = 'CHARACTER SET'
+                position += 1
+            position += 2 if tokens[position + 1:position + 2] == ['='] else 1
+            if key in DDL_TABLE_OPTIONS and position < len(tokens):
+                value = ddlString(tokens[position])
+                if DDL_TABLE_OPTIONS[key] in ('checksum', 'delayKeyWrite', 'statsSamplePages'):
+                    value = int(value) if value.isdigit() else 0
+                setattr(table, DDL_TABLE_OPTIONS[key], value)
+            position += 1
+
+    def readColumnNames(self, tokens):
+        """Names of the columns of the first group of tokens
+
+        Arguments:
+            tokens {list<str>} -- The tokens of a definition
+
+        Returns:
+            list<str> -- The names of the columns
+        """
+        return [name for name, _ in self.readIndexColumns(tokens)]
+
+    def readIndexColumns(self, tokens):
+        """Names and prefix lengths (0 for the whole column) of the columns of the first group of tokens
+
+        Arguments:
+            tokens {list<str>} -- The tokens of a definition
+
+        Returns:
+            list<tuple<str, int>> -- The names and prefix lengths of the columns
+        """
+        group, _ = ddlGroup(tokens, tokens.index('('))
+        return [(ddlName(item[0]), int(item[2]) if item[1:2] == ['('] and item[2].isdigit() else 0)
+                for item in ddlSplit(group)]
+
+    def readDefinition(self, table, tokens):
+        """Reads a definition of a table: a column, an index, a foreign key (CHECK constraints are ignored)
+
+        Arguments:
+            table {Record} -- The table
+            tokens {list<str>} -- The tokens of the definition
+        """
+        keywords = [token.upper() for token in tokens]
+        if keywords[0] == 'CONSTRAINT':
+            name = ddlName(tokens[1]) if keywords[1] not in ('PRIMARY', 'UNIQUE', 'FOREIGN', 'CHECK') else None
+            tokens, keywords = (tokens[2:], keywords[2:]) if name is not None else (tokens[1:], keywords[1:])
+        else:
+            name = None
+
+        if keywords[0] == 'CHECK':
+            return
+        if keywords[0] == 'FOREIGN':
+            self.readForeignKey(table, tokens, name)
+            return
+        if keywords[0] in ('PRIMARY', 'UNIQUE', 'KEY', 'INDEX', 'FULLTEXT', 'SPATIAL'):
+            index_type = {'KEY': 'INDEX'}.get(keywords[0], keywords[0])
+            position = 1
+            while keywords[position] in ('KEY', 'INDEX'):
+                position += 1
+            if tokens[position] != '(':
+                name = ddlName(tokens[position])
+            name = 'PRIMARY' if index_type == 'PRIMARY' else name or self.readColumnNames(tokens)[0]
+            self.addIndex(table, name, index_type, self.readIndexColumns(tokens))
+            return
+
+        self.readColumn(table, tokens, keywords)
+
+    def addIndex(self, table, name, index_type, names):
+        """Adds an index to a table, columns missing from the table are left out
+
+        Arguments:
+            table {Record} -- The table
+            name {str} -- The name of the index
+            index_type {str} -- PRIMARY, UNIQUE, INDEX, FULLTEXT or SPATIAL
+            names {list<tuple<str, int>>} -- The names and prefix lengths of the columns
+        """
+        columns = dict([(column.name, column) for column in table.columns])
+        table.indices.append(Record(name=name, indexType=index_type, columns=[
+            Record(referencedColumn=columns[column], columnLength=length) for column, length in names
+            if column in columns
+        ]))
+
+    def readForeignKey(self, table, tokens, name):
+        """Reads a foreign key, its referenced columns being resolved by getSnapshot once every table is read
+
+        Arguments:
+            table {Record} -- The table
+            tokens {list<str>} -- The tokens of the definition, from FOREIGN
+            name {str} -- The name of the constraint, None to name it as MySQL does
+        """
+        keywords = [token.upper() for token in tokens]
+        position = keywords.index('REFERENCES')
+        rules = {'DELETE': 'NO ACTION', 'UPDATE': 'NO ACTION'}
+        for index, keyword in enumerate(keywords):
+            if keyword == 'ON' and index + 2 < len(keywords) and keywords[index + 1] in rules:
+                rule = keywords[index + 2]
+                rules[keywords[index + 1]] = '%s %s' % (rule, keywords[index + 3]) if rule in ('SET', 'NO') else rule
+        columns = dict([(column.name, column) for column in table.columns])
+        foreign_key = Record(
+            name=name or '%s_ibfk_%s' % (table.name, len(table.foreignKeys) + 1), owner=table,
+            columns=[columns[column] for column in self.readColumnNames(tokens[:position]) if column in columns],
+            referencedColumns=[], deleteRule=rules['DELETE'], updateRule=rules['UPDATE']
+        )
+        table.foreignKeys.append(foreign_key)
+        self.pending.append((foreign_key, ddlName(tokens[position + 1]), self.readColumnNames(tokens[position + 1:])))
+
+    def readColumn(self, table, tokens, keywords):
+        """Reads a column: type, flags, default, generation, comment and inline PRIMARY KEY or UNIQUE
+
+        Arguments:
+            table {Record} -- The table
+            tokens {list<str>} -- The tokens of the definition
+            keywords {list<str>} -- The tokens in upper case
+        """
+        column = Record(
+            name=ddlName(tokens[0]), owner=table, comment='', flags=[], defaultValue=None, isNotNull=0,
+            autoIncrement=0, generated=0, generatedStorage='', expression='', characterSetName='', collationName=''
+        )
+        position = 2
+        column.formattedType = keywords[1]
+        if tokens[2:3] == ['(']:
+            group, position = ddlGroup(tokens, 2)
+            column.formattedType = '%s(%s)' % (keywords[1], ''.join(group))
+        column.formattedRawType = column.formattedType
+
+        default = []
+        indices = []
+        while position < len(tokens):
+            keyword = keywords[position]
+            if keyword in ('UNSIGNED', 'ZEROFILL'):
+                column.flags.append(keyword)
+            elif keyword == 'NOT' and keywords[position + 1:position + 2] == ['NULL']:
+                column.isNotNull = 1
+                position += 1
+            elif keyword == 'AUTO_INCREMENT':
+                column.autoIncrement = 1
+            elif keyword in ('CHARSET', 'COLLATE') or keywords[position:position + 2] == ['CHARACTER', 'SET']:
+                position += 1 if keyword == 'CHARACTER' else 0
+                setattr(column, 'collationName' if keyword == 'COLLATE' else 'characterSetName', tokens[position + 1])
+                position += 1
+            elif keyword == 'COMMENT':
+                column.comment = ddlString(tokens[position + 1])
+                position += 1
+            elif keyword in ('DEFAULT', 'UPDATE') and position + 1 < len(tokens):
+                value, position = [tokens[position + 1]], position + 2
+                if tokens[position:position + 1] == ['(']:
+                    group, position = ddlGroup(tokens, position)
+                    value.append('(%s)' % ddlText(group))
+                if value != ['NULL']:
+                    default.append(('ON UPDATE %s' if keyword == 'UPDATE' else '%s') % ''.join(value))
+                continue
+            elif keyword == 'AS' and tokens[position + 1:position + 2] == ['(']:
+                group, position = ddlGroup(tokens, position + 1)
+                column.generated, column.expression = 1, ddlText(group)
+                column.generatedStorage = 'VIRTUAL'
+                continue
+            elif keyword in ('STORED', 'PERSISTENT'):
+                column.generatedStorage = 'STORED'
+            elif keyword in ('PRIMARY', 'UNIQUE'):
+                indices.append(keyword)
+            position += 1
+
+        column.defaultValue = ' '.join(default) or None
+        table.columns.append(column)
+        for index_type in indices:
+            self.addIndex(table, 'PRIMARY' if index_type == 'PRIMARY' else column.name, index_type, [(column.name, 0)])
+
+    def getSnapshot(self):
+        """Snapshot of the schema read so far
+
+        Foreign keys referencing tables missing from the script reference a table stub, with columns typed as the
+        columns referencing them.
+
+        Returns:
+            SchemaSnapshot -- The schema
+        """
+        for foreign_key, table_name, names in self.pending:
+            table = self.tables.get(table_name)
+            if table is None:
+                table = self.tables[table_name] = ddlTableRecord(table_name, None)
+            columns = dict([(column.name, column) for column in table.columns])
+            for name, local in zip(names, foreign_key.columns):
+                if name not in columns:
+                    columns[name] = Record(owner=table, flags=list(local.flags), **dict([
+                        (field, getattr(local, field)) for field in ColumnSnapshot.FIELDS
+                    ]))
+                    columns[name].name = name
+                    table.columns.append(columns[name])
+            foreign_key.referencedColumns = [columns[name] for name in names]
+        self.pending = []
+        return SchemaSnapshot(self.schema)
+
+
+def ddlSnapshot(path, name=None, comment=''):
+    """Snapshot of the schema of a SQL script, eg: the output of mysqldump --no-data
+
+    Arguments:
+        path {str} -- The path of the script
+
+    Keyword Arguments:
+        name {str} -- The name of the schema (default: {None}, the name of the file)
+        comment {str} -- The comment of the schema, carrying the options of every table (default: {''})
+
+    Returns:
+        SchemaSnapshot -- The schema
+    """
+    schema = DdlSchema(name or os.path.splitext(os.path.basename(path))[0], comment)
+    with open(path) as script:
+        schema.read(script)
+    return schema.getSnapshot()
+
+
+class ForeignKeyGraph(object):
+    """ForeignKeyGraph
+
+    This indexes the foreign keys of all the tables of an export once, as outgoing and incoming edges per table name.
+    It is used to order the tables by dependency, to find the foreign keys closing a cycle and to detect the pure
+    association tables of many to many relationships.
+    """
+
+    def __init__(self, tables):
+        """Constructor
+
+        Arguments:
+            tables {list<db_Table>} -- All the GRT Tables of the export
+        """
+        self.tables = list(tables)
+        self.outgoing = defaultdict(list)
+        self.incoming = defaultdict(list)
+        self.cycles = []
+        self.associations = {}
+        self.secondaries = defaultdict(list)
+        self.collisions = {}
+
+        for table in self.tables:
+            for foreign_key in table.foreignKeys:
+                if len(foreign_key.referencedColumns) != 1:
+                    continue
+                edge = (table.name, foreign_key.referencedColumns[0].owner.name, foreign_key)
+                self.outgoing[edge[0]].append(edge)
+                self.incoming[edge[1]].append(edge)
+
+        self._setCycles()
+        self._setAssociations()
+
+    def _setCycles(self):
+        """private function setCycles
+
+        Depth first walk of the graph, every foreign key pointing back to a table being visited closes a cycle. Self
+        references are left out, SQLAlchemy creates them without use_alter.
+        """
+        state = {}
+        for root in self.tables:
+            if root.name in state:
+                continue
+            state[root.name] = 'visiting'
+            stack = [(root.name, iter(self.outgoing[root.name]))]
+            while len(stack):
+                name, edges = stack[-1]
+                for _, target, foreign_key in edges:
+                    if target == name:
+                        continue
+                    if state.get(target) == 'visiting':
+                        self.cycles.append(foreign_key)
+                    elif target not in state:
+                        state[target] = 'visiting'
+                        stack.append((target, iter(self.outgoing[target])))
+                        break
+                else:
+                    state[name] = 'visited'
+                    stack.pop()
+
+    def _setAssociations(self):
+        """private function setAssociations
+
+        A pure association table has two foreign keys to two different tables, their columns being both its only
+        columns and its primary key. The option association=False (table comment) opts out. An association whose many
+        to many relationship or backref would take the name of an attribute of either table is left out, see collisions,
+        so the attributes of existing models are never replaced.
+        """
+        for table in self.tables:
+            edges = self.outgoing[table.name]
+            targets = set([target for _, target, _ in edges])
+            if len(edges) != 2 or len(targets) != 2 or table.name in targets:
+                continue
+            if options(table.comment).get('association', 'True') == 'False':
+                continue
+
+            columns = [c for _, _, foreign_key in edges for c in foreign_key.columns]
+            if any([options(c.comment).get('relation', 'True') == 'False' for c in columns]):
+                continue
+            columns = set([c.name for c in columns])
+            primary = set([
+                c.referencedColumn.name for index in table.indices if index.indexType == 'PRIMARY'
+                for c in index.columns
+            ])
+            if len(columns) != 2 or columns != primary or columns != set([c.name for c in table.columns]):
+                continue
+
+            for owner, name in ((edges[0][1], functionalize(edges[1][1])), (edges[1][1], functionalize(edges[0][1]))):
+                if name in self.getAttributeNames(owner, table.name):
+                    self.collisions[table.name] = '%s.%s' % (owner, name)
+                    break
+            if table.name in self.collisions:
+                continue
+
+            self.associations[table.name] = (edges[0][1], edges[1][1])
+            self.secondaries[edges[0][1]].append((table.name, edges[1][1]))
+
+    def getAttributeNames(self, name, association):
+        """Attribute names of a table
+
+        Arguments:
+            name {str} -- The name of the table
+            association {str} -- The name of the association table being checked, its foreign keys are left out
+
+        Returns:
+            set<str> -- The names of the columns, relationships, backrefs and many to many relationships of the table
+        """
+        names = set()
+        table = [t for t in self.tables if t.name == name][0]
+        for column in table.columns:
+            names.add(options(column.comment).get('alias', column.name))
+        primary = [c for index in table.indices if index.indexType == 'PRIMARY' for c in index.columns]
+        if len(primary) == 1:
+            names.add('id')
+        for _, target, foreign_key in self.outgoing[name]:
+            column_options = options(foreign_key.columns[0].comment)
+            if column_options.get('relation', 'True') != 'False':
+                names.add(column_options.get('fkname', functionalize(singular(target))))
+        for source, _, foreign_key in self.incoming[name]:
+            if source == association or source in self.associations:
+                continue
+            column_options = options(foreign_key.columns[0].comment)
+            if column_options.get('relation', 'True') != 'False' and column_options.get('backref', 'True') != 'False':
+                names.add(column_options.get('backrefname', functionalize(source)))
+        for first, second in self.associations.values():
+            if name in (first, second):
+                names.add(functionalize(second if name == first else first))
+        return names
+
+    def closesCycle(self, foreign_key):
+        """Cycle status
+
+        Arguments:
+            foreign_key {db_ForeignKey} -- A GRT Foreign Key
+
+        Returns:
+            bool -- True if the foreign key closes a cycle and needs use_alter, False otherwise
+        """
+        return foreign_key in self.cycles
+
+    def order(self):
+        """Dependency order
+
+        Referenced tables come before the tables referencing them, the model order being kept otherwise. Foreign keys
+        closing a cycle are not dependencies, they are created afterwards (use_alter).
+
+        Returns:
+            list<db_Table> -- All the tables of the export
+        """
+        positions = dict([(table.name, position) for position, table in enumerate(self.tables)])
+        dependencies = dict([(table.name, set([
+            target for _, target, foreign_key in self.outgoing[table.name]
+            if target in positions and target != table.name and not self.closesCycle(foreign_key)
+        ])) for table in self.tables])
+
+        ready = [positions[name] for name, targets in dependencies.items() if not len(targets)]
+        heapq.heapify(ready)
+        ordered = []
+        while len(ready):
+            table = self.tables[heapq.heappop(ready)]
+            ordered.append(table)
+            for source, _, _ in self.incoming[table.name]:
+                if source in dependencies and table.name in dependencies[source]:
+                    dependencies[source].remove(table.name)
+                    if not len(dependencies[source]):
+                        heapq.heappush(ready, positions[source])
+        return ordered
+
+
+class TableObject(object):
+    """TableObject
+
+    This is a wrapper for a GRT db_Table object. It adds logic around foreign keys, indices and and the
+    __str__ function will take care of transforming this object to a sqlalchemy compatible python code
+    """
+
+    STORAGE_OPTIONS = [
+        ('row_format', 'rowFormat'),
+        ('key_block_size', 'keyBlockSize'),
+        ('avg_row_length', 'avgRowLength'),
+        ('max_rows', 'maxRows'),
+        ('min_rows', 'minRows'),
+        ('pack_keys', 'packKeys'),
+        ('checksum', 'checksum'),
+        ('delay_key_write', 'delayKeyWrite'),
+        ('stats_persistent', 'statsPersistent'),
+        ('stats_auto_recalc', 'statsAutoRecalc'),
+        ('stats_sample_pages', 'statsSamplePages'),
+    ]
+
+    def __init__(self, table, graph=None, types=None, schema_options=None):
+        """Constructor
+
+        This function will initialise the object and sets the appropriate foreign keys, indices and columns
+
+        Arguments:
+            table {[type]} -- [description]
+
+        Keyword Arguments:
+            graph {ForeignKeyGraph} -- Foreign keys of the whole export, sets use_alter and many to many
+                                       relationships (default: {None})
+            types {SqlaType} -- Types and imports of the export (default: {None}, the module USED_TYPES)
+            schema_options {dict} -- Options overriding the ones of the schema comment (default: {None})
+        """
+        self._table = table
+        self.graph = graph
+        self.types = types if types is not None else USED_TYPES
+        self.name = singular(camelize(table.name))
+
+        self.options = options(table.comment)
+        self.schema_options = options(table.owner.comment)
+        self.schema_options.update(schema_options or {})
+        self.comments = []
+        self.table_args = {}
+        self.table_args_ext = []
+        self.columns = []
+        self.mapper_args = {}
+        self.shard_key = None
+        self.cache_ttl = None
+        self.row_type = []
+        self.factories = []
+        self.secondaries = []
+        self.json_fields = []
+        self.upsert_key = []
+        self.pages = []
+        self.association = graph is not None and table.name in graph.associations
+
+        self.indices = defaultdict(set)
+
+        for index in self._table.indices:
+            columns = [c.referencedColumn.name for c in index.columns]
+            lengths = [(c.referencedColumn.name, c.columnLength) for c in index.columns if c.columnLength]
+            if index.indexType in {'UNIQUE', 'INDEX'} and (len(index.columns) > 1 or len(lengths)):
+                if index.indexType == 'UNIQUE' and not len(lengths):
+                    self.table_args_ext.append(str(AttributeObject(
+                        None, 'UniqueConstraint', args=[quote(quote(', ').join(sorted(columns))).replace('\\', '')],
+                        kwargs={ 'name': quote(index.name) }
+                    )))
+                    self.types.IMPORT_UNIQUE_CONSTRAINT = True
+                else:
+                    # Index takes its name positionally, before the columns. Prefix lengths only exist on an Index
+                    attr = AttributeObject(
+                        None, 'Index', args=[quote(quote(', ').join([index.name] + columns)).replace('\\', '')]
+                    )
+                    if index.indexType == 'UNIQUE':
+                        attr.kwargs['unique'] = 'True'
+                    if len(lengths):
+                        attr.kwargs['mysql_length'] = '{%s}' % ', '.join(['%s: %s' % (quote(n), l) for n, l in lengths])
+                    self.table_args_ext.append(str(attr))
+                    self.types.IMPORT_INDEX = True
+
+                self.indices['multi'].update(columns)
+            self.indices[index.indexType].update(columns)
+
+        if 'mixins' in self.options:
+            self.types.MIXINS.update(self.options['mixins'].split(','))
+
+        if self.getOption('cache') and self.getOption('abstract', 'False') != 'True':
+            self.cache_ttl = self.getOption('cache')
+            self.types.IMPORT_CACHE = True
+
+        if self.getOption('ddl_script', 'False') == 'True':
+            self.types.IMPORT_DDL_SCRIPT = True
+        if self.getOption('instrument', 'False') == 'True':
+            self.types.IMPORT_INSTRUMENTATION = True
+
+        self._setTableArgs()
+        self._setColumns()
+        self._setShardKey()
+        self._setMapperArgs()
+        self._setRowType()
+        self._setJsonFields()
+        self._setUpsertKey()
+        self._setPages()
+        self._setFactories()
+        self._setSecondaries()
+
+    def getOption(self, name, default=None):
+        """Retrieves an option
+
+        Options set in the table comment take precedence over the ones set in the schema comment, which
+        apply to every table of the export.
+
+        Arguments:
+            name {str} -- The name of the option
+
+        Keyword Arguments:
+            default {str} -- The value if neither the table nor the schema sets it (default: {None})
+
+        Returns:
+            str -- The value of the option
+        """
+        return self.options.get(name, self.schema_options.get(name, default))
+
+    def _setTableArgs(self):
+        """private function setTableArgs
+
+        This will set the global options for that table
+        """
+        if self._table.tableEngine:
+            self.table_args['mysql_engine'] = self._table.tableEngine
+
+        charset = self._table.defaultCharacterSetName or self._table.owner.defaultCharacterSetName
+        if charset:
+            self.table_args['mysql_charset'] = charset
+
+        collation = self._table.defaultCollationName
+        if not self._table.defaultCharacterSetName:
+            collation = collation or self._table.owner.defaultCollationName
+        if collation:
+            self.table_args['mysql_collate'] = collation
+
+        if sum([column.autoIncrement for column in self._table.columns]) > 0:
+            self.table_args['sqlite_autoincrement'] = True
+
+        if self.getOption('bind'):
+            self.table_args['info'] = {'bind': self.getOption('bind')}
+            self.types.IMPORT_ROUTING = True
+
+        self._setStorageOptions()
+        self._setPartitions()
+
+    def _setStorageOptions(self):
+        """private function setStorageOptions
+
+        This will carry the physical options of the table (row format, key block size...) to the mysql_* table args.
+        The table comment overrides the model (eg: row_format=COMPRESSED;key_block_size=8), the schema comment
+        only applies when the model leaves the option empty.
+        """
+        for name, attribute in TableObject.STORAGE_OPTIONS:
+            value = getattr(self._table, attribute)
+            if name in self.options or not value:
+                value = self.getOption(name, value)
+            if value:
+                self.table_args['mysql_%s' % name] = str(value)
+
+    def _setPartitions(self):
+        """private function setPartitions
+
+        This will carry the partitioning of the table to the mysql_partition_by, mysql_partitions,
+        mysql_subpartition_by and mysql_subpartitions table args.
+        SQLAlchemy has no argument for the partition definitions, they are appended to the last partition clause
+        which is where MySQL expects them.
+        """
+        table = self._table
+        if not table.partitionType:
+            return
+
+        clauses = []
+        clauses.append(('mysql_partition_by', '%s(%s)' % (table.partitionType, table.partitionExpression)))
+        if table.partitionCount and not len(table.partitionDefinitions):
+            clauses.append(('mysql_partitions', str(table.partitionCount)))
+        if table.subpartitionType:
+            clauses.append(('mysql_subpartition_by', '%s(%s)' % (table.subpartitionType, table.subpartitionExpression)))
+            if table.subpartitionCount:
+                clauses.append(('mysql_subpartitions', str(table.subpartitionCount)))
+
+        definitions = []
+        for partition in table.partitionDefinitions:
+            definition = 'PARTITION %s' % partition.name
+            value = partition.value.strip()
+            if value and value.upper() != 'MAXVALUE' and not value.startswith('('):
+                value = '(%s)' % value
+            if table.partitionType.upper().startswith('RANGE'):
+                definition += ' VALUES LESS THAN %s' % value
+            elif table.partitionType.upper().startswith('LIST'):
+                definition += ' VALUES IN %s' % value
+            if len(partition.subpartitionDefinitions):
+                definition += ' (%s)' % ', '.join(
+                    ['SUBPARTITION %s' % subpartition.name for subpartition in partition.subpartitionDefinitions]
+                )
+            definitions.append(definition)
+
+        if len(definitions):
+            name, clause = clauses[-1]
+            clauses[-1] = (name, '%s (%s)' % (clause, ', '.join(definitions)))
+
+        for name, clause in clauses:
+            self.table_args[name] = clause
+
+    def _setColumns(self):
+        """private function setColumns
+
+        This will browse all columns and initialise them with the proper db_Column and options. It also
+        links foreign keys properly
+        """
+        asyncio = self.getOption('asyncio', 'False') == 'True'
+        if asyncio:
+            self.types.IMPORT_ASYNCIO = True
+
+        multi = self.indices.get('multi', [])
+        primary_keys = len([1 for i in self._table.indices for c in i.columns if i.indexType == 'PRIMARY'])
+        for column in self._table.columns:
+            self.columns.append(ColumnObject(
+                column,
+                primary=column.name in self.indices.get('PRIMARY', []),
+                index=column.name in self.indices.get('INDEX', []) and column.name not in multi,
+                unique=column.name in self.indices.get('UNIQUE', []) and column.name not in multi,
+                lazy=self.getOption('lazy', 'selectin' if asyncio else None),
+                server_defaults=self.getOption('server_defaults', str(asyncio)) == 'True',
+                types=self.types,
+                primary_keys=primary_keys
+            ))
+
+        # link columns together with foreign keys
+        for foreign_key in self._table.foreignKeys:
+            if len(foreign_key.referencedColumns) > 1:
+                self.comments.append('Foreign Key ignored')
+                continue
+
+            column = self.getColumn(foreign_key.columns[0].name)
+            column.setForeignKey(foreign_key)
+            if self.graph is not None and self.graph.closesCycle(foreign_key):
+                column.use_alter = True
+
+        if self.association:
+            self.comments.append('Association table of %s and %s' % self.graph.associations[self._table.name])
+        elif self.graph is not None and self._table.name in self.graph.collisions:
+            self.comments.append('Association ignored, %s already exists' % self.graph.collisions[self._table.name])
+
+    def _setShardKey(self):
+        """private function setShardKey
+
+        With the option shard_key=column, the table is horizontally sharded on that column (name or alias).
+        """
+        if 'shard_key' not in self.options:
+            return
+
+        column = self.getColumn(self.options['shard_key'])
+        if column is None:
+            self.comments.append('Shard key %s not found' % self.options['shard_key'])
+            return
+
+        self.shard_key = column.name
+        self.types.IMPORT_SHARDING = True
+
+    def _setMapperArgs(self):
+        """private function setMapperArgs
+
+        This will set the mapper args for that table:
+         - version=column : optimistic concurrency, column being the version counter
+         - version_generator=server|uuid : the version is set by the database (eg: a TIMESTAMP ON UPDATE) or is a
+           uuid generated on every flush instead of an incremented integer
+         - eager_defaults=True : fetch server defaults right after the flush
+         - confirm_deleted_rows=False : do not check the number of rows deleted
+        """
+        if 'version' in self.options:
+            column = self.getColumn(self.options['version'])
+            if column is None:
+                self.comments.append('Version column %s not found' % self.options['version'])
+            else:
+                self.mapper_args['version_id_col'] = column.name
+                generator = self.options.get('version_generator', None)
+                if generator == 'server':
+                    self.mapper_args['version_id_generator'] = 'False'
+                    column.fetched = True
+                    self.types.IMPORT_FETCHED_VALUE = True
+                    if column._column.defaultValue:
+                        self.types.IMPORT_TEXT = True
+                elif generator == 'uuid':
+                    self.mapper_args['version_id_generator'] = 'lambda version: uuid.uuid4().hex'
+                    self.types.IMPORT_UUID = True
+
+        for name in ('eager_defaults', 'confirm_deleted_rows'):
+            value = self.getOption(name)
+            if value is not None:
+                self.mapper_args[name] = value if value in ('True', 'False') else repr(value)
+
+        # server defaults must be fetched by the flush, loading them later is not possible with asyncio
+        if len([c for c in self.columns if c.hasServerDefault()]):
+            self.mapper_args.setdefault('eager_defaults', 'True')
+
+    def _setRowType(self):
+        """private function setRowType
+
+        With the option rowtype=True, a read-only NamedTuple with the same fields as the columns is generated next
+        to the class. This sets its fields and the python type of each of them.
+        """
+        if self.getOption('rowtype', 'False') != 'True' or self.getOption('abstract', 'False') == 'True':
+            return
+
+        for column in self.columns:
+            python_type = self.types.getPythonType(column._column)
+            if python_type.startswith('datetime.'):
+                self.types.IMPORT_DATETIME = True
+            if python_type.startswith('decimal.'):
+                self.types.IMPORT_DECIMAL = True
+            if column._column.isNotNull != 1 and not column.primary:
+                python_type = 'Optional[%s]' % python_type
+            self.row_type.append((column.name, python_type))
+
+        self.types.IMPORT_ROW_TYPES = True
+
+    def _setJsonFields(self):
+        """private function setJsonFields
+
+        With the option json=True, the class gets serializers of its instances and rows. This sets the fields and the
+        conversion of each of them (%s being the value) to a JSON compatible value.
+        """
+        if self.getOption('json', 'False') != 'True' or self.getOption('abstract', 'False') == 'True':
+            return
+
+        converters = {
+            'datetime.datetime': '%s.isoformat()', 'datetime.date': '%s.isoformat()', 'datetime.time': '%s.isoformat()',
+            'decimal.Decimal': 'str(%s)', 'bytes': "base64.b64encode(%s).decode('ascii')", 'set': 'sorted(%s)',
+        }
+        for column in self.columns:
+            converter = converters.get(self.types.getPythonType(column._column))
+            if converter is not None and column._column.isNotNull != 1 and not column.primary:
+                converter = 'None if %%s is None else %s' % converter
+            if converter is not None and 'base64' in converter:
+                self.types.IMPORT_BASE64 = True
+            self.json_fields.append((column.name, converter or '%s'))
+
+        self.types.IMPORT_JSON = True
+
+    def _setUpsertKey(self):
+        """private function setUpsertKey
+
+        With the option upsert=True, the class gets a bulk upsert on its first unique key (its primary key if it has
+        none), upsert=index_name choosing the key. Columns are in the order of the index.
+        """
+        upsert = self.getOption('upsert', 'False')
+        if upsert == 'False' or self.getOption('abstract', 'False') == 'True':
+            return
+
+        keys = [index for index in self._table.indices if index.indexType in ('PRIMARY', 'UNIQUE')]
+        keys.sort(key=lambda index: index.indexType == 'PRIMARY')
+        keys = [index for index in keys if upsert in ('True', index.name)]
+        if not len(keys):
+            return
+
+        self.upsert_key = [self.getColumn(c.referencedColumn.name).name for c in keys[0].columns]
+        self.types.IMPORT_UPSERT = True
+
+    def _setPages(self):
+        """private function setPages
+
+        With the option paginate=True, the class gets a keyset pagination on its primary key (page), paginate=i_name
+        adding one on each listed index (page_by_i_name). Pages are ordered by the columns of the index in its order,
+        then by the primary key columns it misses, so the order is total and the index serves both the WHERE and the
+        ORDER BY. Unknown indexes, indexes with nullable columns and tables without primary key are reported in the
+        class comments.
+        """
+        paginate = self.getOption('paginate', 'False')
+        if paginate == 'False' or self.getOption('abstract', 'False') == 'True':
+            return
+
+        names = ['PRIMARY'] + [name for name in paginate.split(',') if name not in ('True', 'PRIMARY')]
+        indices = dict([
+            (index.name if index.indexType != 'PRIMARY' else 'PRIMARY', index) for index in self._table.indices
+        ])
+        primary = [c.referencedColumn.name for c in indices['PRIMARY'].columns] if 'PRIMARY' in indices else []
+        if not len(primary):
+            self.comments.append('Pagination ignored, no primary key')
+            return
+        for name in names:
+            if name not in indices:
+                self.comments.append('Pagination index %s not found' % name)
+                continue
+            columns = [c.referencedColumn.name for c in indices[name].columns]
+            nullable = [c.referencedColumn.name for c in indices[name].columns if c.referencedColumn.isNotNull != 1]
+            if len(nullable):
+                # a NULL in the cursor cannot be compared, the seek would fail on the page after it
+                self.comments.append('Pagination index %s ignored, %s nullable' % (name, ', '.join(nullable)))
+                continue
+            columns.extend([column for column in primary if column not in columns])
+            self.pages.append((
+                'page' if name == 'PRIMARY' else 'page_by_%s' % re.sub(r'\W', '_', name),
+                [self.getColumn(column).name for column in columns]
+            ))
+
+        if len(self.pages):
+            self.types.IMPORT_KEYSET = True
+            self.types.IMPORT_BASE64 = True
+            self.types.IMPORT_DATETIME = True
+            self.types.IMPORT_DECIMAL = True
+
+    def _setFactories(self):
+        """private function setFactories
+
+        With the option factories=True, this sets the synthetic value factory of every column, used to load realistic
+        volumes in the table. Foreign keys are overridden by the generated loader to point at the rows of the
+        referenced table.
+        """
+        if self.getOption('factories', 'False') != 'True' or self.getOption('abstract', 'False') == 'True':
+            return
+
+        for column in self.columns:
+            factory = column.getFactory()
+            if factory is None:
+                continue
+            if 'datetime.' in factory:
+                self.types.IMPORT_DATETIME = True
+            if 'decimal.' in factory:
+                self.types.IMPORT_DECIMAL = True
+            self.factories.append((column.name, factory))
+        self.types.IMPORT_FACTORIES = True
+
+    def _setSecondaries(self):
+        """private function setSecondaries
+
+        Many to many relationships through the pure association tables referencing this table first, the backref
+        being on the other table. Navigation is one join, the association table not being mapped in between.
+        """
+        if self.graph is None:
+            return
+
+        lazy = self.getOption('lazy', 'selectin' if self.getOption('asyncio', 'False') == 'True' else None)
+        for association, target in self.graph.secondaries[self._table.name]:
+            attr = AttributeObject(
+                functionalize(target), 'relationship',
+                tab=TAB,
+                args=[quote(singular(camelize(target)))],
+                kwargs={'secondary': quote(association), 'backref': quote(functionalize(self._table.name))}
+            )
+            if lazy:
+                attr.kwargs['backref'] = 'backref(%s, lazy=%s)' % (attr.kwargs['backref'], quote(lazy))
+                attr.kwargs['lazy'] = quote(lazy)
+                self.types.IMPORT_BACKREF = True
+            self.secondaries.append(str(attr))
+
+    def getColumn(self, name):
+        """Retrieves a Column by name
+
+        This function will retrieve a column by name, either the GRT name or the aliased name
+
+        Arguments:
+            name {str} -- The name of the column to retriev
+
+        Returns:
+            ColumnObject -- The column requested or None
+        """
+        for column in self.columns:
+            if column.name == name:
+                return column
+            if column._column.name == name:
+                return column
+        return None
+
+    def __str__(self):
+        """SQLAlchemy representation of that table
+
+        Returns:
+            str -- The SQLAlchemy python code for that table
+        """
+        value = []
+
+        inherits_from = ['object' if self.options.get('abstract', 'False') == 'True' else 'DECLARATIVE_BASE']
+        if 'mixins' in self.options:
+            inherits_from.extend(self.options['mixins'].split(','))
+        if self.cache_ttl:
+            inherits_from.append('CachedMixin')
+        value.append("class %s(%s):" % (
+            self.name,
+            ', '.join(inherits_from)
+        ))
+        for comment in self.comments:
+            value.append(TAB + '# %s' % comment)
+        value.append("")
+        if 'abstract' not in self._table.comment:
+            value.append(TAB + "__tablename__ = '%s'" % self._table.name)
+
+        # One constraint per line, the options dict last as SQLAlchemy requires
+        value.append(TAB + "__table_args__ = (")
+        value.append(',\n'.join([
+            '\n'.join([TAB * 2 + line for line in arg.split('\n')])
+            for arg in self.table_args_ext + [str(self.table_args)]
+        ]))
+        if len(value[-1].split('\n')[-1]) >= PEP8_LIMIT:
+            value[-1] += ','
+        value.append(TAB + ")")
+        if self.cache_ttl:
+            value.append(TAB + "__cache_ttl__ = %s" % self.cache_ttl)
+
+        value.append('')
+        value.extend([str(c) for c in self.columns])
+        value.append('')
+
+        relations = [] if self.association else [br for br in [c.getBackref() for c in self.columns] if br is not None]
+        relations.extend(self.secondaries)
+        value.extend(relations)
+
+        if len(relations):
+            value.append('')
+
+        if len(self.mapper_args):
+            value.append(TAB + '__mapper_args__ = {%s}' % ', '.join(
+                ["'%s': %s" % item for item in self.mapper_args.items()]
+            ))
+            value.append('')
+
+        value.append(TAB + 'def __repr__(self):')
+        value.append(TAB * 2 + 'return self.__str__()')
+        value.append('')
+        value.append(TAB + 'def __str__(self):')
+        attr = AttributeObject(None, self.name, args=['%%(%s)s' % c.name for c in self.columns if c.to_print()])
+        value.append(TAB * 2 + 'return "<%s>" %% self.__dict__' % str(attr))
+
+        if len(self.json_fields):
+            value.append('')
+            value.append(self.jsonStr())
+
+        if len(self.upsert_key):
+            value.append('')
+            value.append(self.upsertStr())
+
+        if len(self.pages):
+            value.append('')
+            value.append(self.pagesStr())
+
+        if len(self.row_type):
+            value.append('')
+            value.append('')
+            value.append(self.rowTypeStr())
+
+        return '\n'.join(value)
+
+    def jsonStr(self):
+        """SQLAlchemy representation of the serializers of that table
+
+        Fields and converters are inlined, rows being converted by position (columns in the order of the table).
+
+        Returns:
+            str -- The python code for the serializers
+        """
+        value = []
+        value.append(TAB + 'def to_json_dict(self):')
+        value.append(TAB * 2 + 'return {')
+        value.extend([
+            TAB * 3 + "'%s': %s," % (name, converter.replace('%s', 'self.%s' % name))
+            for name, converter in self.json_fields
+        ])
+        value.append(TAB * 2 + '}')
+        value.append('')
+        value.append(TAB + 'def to_json(self):')
+        value.append(TAB * 2 + 'return json_dumps(self.to_json_dict())')
+        value.append('')
+        value.append(TAB + '@staticmethod')
+        value.append(TAB + 'def json_row(row):')
+        value.append(TAB * 2 + 'return {')
+        value.extend([
+            TAB * 3 + "'%s': %s," % (name, converter.replace('%s', 'row[%s]' % position))
+            for position, (name, converter) in enumerate(self.json_fields)
+        ])
+        value.append(TAB * 2 + '}')
+        value.append('')
+        value.append(TAB + '@classmethod')
+        value.append(TAB + 'def json_batch(cls, results):')
+        value.append(TAB * 2 + 'return json_dumps([')
+        value.append(TAB * 3 + 'result.to_json_dict() if isinstance(result, cls) else cls.json_row(result)')
+        value.append(TAB * 3 + 'for result in results')
+        value.append(TAB * 2 + '])')
+
+        return '\n'.join(value)
+
+    def upsertStr(self):
+        """SQLAlchemy representation of the bulk upsert of that table
+
+        Returns:
+            str -- The python code for the upsert
+        """
+        value = []
+        value.append(TAB + '@classmethod')
+        value.append(TAB + 'def upsert(cls, bind, rows, update=None, batch_size=1000):')
+        value.append(TAB * 2 + 'return upsert(bind, cls, rows, %r, update, batch_size)' % (tuple(self.upsert_key),))
+
+        return '\n'.join(value)
+
+    def pagesStr(self):
+        """SQLAlchemy representation of the keyset paginations of that table
+
+        Returns:
+            str -- The python code for the paginations
+        """
+        value = []
+        for name, columns in self.pages:
+            columns = ', '.join(['cls.%s' % column for column in columns]) + (',' if len(columns) == 1 else '')
+            if len(value):
+                value.append('')
+            value.append(TAB + '@classmethod')
+            value.append(TAB + 'def %s(cls, session, cursor=None, size=100, where=()):' % name)
+            value.append(str(AttributeObject(
+                None, 'return keyset_page',
+                tab=TAB * 2,
+                args=['session', 'cls', '(%s)' % columns, 'cursor', 'size', 'where']
+            )))
+
+        return '\n'.join(value)
+
+    def rowTypeStr(self):
+        """SQLAlchemy representation of the row type of that table
+
+        Rows of the select helper map straight into the NamedTuple, no identity map nor instrumentation involved.
+
+        Returns:
+            str -- The python code for the row type
+        """
+        name = '%sRow' % self.name
+        value = []
+        value.append("class %s(NamedTuple):" % name)
+        value.append('')
+        value.extend([TAB + '%s: %s' % field for field in self.row_type])
+        value.append('')
+        value.append(TAB + '@staticmethod')
+        value.append(TAB + 'def select(*whereclause):')
+        value.append(str(AttributeObject(
+            None,
+            'return select',
+            tab=TAB * 2,
+            args=['%s.%s' % (self.name, field) for field, _ in self.row_type]
+        )) + '.where(*whereclause)')
+        value.append('')
+        value.append(TAB + '@classmethod')
+        value.append(TAB + 'def fetch(cls, connection, *whereclause):')
+        value.append(TAB * 2 + 'return [cls._make(row) for row in connection.execute(cls.select(*whereclause))]')
+
+        return '\n'.join(value)
+
+
+USED_TYPES = SqlaType()
+
+
+class SchemaAdvisor(object):
+    """SchemaAdvisor
+
+    This is an analysis pass over the GRT tables reporting physical design risks: missing, wide or variable length
+    primary keys, redundant indices, oversized indexed VARCHAR and foreign keys whose type differs from the column they
+    reference. It also estimates the width of a row and of an entry of every index (InnoDB, maximum sizes).
+    """
+
+    TYPE_WIDTHS = {
+        'TINYINT': 1, 'SMALLINT': 2, 'MEDIUMINT': 3, 'INTEGER': 4, 'BIGINT': 8, 'BOOLEAN': 1, 'YEAR': 1,
+        'FLOAT': 4, 'DOUBLE': 8, 'REAL': 8, 'DATE': 3, 'TIME': 3, 'DATETIME': 8, 'TIMESTAMP': 4, 'ENUM': 2, 'SET': 8,
+    }
+    VARIABLE_TYPES = [
+        'VARCHAR', 'NVARCHAR', 'VARBINARY', 'TINYTEXT', 'TEXT', 'MEDIUMTEXT', 'LONGTEXT', 'TINYBLOB', 'BLOB',
+        'MEDIUMBLOB', 'LONGBLOB',
+    ]
+    CHARSET_WIDTHS = {'ascii': 1, 'latin1': 1, 'binary': 1, 'utf8': 3, 'utf8mb3': 3, 'utf8mb4': 4}
+    LOB_POINTER = 20
+    ROW_ID_WIDTH = 6
+    PRIMARY_KEY_LIMIT = 16
+    INDEX_PREFIX_LIMIT = 767
+
+    def __init__(self, tables):
+        """Constructor
+
+        Arguments:
+            tables {list<db_Table>} -- All the GRT Tables to analyse
+        """
+        self.tables = list(tables)
+        self.types = SqlaType()
+        self.issues = []
+        self.sizes = {}
+
+        for table in self.tables:
+            self._analyseTable(table)
+
+    def addIssue(self, table, check, message):
+        """Records an issue
+
+        Arguments:
+            table {db_Table} -- The GRT Table concerned
+            check {str} -- The name of the check raising the issue
+            message {str} -- A description of the issue
+        """
+        self.issues.append({'table': table.name, 'check': check, 'message': message})
+
+    def columnCharset(self, column):
+        """Character set of a column, the one of its table or of its schema when not set
+
+        Arguments:
+            column {db_Column} -- A GRT Column
+
+        Returns:
+            str -- The name of the character set, lower case, or None when nothing is set
+        """
+        charset = column.characterSetName
+        table = column.owner
+        if not charset and table is not None:
+            # tables outside the export (stubs of foreign keys) have no schema
+            charset = table.defaultCharacterSetName or (table.owner and table.owner.defaultCharacterSetName)
+        return charset.lower() if charset else None
+
+    def columnWidth(self, column):
+        """Maximum width of a column in a row or an index entry
+
+        Arguments:
+            column {db_Column} -- A GRT Column
+
+        Returns:
+            int -- The width in bytes
+        """
+        column_type, size = self.types.parse(column)
+        length = int(size) if size and size.isdigit() else 1
+        charset = SchemaAdvisor.CHARSET_WIDTHS.get(self.columnCharset(column), 4)
+
+        if column_type in ('CHAR', 'NCHAR'):
+            return length * charset
+        if column_type in ('VARCHAR', 'NVARCHAR'):
+            return length * charset + (1 if length * charset < 256 else 2)
+        if column_type == 'BINARY':
+            return length
+        if column_type == 'VARBINARY':
+            return length + (1 if length < 256 else 2)
+        if column_type == 'BIT':
+            return (length + 7) // 8
+        if column_type in ('DECIMAL', 'NUMERIC'):
+            precision, scale = [int(p) for p in ((size or '10').split(',') + ['0'])[:2]]
+            digits = lambda count: count // 9 * 4 + (count % 9 + 1) // 2
+            return digits(precision - scale) + digits(scale)
+        return SchemaAdvisor.TYPE_WIDTHS.get(column_type, SchemaAdvisor.LOB_POINTER)
+
+    def columnSignature(self, column):
+        """Physical type of a column, a foreign key and the column it references must share it
+
+        Arguments:
+            column {db_Column} -- A GRT Column
+
+        Returns:
+            tuple -- The type, unsigned flag and width of the column
+        """
+        return self.types.parse(column)[0], 'UNSIGNED' in column.flags, self.columnWidth(column)
+
+    def _analyseTable(self, table):
+        """private function analyseTable
+
+        Runs every check on a table and estimates its sizes
+
+        Arguments:
+            table {db_Table} -- A GRT Table
+        """
+        columns = dict([(column.name, column) for column in table.columns])
+        indices = [
+            (index.name, index.indexType, [c.referencedColumn.name for c in index.columns]) for index in table.indices
+        ]
+
+        primary = [names for _, index_type, names in indices if index_type == 'PRIMARY']
+        primary = primary[0] if len(primary) else []
+        primary_width = sum([self.columnWidth(columns[name]) for name in primary if name in columns])
+        if not len(primary):
+            primary_width = SchemaAdvisor.ROW_ID_WIDTH
+            self.addIssue(table, 'no_primary_key', 'no primary key, InnoDB clusters rows on a hidden 6 bytes row id')
+        elif primary_width > SchemaAdvisor.PRIMARY_KEY_LIMIT:
+            self.addIssue(table, 'wide_primary_key', 'primary key of %s bytes is copied in every secondary index' % (
+                primary_width
+            ))
+        for name in primary:
+            if name in columns and self.types.parse(columns[name])[0] in SchemaAdvisor.VARIABLE_TYPES:
+                self.addIssue(table, 'variable_primary_key', 'primary key column %s has a variable length' % name)
+
+        for position, (name, index_type, names) in enumerate(indices):
+            if index_type != 'INDEX':
+                continue
+            for other_position, (other, other_type, other_names) in enumerate(indices):
+                if position == other_position or other_names[:len(names)] != names:
+                    continue
+                if len(other_names) > len(names) or other_type != 'INDEX' or other_position < position:
+                    self.addIssue(table, 'redundant_index', 'index %s is a left prefix of %s' % (name, other))
+                    break
+
+        for name in set([name for _, _, names in indices for name in names]):
+            column = columns.get(name)
+            if column is not None and self.types.parse(column)[0] in ('VARCHAR', 'NVARCHAR'):
+                width = self.columnWidth(column)
+                if width > SchemaAdvisor.INDEX_PREFIX_LIMIT:
+                    self.addIssue(table, 'oversized_index_column', 'indexed column %s is up to %s bytes' % (
+                        name, width
+                    ))
+
+        for foreign_key in table.foreignKeys:
+            for column, referenced in zip(foreign_key.columns, foreign_key.referencedColumns):
+                # the charset of a table outside the schema is unknown, only its type is compared
+                compared = 2 if referenced.owner is None or referenced.owner.owner is None else 3
+                if self.columnSignature(column)[:compared] != self.columnSignature(referenced)[:compared]:
+                    self.addIssue(table, 'foreign_key_mismatch', '%s is %s while %s.%s is %s' % (
+                        column.name, column.formattedType, referenced.owner.name, referenced.name,
+                        referenced.formattedType
+                    ))
+
+        self.sizes[table.name] = {
+            'row_width': sum([self.columnWidth(column) for column in table.columns]),
+            'index_widths': dict([
+                (name, sum([self.columnWidth(columns[n]) for n in names if n in columns]) + (
+                    0 if index_type == 'PRIMARY' else primary_width
+                )) for name, index_type, names in indices
+            ]),
+        }
+
+    def toJson(self):
+        """JSON report
+
+        Returns:
+            str -- The sizes of every table and all the issues as JSON
+        """
+        return json.dumps({'tables': self.sizes, 'issues': self.issues}, indent=2, sort_keys=True)
+
+    def __str__(self):
+        """Text report
+
+        Returns:
+            str -- One line of sizes per table, followed by its issues
+        """
+        value = []
+        for table in self.tables:
+            sizes = self.sizes[table.name]
+            value.append('%s: row ~%s bytes, index entries %s' % (table.name, sizes['row_width'], ', '.join([
+                '%s ~%s bytes' % item for item in sorted(sizes['index_widths'].items())
+            ]) or 'none'))
+            value.extend([
+                TAB + '[%s] %s' % (issue['check'], issue['message']) for issue in self.issues
+                if issue['table'] == table.name
+            ])
+        return '\n'.join(value)
+
+    def write(self, path):
+        """Writes the text and JSON reports
+
+        Arguments:
+            path {str} -- The path of the reports, without extension
+        """
+        with open('%s.txt' % path, 'w') as report:
+            report.write(str(self))
+        with open('%s.json' % path, 'w') as report:
+            report.write(self.toJson())
+
+
+class SchemaCatalog(object):
+    """SchemaCatalog
+
+    A compact description of the exported models for the tools needing the schema without importing them (nor
+    SQLAlchemy): tables, columns with their resolved types, indices, foreign keys, relationships and parsed comment
+    options. It carries the SCHEMA_FINGERPRINT of the export it describes and is read by catalog.py, which has no
+    dependency.
+    """
+
+    FORMAT = 1
+    MAGIC = b'WBALCAT'
+
+    def __init__(self, schema, schema_options=None, fingerprint=None):
+        """Constructor
+
+        Arguments:
+            schema {SchemaSnapshot} -- The schema to describe
+
+        Keyword Arguments:
+            schema_options {dict} -- Options overriding the ones of the schema comment (default: {None})
+            fingerprint {str} -- The schemaFingerprint of the export described (default: {None}, the schema is
+                                 exported again to compute it)
+        """
+        graph = ForeignKeyGraph(schema.tables)
+        types = SqlaType()
+        self.tables = [TableObject(table, graph, types, schema_options) for table in graph.order()]
+        self.graph = graph
+
+        merged = options(schema.comment)
+        merged.update(schema_options or {})
+        self.catalog = {
+            'format': SchemaCatalog.FORMAT,
+            'version': VERSION,
+            'fingerprint': fingerprint or schemaFingerprint(generateExport(schema, schema_options, verbose=False)),
+            'schema': schema.name,
+            'options': merged,
+            'tables': [self.describeTable(table) for table in self.tables],
+        }
+
+    def describeColumn(self, column):
+        """Description of a column
+
+        Arguments:
+            column {ColumnObject} -- A column of the export
+
+        Returns:
+            dict -- The column
+        """
+        grt_column = column._column
+        return {
+            'name': grt_column.name,
+            'attribute': column.name,
+            'type': column.column_type,
+            'sql_type': ' '.join([grt_column.formattedType] + list(grt_column.flags)),
+            'python_type': column.types.getPythonType(grt_column),
+            'nullable': grt_column.isNotNull != 1,
+            'primary_key': column.primary,
+            'autoincrement': grt_column.autoIncrement == 1 and not column.isGenerated(),
+            'unique': column.unique,
+            'index': column.index,
+            'default': None if column.isGenerated() else (grt_column.defaultValue or None),
+            'computed': grt_column.expression if column.isGenerated() else None,
+            'options': column.options,
+        }
+
+    def describeTable(self, table):
+        """Description of a table
+
+        Arguments:
+            table {TableObject} -- A table of the export
+
+        Returns:
+            dict -- The table
+        """
+        grt_table = table._table
+        relationships = []
+        if not table.association:
+            relationships = [r for r in [c.getRelationship() for c in table.columns] if r is not None]
+        for association, target in self.graph.secondaries[grt_table.name]:
+            relationships.append({
+                'name': functionalize(target),
+                'class': singular(camelize(target)),
+                'table': target,
+                'foreign_keys': [],
+                'secondary': association,
+                'uselist': True,
+                'backref': functionalize(grt_table.name),
+                'backref_uselist': True,
+            })
+
+        return {
+            'name': grt_table.name,
+            'class': table.name,
+            'association': table.association,
+            'options': table.options,
+            'columns': [self.describeColumn(column) for column in table.columns],
+            'primary_key': [
+                c.referencedColumn.name for i in grt_table.indices if i.indexType == 'PRIMARY' for c in i.columns
+            ],
+            'indices': [{
+                'name': index.name,
+                'type': index.indexType,
+                'columns': [c.referencedColumn.name for c in index.columns],
+            } for index in grt_table.indices],
+            'foreign_keys': [{
+                'name': foreign_key.name,
+                'columns': [c.name for c in foreign_key.columns],
+                'table': foreign_key.referencedColumns[0].owner.name,
+                'referenced_columns': [c.name for c in foreign_key.referencedColumns],
+                'on_delete': foreign_key.deleteRule or 'NO ACTION',
+                'on_update': foreign_key.updateRule or 'NO ACTION',
+                'use_alter': self.graph.closesCycle(foreign_key),
+            } for foreign_key in grt_table.foreignKeys if len(foreign_key.referencedColumns)],
+            'relationships': relationships,
+        }
+
+    def toJson(self):
+        """JSON catalog
+
+        Returns:
+            str -- The catalog as compact JSON
+        """
+        return json.dumps(self.catalog, separators=(',', ':'), sort_keys=True)
+
+    def toBinary(self):
+        """Binary catalog
+
+        A marshal of the catalog, the fastest to load, behind MAGIC and the marshal version which must match the one
+        of the reading interpreter.
+
+        Returns:
+            bytes -- The catalog
+        """
+        return SchemaCatalog.MAGIC + bytes(bytearray([marshal.version])) + marshal.dumps(self.catalog)
+
+    def write(self, path, binary=False):
+        """Writes the JSON catalog and optionally the binary one, each replaced at once for the tools reading them
+
+        Without binary, a binary catalog left by a previous write is removed, catalog.py preferring it to the JSON one.
+
+        Arguments:
+            path {str} -- The path of the catalog, without extension
+
+        Keyword Arguments:
+            binary {bool} -- Writes the binary catalog as well (default: {False})
+        """
+        outputs = [('%s.json' % path, self.toJson().encode('utf-8'))]
+        if binary:
+            outputs.append(('%s.marshal' % path, self.toBinary()))
+
+        for output, data in outputs:
+            descriptor, written = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)))
+            with os.fdopen(descriptor, 'wb') as catalog:
+                catalog.write(data)
+            replace(written, output)
+
+        if not binary and os.path.exists('%s.marshal' % path):
+            os.remove('%s.marshal' % path)
+
+
+def cacheExport():
+    """Cache Export
+
+    This function returns the cache used by the tables having a cache option (eg: cache=300 for a 300s TTL). The
+    default cache is in-process with LRU eviction, CachedMixin.__cache__ can be replaced by any object following the
+    dogpile.cache region interface (get/set/delete) for a shared backend.
+
+    Returns:
+        list<str> -- All lines of the cache
+    """
+    return [
+        "class MemoryCache(object):",
+        TAB + '"""In-process cache with TTL and LRU eviction, following the dogpile.cache region interface"""',
+        "",
+        TAB + "def __init__(self, maxsize=10000):",
+        TAB * 2 + "self.maxsize = maxsize",
+        TAB * 2 + "self.values = collections.OrderedDict()",
+        TAB * 2 + "self.lock = threading.Lock()",
+        "",
+        TAB + "def get(self, key, expiration_time=None):",
+        TAB * 2 + "with self.lock:",
+        TAB * 3 + "if key not in self.values:",
+        TAB * 4 + "return None",
+        TAB * 3 + "value, created = self.values[key]",
+        TAB * 3 + "if expiration_time is not None and time.time() - created > expiration_time:",
+        TAB * 4 + "del self.values[key]",
+        TAB * 4 + "return None",
+        TAB * 3 + "self.values.move_to_end(key)",
+        TAB * 3 + "return value",
+        "",
+        TAB + "def set(self, key, value):",
+        TAB * 2 + "with self.lock:",
+        TAB * 3 + "self.values[key] = (value, time.time())",
+        TAB * 3 + "self.values.move_to_end(key)",
+        TAB * 3 + "while len(self.values) > self.maxsize:",
+        TAB * 4 + "self.values.popitem(last=False)",
+        "",
+        TAB + "def delete(self, key):",
+        TAB * 2 + "with self.lock:",
+        TAB * 3 + "self.values.pop(key, None)",
+        "",
+        "",
+        "class CachedMixin(object):",
+        TAB + '"""Primary key lookups through __cache__, entries expire after __cache_ttl__ seconds',
+        "",
+        TAB + "Entries are invalidated on update and delete of the object. They only hold column values, cached",
+        TAB + "objects are merged into the session without loading them from the database.",
+        TAB + '"""',
+        "",
+        TAB + "__cache__ = MemoryCache()",
+        TAB + "__cache_ttl__ = None",
+        "",
+        TAB + "@classmethod",
+        TAB + "def cache_key(cls, *ident):",
+        TAB * 2 + "return '%s:%s' % (cls.__tablename__, ':'.join([str(i) for i in ident]))",
+        "",
+        TAB + "@classmethod",
+        TAB + "def get_cached(cls, session, *ident):",
+        TAB * 2 + "key = cls.cache_key(*ident)",
+        TAB * 2 + "values = cls.__cache__.get(key, expiration_time=cls.__cache_ttl__)",
+        TAB * 2 + "if values:",
+        TAB * 3 + "instance = cls(**values)",
+        TAB * 3 + "make_transient_to_detached(instance)",
+        TAB * 3 + "return session.merge(instance, load=False)",
+        "",
+        TAB * 2 + "instance = session.get(cls, ident)",
+        TAB * 2 + "if instance is not None:",
+        TAB * 3 + "values = dict([(a.key, getattr(instance, a.key)) for a in inspect(cls).column_attrs])",
+        TAB * 3 + "cls.__cache__.set(key, values)",
+        TAB * 2 + "return instance",
+    ]
+
+
+def cacheListenersExport(tables):
+    """Cache Listeners Export
+
+    This function returns the event listeners invalidating the cache entries of the tables having a cache option
+
+    Arguments:
+        tables {list<TableObject>} -- All the tables of the export
+
+    Returns:
+        list<str> -- All lines of the listeners
+    """
+    export = []
+    export.append("def invalidate_cache(mapper, connection, target):")
+    export.append(TAB + "target.__cache__.delete(target.cache_key(*mapper.primary_key_from_instance(target)))")
+    export.append("")
+    export.append("")
+    export.append("for cached in [%s]:" % ', '.join([table.name for table in tables if table.cache_ttl]))
+    export.append(TAB + "event.listen(cached, 'after_update', invalidate_cache)")
+    export.append(TAB + "event.listen(cached, 'after_delete', invalidate_cache)")
+    return export
+
+
+def instrumentationExport():
+    """Instrumentation Export
+
+    This function returns the instrumentation of the generated models, emitted with the option instrument=True.
+    instrument(engine, session) attaches event listeners to that engine and session (a Session, a sessionmaker or a
+    Session class) only: they count and time the statements per mapped class, count lazy loads per relationship and
+    flag N+1 patterns (a relationship lazy loaded n_plus_one times in a unit of work). Nothing is registered otherwise.
+
+    Returns:
+        list<str> -- All lines of the instrumentation
+    """
+    return [
+        "INSTRUMENTATION = {'statements': {}, 'time': {}, 'lazy_loads': {}, 'n_plus_one': {}}",
+        "INSTRUMENTED = weakref.WeakSet()",
+        "",
+        "",
+        "def instrumentation_stats():",
+        TAB + '"""Statements and time per mapped class, lazy loads and N+1 patterns per relationship"""',
+        TAB + "return dict([(name, dict(counters)) for name, counters in INSTRUMENTATION.items()])",
+        "",
+        "",
+        "def reset_instrumentation():",
+        TAB + "for counters in INSTRUMENTATION.values():",
+        TAB * 2 + "counters.clear()",
+        "",
+        "",
+        "def instrument(engine, session=None, n_plus_one=10):",
+        TAB + '"""Instruments the statements of engine and the lazy loads of session, once per target',
+        "",
+        TAB + "Returns the (target, event, listener) registered, event.remove(*listener) for each of them stops it.",
+        TAB + '"""',
+        TAB + "import logging",
+        TAB + "import threading",
+        TAB + "import time",
+        TAB + "from sqlalchemy import event",
+        TAB + "from sqlalchemy.sql.util import find_tables",
+        "",
+        TAB + "lock = threading.Lock()",
+        TAB + "mapped_tables = dict([(m.local_table, m.class_.__name__) for m in DECLARATIVE_BASE.registry.mappers])",
+        "",
+        TAB + "def count(counters, name, value=1):",
+        TAB * 2 + "with lock:",
+        TAB * 3 + "counters[name] = counters.get(name, 0) + value",
+        TAB * 3 + "return counters[name]",
+        "",
+        TAB + "def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):",
+        TAB * 2 + "conn.info.setdefault('instrumentation_start', []).append(time.perf_counter())",
+        "",
+        TAB + "def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):",
+        TAB * 2 + "elapsed = time.perf_counter() - conn.info['instrumentation_start'].pop()",
+        TAB * 2 + "if context is None or context.compiled is None:",
+        TAB * 3 + "return",
+        TAB * 2 + "tables = find_tables(context.compiled.statement, include_crud=True)",
+        TAB * 2 + "for name in set([mapped_tables[table] for table in tables if table in mapped_tables]):",
+        TAB * 3 + "count(INSTRUMENTATION['statements'], name)",
+        TAB * 3 + "count(INSTRUMENTATION['time'], name, elapsed)",
+        "",
+        TAB + "def handle_error(context):",
+        TAB * 2 + "starts = context.connection.info.get('instrumentation_start') if context.connection else None",
+        TAB * 2 + "if starts:",
+        TAB * 3 + "starts.pop()",
+        "",
+        TAB + "def do_orm_execute(state):",
+        TAB * 2 + "if state.lazy_loaded_from is None or state.loader_strategy_path is None:",
+        TAB * 3 + "return",
+        TAB * 2 + "relationship = state.loader_strategy_path.path[-1]",
+        TAB * 2 + "if relationship.parent.local_table not in mapped_tables:",
+        TAB * 3 + "return",
+        TAB * 2 + "name = str(relationship)",
+        TAB * 2 + "count(INSTRUMENTATION['lazy_loads'], name)",
+        TAB * 2 + "if count(state.session.info.setdefault('lazy_loads', {}), name) == n_plus_one:",
+        TAB * 3 + "count(INSTRUMENTATION['n_plus_one'], name)",
+        TAB * 3 + "logging.getLogger(__name__).warning('N+1 on %s: lazy loaded %s times', name, n_plus_one)",
+        "",
+        TAB + "def after_transaction_end(session, transaction):",
+        TAB * 2 + "if transaction.parent is None:",
+        TAB * 3 + "session.info.pop('lazy_loads', None)",
+        "",
+        TAB + "listeners = []",
+        TAB + "if engine is not None and engine not in INSTRUMENTED:",
+        TAB * 2 + "listeners.extend([",
+        TAB * 3 + "(engine, 'before_cursor_execute', before_cursor_execute),",
+        TAB * 3 + "(engine, 'after_cursor_execute', after_cursor_execute),",
+        TAB * 3 + "(engine, 'handle_error', handle_error),",
+        TAB * 2 + "])",
+        TAB * 2 + "INSTRUMENTED.add(engine)",
+        TAB + "if session is not None and session not in INSTRUMENTED:",
+        TAB * 2 + "listeners.extend([",
+        TAB * 3 + "(session, 'do_orm_execute', do_orm_execute),",
+        TAB * 3 + "(session, 'after_transaction_end', after_transaction_end),",
+        TAB * 2 + "])",
+        TAB * 2 + "INSTRUMENTED.add(session)",
+        TAB + "for listener in listeners:",
+        TAB * 2 + "event.listen(*listener)",
+        TAB + "return listeners",
+    ]
+
+
+def ddlExport():
+    """DDL Export
+
+    This function returns the helpers creating the tables from a pre-rendered DDL script, emitted with the option
+    ddl_script=True. The script of a dialect is compiled once in FK dependency order (the very statements of
+    metadata.create_all) and kept in memory, or in a directory given by the caller which must be private to the user. A
+    script on disk starts with the fingerprint of the export that rendered it, it is only read back when that line
+    matches and the file is the user's, not writable by others, so a script rendered by another export (or planted by
+    another user) is never run against these models.
+
+    Returns:
+        list<str> -- All lines of the DDL helpers
+    """
+    return [
+        "SCHEMA_FINGERPRINT = '%s'",
+        "DDL_SCRIPTS = {}",
+        "",
+        "",
+        "def ddl_script(url, directory=None):",
+        TAB + '"""DDL creating every table for the dialect of url, rendered once per schema fingerprint',
+        "",
+        TAB + "The script is kept in memory, or in directory which must be private to the user when given",
+        TAB + '"""',
+        TAB + "url = make_url(url)",
+        TAB + "key = (os.environ.get('DB_TYPE', 'MySQL'), url.get_backend_name())",
+        TAB + "header = '-- SCHEMA_FINGERPRINT %s %s %s\\n' % ((SCHEMA_FINGERPRINT,) + key)",
+        TAB + "if directory is None and key in DDL_SCRIPTS:",
+        TAB * 2 + "return DDL_SCRIPTS[key]",
+        "",
+        TAB + "name = 'schema_%s_%s_%s.sql' % ((SCHEMA_FINGERPRINT,) + key)",
+        TAB + "path = os.path.join(directory, name) if directory else None",
+        TAB + "if path and os.path.exists(path):",
+        TAB * 2 + "status = os.stat(path)",
+        TAB * 2 + "owned = status.st_uid == os.getuid() if hasattr(os, 'getuid') else True",
+        TAB * 2 + "if owned and not status.st_mode & 0o022:",
+        TAB * 3 + "with open(path) as script:",
+        TAB * 4 + "ddl = script.read()",
+        TAB * 3 + "if ddl.startswith(header):",
+        TAB * 4 + "return ddl[len(header):]",
+        "",
+        TAB + "statements = []",
+        TAB + "engine = create_mock_engine(url, lambda sql, *args, **kwargs: statements.append(",
+        TAB * 2 + "str(sql.compile(dialect=engine.dialect)).strip()",
+        TAB + "))",
+        TAB + "DECLARATIVE_BASE.metadata.create_all(engine, checkfirst=False)",
+        TAB + "ddl = ''.join(['%s;\\n\\n' % statement for statement in statements])",
+        TAB + "if path is None:",
+        TAB * 2 + "DDL_SCRIPTS[key] = ddl",
+        TAB * 2 + "return ddl",
+        "",
+        TAB + "descriptor, rendering = tempfile.mkstemp(dir=directory)",
+        TAB + "with os.fdopen(descriptor, 'w') as script:",
+        TAB * 2 + "script.write(header + ddl)",
+        TAB + "os.replace(rendering, path)",
+        TAB + "return ddl",
+        "",
+        "",
+        "def create_all_fast(bind, directory=None):",
+        TAB + '"""Creates every table running the pre-rendered DDL script in one batch"""',
+        TAB + "ddl = ddl_script(bind.url, directory)",
+        TAB + "if bind.dialect.name == 'sqlite':",
+        TAB * 2 + "connection = bind.raw_connection()",
+        TAB * 2 + "try:",
+        TAB * 3 + "connection.driver_connection.executescript(ddl)",
+        TAB * 2 + "finally:",
+        TAB * 3 + "connection.close()",
+        TAB * 2 + "return",
+        "",
+        TAB + "with bind.begin() as connection:",
+        TAB * 2 + "for statement in ddl.split(';\\n\\n')[:-1]:",
+        TAB * 3 + "connection.exec_driver_sql(statement)",
+    ]
+
+
+def factoriesExport(tables):
+    """Factories Export
+
+    This function returns the synthetic data factories of the tables having a factories option and the bulk loader
+    inserting their rows in FK dependency order, one executemany per batch. Foreign keys spread over the rows of the
+    referenced table.
+
+    Arguments:
+        tables {list<TableObject>} -- All the tables of the export
+
+    Returns:
+        list<str> -- All lines of the factories and loader
+    """
+    export = []
+    export.append("FACTORIES = {")
+    for table in [table for table in tables if len(table.factories)]:
+        export.append(TAB + "%s: {" % table.name)
+        export.extend([TAB * 2 + "'%s': lambda i: %s," % factory for factory in table.factories])
+        export.append(TAB + "},")
+    export.append("}")
+    export.extend([
+        "",
+        "",
+        "def reference(factory, count=None):",
+        TAB + '"""Foreign key factory: row i % count of the referenced table, the previous row for self references"""',
+        TAB + "if count is None:",
+        TAB * 2 + "return lambda i: factory(max(i - 1, 0))",
+        TAB + "return lambda i: factory(i % count)",
+        "",
+        "",
+        "def row_factory(model, rows):",
+        TAB + '"""Function building the row i of model, rows ({model: count}) being the size of every table"""',
+        TAB + "models = dict([(m.local_table, m.class_) for m in DECLARATIVE_BASE.registry.mappers])",
+        TAB + "factories = dict(FACTORIES[model])",
+        TAB + "for column in model.__table__.columns:",
+        TAB * 2 + "for foreign_key in column.foreign_keys:",
+        TAB * 3 + "parent = models[foreign_key.column.table]",
+        TAB * 3 + "factory = FACTORIES.get(parent, {}).get(foreign_key.column.key)",
+        TAB * 3 + "if factory is None:",
+        TAB * 4 + "# a computed column or a table without factories, there is no value to reference",
+        TAB * 4 + "factories[column.key] = lambda i: None",
+        TAB * 3 + "elif parent is model:",
+        TAB * 4 + "factories[column.key] = reference(factory)",
+        TAB * 3 + "elif rows.get(parent):",
+        TAB * 4 + "factories[column.key] = reference(factory, rows[parent])",
+        TAB * 3 + "else:",
+        TAB * 4 + "factories[column.key] = lambda i: None",
+        TAB + "return lambda i: dict([(key, factory(i)) for key, factory in factories.items()])",
+        "",
+        "",
+        "def bulk_load(bind, rows, batch_size=10000):",
+        TAB + '"""Inserts rows[model] synthetic rows in the table of every model, referenced tables first',
+        "",
+        TAB + "Rows are built batch by batch, each batch being a single executemany in its own transaction.",
+        TAB + '"""',
+        TAB + "models = dict([(m.local_table, m.class_) for m in DECLARATIVE_BASE.registry.mappers])",
+        TAB + "for table in DECLARATIVE_BASE.metadata.sorted_tables:",
+        TAB * 2 + "model = models.get(table)",
+        TAB * 2 + "if model not in rows or model not in FACTORIES:",
+        TAB * 3 + "continue",
+        TAB * 2 + "build = row_factory(model, rows)",
+        TAB * 2 + "for start in range(0, rows[model], batch_size):",
+        TAB * 3 + "with bind.begin() as connection:",
+        TAB * 4 + "connection.execute(",
+        TAB * 5 + "table.insert(), [build(i) for i in range(start, min(start + batch_size, rows[model]))]",
+        TAB * 4 + ")",
+    ])
+    return export
+
+
+def upsertExport():
+    """Upsert Export
+
+    This function returns the bulk upsert of the tables having an upsert option: one INSERT ... ON DUPLICATE KEY
+    UPDATE (MySQL) or INSERT ... ON CONFLICT (SQLite, PostgreSQL) per batch of rows. Given an Engine, every batch runs
+    in its own transaction, a Connection or a Session runs them in the transaction of the caller.
+
+    Returns:
+        list<str> -- All lines of the upsert
+    """
+    return [
+        "def upsert(bind, model, rows, key, update=None, batch_size=1000):",
+        TAB + '"""Inserts or updates rows (dicts) by batch, rows conflicting on key (a unique key of model) being '
+              'updated',
+        "",
+        TAB + "bind is an Engine (a transaction per batch), a Connection or a Session (the transaction of the caller). "
+              "Every row",
+        TAB + "has the same columns, update is the columns to update, every column of the rows but the key by default.",
+        TAB + "Returns the number of rows.",
+        TAB + '"""',
+        TAB + "from sqlalchemy.engine import Engine",
+        "",
+        TAB + "dialect = (bind.get_bind() if hasattr(bind, 'get_bind') else bind).dialect",
+        TAB + "if dialect.name in ('mysql', 'mariadb'):",
+        TAB * 2 + "from sqlalchemy.dialects.mysql import insert",
+        TAB + "elif dialect.name == 'postgresql':",
+        TAB * 2 + "from sqlalchemy.dialects.postgresql import insert",
+        TAB + "else:",
+        TAB * 2 + "from sqlalchemy.dialects.sqlite import insert",
+        "",
+        TAB + "table = model.__table__",
+        TAB + "rows = iter(rows)",
+        TAB + "names = None",
+        TAB + "count = 0",
+        TAB + "while True:",
+        TAB * 2 + "batch = list(itertools.islice(rows, batch_size))",
+        TAB * 2 + "if not batch:",
+        TAB * 3 + "return count",
+        TAB * 2 + "names = names or set(batch[0])",
+        TAB * 2 + "for position, row in enumerate(batch):",
+        TAB * 3 + "if set(row) != names:",
+        TAB * 4 + "raise ValueError('upsert rows must have the same columns, row %s has %s instead of %s' % (",
+        TAB * 5 + "count + position, sorted(row), sorted(names)",
+        TAB * 4 + "))",
+        TAB * 2 + "statement = insert(table).values(batch)",
+        TAB * 2 + "columns = update if update is not None else [name for name in batch[0] if name not in key]",
+        TAB * 2 + "if hasattr(statement, 'on_duplicate_key_update'):",
+        TAB * 3 + "if columns:",
+        TAB * 4 + "statement = statement.on_duplicate_key_update(",
+        TAB * 5 + "[(name, statement.inserted[name]) for name in columns]",
+        TAB * 4 + ")",
+        TAB * 3 + "else:",
+        TAB * 4 + "statement = statement.prefix_with('IGNORE')",
+        TAB * 2 + "elif columns:",
+        TAB * 3 + "statement = statement.on_conflict_do_update(",
+        TAB * 4 + "index_elements=[table.c[name] for name in key],",
+        TAB * 4 + "set_=dict([(name, statement.excluded[name]) for name in columns])",
+        TAB * 3 + ")",
+        TAB * 2 + "else:",
+        TAB * 3 + "statement = statement.on_conflict_do_nothing(index_elements=[table.c[name] for name in key])",
+        TAB * 2 + "if isinstance(bind, Engine):",
+        TAB * 3 + "with bind.begin() as connection:",
+        TAB * 4 + "connection.execute(statement)",
+        TAB * 2 + "else:",
+        TAB * 3 + "bind.execute(statement)",
+        TAB * 2 + "count += len(batch)",
+    ]
+
+
+def keysetExport():
+    """Keyset Pagination Export
+
+    This function returns the keyset (seek) pagination of the tables having a paginate option. A page starts after
+    the last row of the previous one (WHERE on the columns of an index, in its order) instead of skipping rows with an
+    OFFSET, so deep pages cost as much as the first one. Cursors are opaque urlsafe strings.
+
+    Returns:
+        list<str> -- All lines of the pagination
+    """
+    return [
+        "def keyset_cursor(columns, instance):",
+        TAB + "values = []",
+        TAB + "for column in columns:",
+        TAB * 2 + "value = getattr(instance, column.key)",
+        TAB * 2 + "if hasattr(value, 'isoformat'):",
+        TAB * 3 + "value = value.isoformat()",
+        TAB * 2 + "elif isinstance(value, decimal.Decimal):",
+        TAB * 3 + "value = str(value)",
+        TAB * 2 + "elif isinstance(value, bytes):",
+        TAB * 3 + "value = base64.b64encode(value).decode('ascii')",
+        TAB * 2 + "values.append(value)",
+        TAB + "return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')",
+        "",
+        "",
+        "def keyset_values(columns, cursor):",
+        TAB + "values = []",
+        TAB + "for column, value in zip(columns, json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))):",
+        TAB * 2 + "python_type = column.type.python_type",
+        TAB * 2 + "if value is not None and python_type in (datetime.datetime, datetime.date, datetime.time):",
+        TAB * 3 + "value = python_type.fromisoformat(value)",
+        TAB * 2 + "elif value is not None and python_type in (decimal.Decimal, bytes):",
+        TAB * 3 + "value = decimal.Decimal(value) if python_type is decimal.Decimal else base64.b64decode(value)",
+        TAB * 2 + "values.append(value)",
+        TAB + "return values",
+        "",
+        "",
+        "def keyset_page(session, model, columns, cursor=None, size=100, where=()):",
+        TAB + '"""Page of size instances of model after cursor, ordered by columns (an index, in its order)',
+        "",
+        TAB + "Returns the instances and the cursor of the next page, None on the last page. The leading range on the",
+        TAB + "first column lets the index be scanned from the cursor, whatever the depth of the page.",
+        TAB + '"""',
+        TAB + "statement = select(model).where(*where)",
+        TAB + "if cursor is not None:",
+        TAB * 2 + "values = keyset_values(columns, cursor)",
+        TAB * 2 + "after = columns[-1] > values[-1]",
+        TAB * 2 + "for column, value in reversed(list(zip(columns, values))[:-1]):",
+        TAB * 3 + "after = or_(column > value, and_(column == value, after))",
+        TAB * 2 + "statement = statement.where(columns[0] >= values[0], after)",
+        TAB + "instances = session.execute(statement.order_by(*columns).limit(size + 1)).scalars().all()",
+        TAB + "if len(instances) <= size:",
+        TAB * 2 + "return instances, None",
+        TAB + "return instances[:size], keyset_cursor(columns, instances[size - 1])",
+    ]
+
+
+def routingExport():
+    """Routing Session Export
+
+    This function returns the session routing the reads of the tables having a bind option (eg: bind=replica) to
+    the engine of that name. Writes, flushes and every other table go to the primary engine.
+
+    Returns:
+        list<str> -- All lines of the routing session
+    """
+    return [
+        "class RoutingSession(Session):",
+        TAB + '"""Session routing reads to the engine set in the bind option of the tables',
+        "",
+        TAB + "engines maps the bind names to their engine, eg: {'primary': engine, 'replica': replica_engine}",
+        TAB + "Writes, flushes and tables without bind option use the primary engine.",
+        TAB + '"""',
+        "",
+        TAB + "def __init__(self, engines=None, **kwargs):",
+        TAB * 2 + "super(RoutingSession, self).__init__(**kwargs)",
+        TAB * 2 + "self.engines = engines or {}",
+        "",
+        TAB + "def get_bind(self, mapper=None, clause=None, **kwargs):",
+        TAB * 2 + "bind = 'primary'",
+        TAB * 2 + "if mapper is not None and not self._flushing and not isinstance(clause, (Insert, Update, Delete)):",
+        TAB * 3 + "bind = mapper.local_table.info.get('bind', bind)",
+        TAB * 2 + "if bind in self.engines:",
+        TAB * 3 + "return self.engines[bind]",
+        TAB * 2 + "return super(RoutingSession, self).get_bind(mapper=mapper, clause=clause, **kwargs)",
+    ]
+
+
+def shardingExport(tables):
+    """Sharding Export
+
+    This function returns the horizontal sharding setup of the tables having a shard_key option. Queries restricted
+    on the shard key (==, IN) only reach the matching shards, other queries fan out to every shard. Tables without
+    shard key are read from the shard of the object they are loaded from, or from the first shard.
+
+    Arguments:
+        tables {list<TableObject>} -- All the tables of the export
+
+    Returns:
+        list<str> -- All lines of the sharding setup
+    """
+    export = []
+    export.append("SHARD_KEYS = {")
+    export.extend([TAB + "%s: '%s'," % (table.name, table.shard_key) for table in tables if table.shard_key])
+    export.append("}")
+    export.extend([
+        "",
+        "",
+        "def shard_for(value, shard_ids):",
+        TAB + '"""Shard id of a shard key value: crc32 of the value modulo the number of shards"""',
+        TAB + "return shard_ids[zlib.crc32(str(value).encode('utf-8')) % len(shard_ids)]",
+        "",
+        "",
+        "def shard_key_values(statement, column):",
+        TAB + '"""Values the statement restricts column to (== and IN in its top level AND), None if unrestricted"""',
+        TAB + "criteria = getattr(statement, 'whereclause', None)",
+        TAB + "if criteria is None:",
+        TAB * 2 + "return None",
+        TAB + "if isinstance(criteria, BooleanClauseList) and criteria.operator is operators.and_:",
+        TAB * 2 + "criteria = criteria.clauses",
+        TAB + "else:",
+        TAB * 2 + "criteria = [criteria]",
+        TAB + "for criterion in criteria:",
+        TAB * 2 + "if not isinstance(criterion, BinaryExpression) or not isinstance(criterion.right, BindParameter):",
+        TAB * 3 + "continue",
+        TAB * 2 + "if not isinstance(criterion.left, ColumnElement) or not criterion.left.shares_lineage(column):",
+        TAB * 3 + "continue",
+        TAB * 2 + "if criterion.operator is operators.eq:",
+        TAB * 3 + "return [criterion.right.effective_value]",
+        TAB * 2 + "if criterion.operator is operators.in_op:",
+        TAB * 3 + "return list(criterion.right.effective_value)",
+        TAB + "return None",
+        "",
+        "",
+        "def sharded_session(shards, shard_lookup=shard_for, **kwargs):",
+        TAB + '"""ShardedSession over shards ({shard_id: engine}) for the classes of SHARD_KEYS',
+        "",
+        TAB + "shard_lookup(value, shard_ids) maps a shard key value to its shard id. Objects without shard key are",
+        TAB + "written to the first shard.",
+        TAB + '"""',
+        TAB + "shard_ids = sorted(shards)",
+        "",
+        TAB + "def shard_chooser(mapper, instance, clause=None, **kwargs):",
+        TAB * 2 + "if instance is not None and mapper.class_ in SHARD_KEYS:",
+        TAB * 3 + "return shard_lookup(getattr(instance, SHARD_KEYS[mapper.class_]), shard_ids)",
+        TAB * 2 + "return shard_ids[0]",
+        "",
+        TAB + "def identity_chooser(mapper, primary_key, lazy_loaded_from=None, **kwargs):",
+        TAB * 2 + "if lazy_loaded_from is not None:",
+        TAB * 3 + "return [lazy_loaded_from.identity_token]",
+        TAB * 2 + "if mapper.class_ in SHARD_KEYS:",
+        TAB * 3 + "return shard_ids",
+        TAB * 2 + "return shard_ids[:1]",
+        "",
+        TAB + "def execute_chooser(context):",
+        TAB * 2 + "chosen = set()",
+        TAB * 2 + "for mapper in context.all_mappers:",
+        TAB * 3 + "if mapper.class_ not in SHARD_KEYS:",
+        TAB * 4 + "continue",
+        TAB * 3 + "values = shard_key_values(context.statement, mapper.columns[SHARD_KEYS[mapper.class_]])",
+        TAB * 3 + "if values is None:",
+        TAB * 4 + "return shard_ids",
+        TAB * 3 + "chosen.update([shard_lookup(value, shard_ids) for value in values])",
+        TAB * 2 + "return sorted(chosen) or shard_ids[:1]",
+        "",
+        TAB + "return ShardedSession(",
+        TAB * 2 + "shards=shards, shard_chooser=shard_chooser, identity_chooser=identity_chooser,",
+        TAB * 2 + "execute_chooser=execute_chooser, **kwargs",
+        TAB + ")",
+    ])
+    return export
+
+
+def schemaFingerprint(export):
+    """Schema Fingerprint
+
+    Arguments:
+        export {list<str>} -- All lines of the python file
+
+    Returns:
+        str -- The fingerprint of the export, every line but the one of SCHEMA_FINGERPRINT itself
+    """
+    fingerprint = hashlib.sha1()
+    for line in export:
+        if not line.startswith('SCHEMA_FINGERPRINT = '):
+            fingerprint.update(('%s\n' % line).encode('utf-8'))
+    return fingerprint.hexdigest()
+
+
+def generateExport(schema=None, schema_options=None, verbose=True):
+    """Generate an Export
+
+    This function will iterate over all tables columns and will return the python file to be copied in the project.
+    Types and imports are tracked per export, exports can run concurrently.
+
+    Keyword Arguments:
+        schema {SchemaSnapshot} -- The schema to export (default: {None}, a snapshot of the first schema of the model)
+        schema_options {dict} -- Options overriding the ones of the schema comment (default: {None})
+        verbose {bool} -- Prints the progress, per table (default: {True})
+
+    Returns:
+        list<str> -- All lines of the python file
+    """
+    schema = schema or SchemaSnapshot(grt.root.wb.doc.physicalModels[0].catalog.schemata[0])
+    graph = ForeignKeyGraph(schema.tables)
+    used_types = SqlaType()
+    tables = []
+    for table in graph.order():
+        if verbose:
+            print(" -> Working on %s" % table.name)
+        tables.append(TableObject(table, graph, used_types, schema_options))
+
+    export = []
+    export.append('#!/usr/bin/env python')
+    export.append('#-*- coding: utf-8 -*-')
+    export.append('"""')
+    export.append('This file has been automatically generated with workbench_alchemy v%s' % VERSION)
+    export.append('For more details please check here:')
+    export.append('https://github.com/PiTiLeZarD/workbench_alchemy')
+    export.append('"""')
+
+
+    def append_types(types, from_import, tab=TAB):
+        lines = []
+        if not len(types):
+            return lines
+        from_import = "from %s import" % from_import
+        types = pep8_list(types, first_row_pad=len(tab) + len(from_import))
+        lines.append(tab + "%s %s" % (from_import, types[0]))
+        if len(types) > 1:
+            lines[-1] += ' \\'
+        for index in range(1, len(types)):
+            lines.append(tab * 2 + types[index])
+            if index < len(types) - 1:
+                lines[-1] += ' \\'
+        return lines
+
+    export.append("")
+    if used_types.IMPORT_BASE64:
+        export.append("import base64")
+    if used_types.IMPORT_CACHE:
+        export.append("import collections")
+    if used_types.IMPORT_UPSERT:
+        export.append("import itertools")
+    if used_types.IMPORT_JSON or used_types.IMPORT_KEYSET:
+        export.append("import json")
+    export.append("import os")
+    if used_types.IMPORT_DDL_SCRIPT:
+        export.append("import tempfile")
+    if used_types.IMPORT_INSTRUMENTATION:
+        export.append("import weakref")
+    if used_types.IMPORT_DATETIME:
+        export.append("import datetime")
+    if used_types.IMPORT_DECIMAL:
+        export.append("import decimal")
+    if used_types.IMPORT_UUID:
+        export.append("import uuid")
+    if used_types.IMPORT_CACHE:
+        export.append("import threading")
+        export.append("import time")
+    if used_types.IMPORT_SHARDING:
+        export.append("import zlib")
+    if used_types.IMPORT_ROW_TYPES:
+        export.append("from typing import NamedTuple, Optional")
+    orm = ['relationship']
+    if used_types.IMPORT_BACKREF:
+        orm.append('backref')
+    if used_types.IMPORT_ROUTING:
+        orm.append('Session')
+    if used_types.IMPORT_CACHE:
+        orm.append('make_transient_to_detached')
+    export = export + append_types(orm, 'sqlalchemy.orm', tab='')
+    if used_types.IMPORT_ROUTING:
+        export.append("from sqlalchemy.sql.expression import Insert, Update, Delete")
+
+    sqlalchemy = ['Column', 'ForeignKey']
+    if used_types.IMPORT_DDL_SCRIPT:
+        sqlalchemy.extend(['create_mock_engine', 'make_url'])
+    if used_types.IMPORT_COMPUTED:
+        sqlalchemy.append('Computed')
+    if used_types.IMPORT_ROW_TYPES or used_types.IMPORT_KEYSET:
+        sqlalchemy.append('select')
+    if used_types.IMPORT_KEYSET:
+        sqlalchemy.extend(['and_', 'or_'])
+    if used_types.IMPORT_TEXT:
+        sqlalchemy.append('text')
+    if used_types.IMPORT_FETCHED_VALUE:
+        sqlalchemy.append('FetchedValue')
+    if used_types.IMPORT_CACHE:
+        sqlalchemy.extend(['event', 'inspect'])
+    export = export + append_types(sqlalchemy, 'sqlalchemy', tab='')
+    if used_types.IMPORT_SHARDING:
+        export.append("from sqlalchemy.ext.horizontal_shard import ShardedSession")
+        export.append("from sqlalchemy.sql import operators")
+        elements = ['BinaryExpression', 'BindParameter', 'BooleanClauseList', 'ColumnElement']
+        export = export + append_types(elements, 'sqlalchemy.sql.elements', tab='')
+
+    sqlaschema = []
+    if used_types.IMPORT_UNIQUE_CONSTRAINT:
+        sqlaschema.append('UniqueConstraint')
+    if used_types.IMPORT_INDEX:
+        sqlaschema.append('Index')
+    if len(sqlaschema) > 0:
+        export = export + append_types(sqlaschema, 'sqlalchemy.schema', tab='')
+
+    export.append("from sqlalchemy.ext.declarative import declarative_base")
+    if used_types.IMPORT_ASYNCIO:
+        export.append("from sqlalchemy.ext.asyncio import AsyncAttrs")
+    if len(used_types.MIXINS):
+        export = export + append_types(used_types.MIXINS, '.mixins', tab='')
+    export.append("")
+
+
+    export.append("if os.environ.get('DB_TYPE', 'MySQL') == 'MySQL':")
+    export = export + append_types(used_types.mysql, 'sqlalchemy.dialects.mysql')
+    export.append("else:")
+    export = export + append_types(used_types.sqla, 'sqlalchemy')
+    for column_type in sorted(used_types.mysql):
+        if column_type in SqlaType.WRAPPED_TYPES or column_type in used_types.collated:
+            export.append("")
+            export.append(TAB + "class %s(%s):" % (column_type, SqlaType.SQLALCHEMY_TYPESMAP[column_type]))
+            export.append(TAB * 2 + "def __new__(cls, *args, **kwargs):")
+            export.append(TAB * 3 + "return %s" % used_types.getPortable(column_type))
+    if len(used_types.mysql.intersection(SqlaType.WRAPPED_TYPES)) or len(used_types.collated):
+        export.append("")
+
+    export.append("")
+    if used_types.IMPORT_ASYNCIO:
+        export.append("DECLARATIVE_BASE = declarative_base(cls=AsyncAttrs)")
+    else:
+        export.append("DECLARATIVE_BASE = declarative_base()")
+    export.append("")
+
+    if used_types.IMPORT_JSON:
+        export.append("")
+        export.append("try:")
+        export.append(TAB + "from orjson import dumps as json_dumps")
+        export.append("except ImportError:")
+        export.append(TAB + "def json_dumps(value):")
+        export.append(TAB * 2 + "return json.dumps(value, separators=(',', ':')).encode('utf-8')")
+        export.append("")
+
+    if used_types.IMPORT_CACHE:
+        export.append("")
+        export.extend(cacheExport())
+        export.append("")
+
+    for table in tables:
+        export.append("")
+        export.append(str(table))
+        export.append("")
+
+    if used_types.IMPORT_CACHE:
+        export.append("")
+        export.extend(cacheListenersExport(tables))
+        export.append("")
+
+    if used_types.IMPORT_INSTRUMENTATION:
+        export.append("")
+        export.extend(instrumentationExport())
+        export.append("")
+
+    fingerprint = None
+    if used_types.IMPORT_DDL_SCRIPT:
+        export.append("")
+        fingerprint = len(export)
+        export.extend(ddlExport())
+        export.append("")
+
+    if used_types.IMPORT_FACTORIES:
+        export.append("")
+        export.extend(factoriesExport(tables))
+        export.append("")
+
+    if used_types.IMPORT_UPSERT:
+        export.append("")
+        export.extend(upsertExport())
+        export.append("")
+
+    if used_types.IMPORT_KEYSET:
+        export.append("")
+        export.extend(keysetExport())
+        export.append("")
+
+    if used_types.IMPORT_ROUTING:
+        export.append("")
+        export.extend(routingExport())
+        export.append("")
+
+    if used_types.IMPORT_SHARDING:
+        export.append("")
+        export.extend(shardingExport(tables))
+        export.append("")
+
+    if fingerprint is not None:
+        export[fingerprint] = export[fingerprint] % schemaFingerprint(export)
+    return export
+
+
+class GenerationHandler(BaseHTTPRequestHandler):
+    """GenerationHandler
+
+    Handles POST requests of a GenerationServer. The body is a JSON object with the path of the model and optionally
+    the options applied to the whole schema: {"model": "/path/model.mwb", "options": "asyncio=True;lazy=raise"}.
+    The response is the generated python file, a 400 for an invalid request and a 500 when the generation fails.
+    """
+
+    def do_POST(self):
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+            export = self.server.generate(request['model'], request.get('options', ''))
+        except (KeyError, ValueError, IOError, OSError) as error:
+            self.send_error(400, str(error))
+            return
+        except Exception as error:
+            self.send_error(500, '%s: %s' % (error.__class__.__name__, error))
+            return
+
+        body = export.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/x-python; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GenerationServer(ThreadingMixIn, HTTPServer):
+    """GenerationServer
+
+    A local HTTP server generating models on request, each request in its own thread. Schema snapshots and exports
+    are kept warm in memory (LRU of max_entries) on top of the SnapshotCache on disk. Snapshots being immutable and
+    every export tracking its own types, the only shared state are those caches, guarded by a lock. Concurrent
+    requests for a model missing from the caches wait for a single load.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, loader, cache_directory, max_entries=64):
+        """Constructor
+
+        Arguments:
+            address {tuple} -- (host, port) to listen on, eg: ('127.0.0.1', 8765)
+            loader {callable} -- Called with the path of a model missing from the caches, returns its SchemaSnapshot
+            cache_directory {str} -- The directory of the SnapshotCache
+
+        Keyword Arguments:
+            max_entries {int} -- The number of snapshots and of exports kept in memory (default: {64})
+        """
+        HTTPServer.__init__(self, address, GenerationHandler)
+        self.loader = loader
+        self.cache = SnapshotCache(cache_directory)
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.snapshots = OrderedDict()
+        self.exports = OrderedDict()
+        self.loading = {}
+
+    def _get(self, entries, key):
+        with self.lock:
+            if key in entries:
+                entries[key] = entries.pop(key)
+                return entries[key]
+        return None
+
+    def _set(self, entries, key, value):
+        with self.lock:
+            entries[key] = value
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+        return value
+
+    def getSchema(self, path):
+        """Snapshot of a model, the file being hashed again only when its size or modification time changes
+
+        Arguments:
+            path {str} -- The path of the model file
+
+        Returns:
+            tuple<tuple, SchemaSnapshot> -- The key of the model file and its snapshot
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+        schema = self._get(self.snapshots, key)
+        if schema is None:
+            with self.lock:
+                loading = self.loading.setdefault(key, threading.Lock())
+            with loading:
+                schema = self._get(self.snapshots, key)
+                if schema is None:
+                    schema = self._set(self.snapshots, key, self.cache.get(path, self.loader))
+            with self.lock:
+                self.loading.pop(key, None)
+        return key, schema
+
+    def generate(self, path, schema_options=''):
+        """Generated python file of a model
+
+        Arguments:
+            path {str} -- The path of the model file
+
+        Keyword Arguments:
+            schema_options {str} -- Options overriding the ones of the schema comment (default: {''})
+
+        Returns:
+            str -- The python file
+        """
+        key, schema = self.getSchema(path)
+        key = key + (tuple(sorted(options(schema_options).items())),)
+        export = self._get(self.exports, key)
+        if export is None:
+            export = '\n'.join(generateExport(schema, options(schema_options), verbose=False))
+            export = self._set(self.exports, key, export)
+        return export
+
+
+def serve(loader, cache_directory, host='127.0.0.1', port=8765):
+    """Runs a GenerationServer until interrupted
+
+    Arguments:
+        loader {callable} -- Called with the path of a model missing from the caches, returns its SchemaSnapshot
+        cache_directory {str} -- The directory of the SnapshotCache
+
+    Keyword Arguments:
+        host {str} -- The host to listen on (default: {'127.0.0.1'})
+        port {int} -- The port to listen on (default: {8765})
+    """
+    server = GenerationServer((host, port), loader, cache_directory)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def copyExportToClipboard(export):
     grt.modules.Workbench.copyToClipboard('\n'.join(export))
     print("-" * 20)
     print("-- SQLAlchemy export v%s" % VERSION)
@@ -749,5 +3727,29 @@ def copyExportToClipboard(export):
     print("Copied to clipboard")
 
 
+def printAdvisorReport(schema):
+    advisor = SchemaAdvisor(schema.tables)
+    print(str(advisor))
+    if grt.root.wb.docPath:
+        advisor.write('%s.advisor' % grt.root.wb.docPath)
+
+
+def writeSchemaCatalog(schema, export):
+    """Writes the catalog of a schema next to the model, in JSON and binary forms
+
+    Arguments:
+        schema {SchemaSnapshot} -- The exported schema
+        export {list<str>} -- The lines of its export, fingerprinted in the catalog
+    """
+    if grt.root.wb.docPath:
+        described = SchemaCatalog(schema, fingerprint=schemaFingerprint(export))
+        described.write('%s.catalog' % grt.root.wb.docPath, binary=True)
+        print("Schema catalog written to %s.catalog.json" % grt.root.wb.docPath)
+
+
 if __name__ == '__main__':
-    copyExportToClipboard(generateExport())
+    SCHEMA = SchemaSnapshot(grt.root.wb.doc.physicalModels[0].catalog.schemata[0])
+    EXPORT = generateExport(SCHEMA)
+    copyExportToClipboard(EXPORT)
+    printAdvisorReport(SCHEMA)
+    writeSchemaCatalog(SCHEMA, EXPORT)
@@ -1,11 +1,58 @@
 
+import asyncio
+import datetime
+import decimal
+import http.client
+import json
+import marshal
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import types
 import unittest
 from mock import MagicMock, patch
 
-from sqlalchemy_grt import AttributeObject, ColumnObject, camelize, functionalize, quote, endsWith, \
-    singular, SqlaType, TableObject, pep8_list, PEP8_LIMIT, TAB, options
+try:
+    import sqlalchemy
+except ImportError:
+    sqlalchemy = None
 
-from grt import get_grt_foreignKey, get_grt_column, get_grt_index, get_grt_table
+try:
+    import aiosqlite
+except ImportError:
+    aiosqlite = None
+
+from sqlalchemy_grt import AttributeObject, ColumnObject, camelize, functionalize, quote, endsWith, generateExport, \
+    singular, DdlSchema, ForeignKeyGraph, GenerationServer, SchemaAdvisor, SchemaCatalog, SchemaSnapshot, \
+    SnapshotCache, SqlaType, TableObject, pep8_list, PEP8_LIMIT, TAB, ddlSnapshot, dumpSnapshot, iterStatements, \
+    loadSnapshot, options, schemaFingerprint, writeSchemaCatalog
+
+import benchmark
+import catalog
+from grt import get_grt_foreignKey, get_grt_column, get_grt_index, get_grt_table, get_grt_partition, get_grt_schema
+
+
+def generate(schema):
+    """Generate a module
+
+    Runs the whole export of a mocked schema and executes the generated code
+
+    Arguments:
+        schema {MagicMock} -- GRT Compatible Schema
+
+    Returns:
+        module -- The generated module
+    """
+    with patch('sqlalchemy_grt.grt.root') as root:
+        root.wb.doc.physicalModels.__getitem__.return_value.catalog.schemata.__getitem__.return_value = schema
+        export = '\n'.join(generateExport())
+
+    module = types.ModuleType('generated')
+    exec(export, module.__dict__)
+    return module
 
 
 class TestUtils(unittest.TestCase):
@@ -118,23 +165,48 @@ class TestGetType(unittest.TestCase):
         int_type = MagicMock(formattedType='INT(12)', flags='UNSIGNED')
         self.assertEquals('INTEGER(unsigned=True)', obj.get(int_type))
         self.assertEquals(1, len(obj.mysql))
-        self.assertEquals(1, len(obj.sqla))
+        self.assertEquals(2, len(obj.sqla))
 
-        self.assertEquals(['Integer'], list(obj.sqla))
+        self.assertEquals(['BigInteger', 'Integer'], sorted(obj.sqla))
         self.assertEquals(['INTEGER'], list(obj.mysql))
 
         int_type = MagicMock(formattedType='INT(12)')
         self.assertEquals('INTEGER', obj.get(int_type))
         self.assertEquals(1, len(obj.mysql))
-        self.assertEquals(1, len(obj.sqla))
+        self.assertEquals(2, len(obj.sqla))
+
+        self.assertEquals("BigInteger().with_variant(Integer(), 'sqlite') if kwargs.get('unsigned') else Integer()",
+                          obj.getPortable('INTEGER'))
+        self.assertEquals("SmallInteger().with_variant(Integer(), 'sqlite')", obj.getPortable('TINYINT'))
 
+    def test_json(self):
+        obj = SqlaType()
+        column = MagicMock(formattedType='json', formattedRawType='json', characterSetName='', collationName='')
+        self.assertEquals('JSON', obj.get(column))
+        self.assertEquals(['JSON as JSON'], list(obj.sqla))
+        self.assertEquals('dict', obj.getPythonType(column))
+
+    def test_portable(self):
+        obj = SqlaType()
+        for sql_type in ['TINYINT(4)', 'BIGINT(20)', 'DECIMAL(10,2)', 'TEXT', 'DATETIME']:
+            obj.get(MagicMock(formattedType=sql_type, characterSetName='', collationName=''))
+
+        self.assertEquals(
+            ['BigInteger', 'DateTime', 'Integer', 'Numeric as DECIMAL', 'SmallInteger', 'Text as TEXT'], sorted(obj.sqla)
+        )
+
+        self.assertEquals(
+            'ENUM(\'new\',\'done\', name="samples_status")',
+            obj.get(get_grt_column('status', 'samples', "ENUM('new','done')"))
+        )
+        self.assertEquals("String(len(','.join(args)))", obj.getPortable('SET'))
 
     def test_var(self):
         obj = SqlaType()
         self.assertEquals(0, len(obj.mysql))
         self.assertEquals(0, len(obj.sqla))
 
-        varchar_type = MagicMock(formattedType='VARCHAR(45)')
+        varchar_type = MagicMock(formattedType='VARCHAR(45)', characterSetName='', collationName='')
         self.assertEquals('VARCHAR(45)', obj.get(varchar_type))
         self.assertEquals(1, len(obj.mysql))
         self.assertEquals(1, len(obj.sqla))
@@ -142,6 +214,23 @@ class TestGetType(unittest.TestCase):
         self.assertEquals('VARCHAR', list(obj.mysql)[0])
         self.assertEquals('String as VARCHAR', list(obj.sqla)[0])
 
+    def test_collation(self):
+        obj = SqlaType()
+        varchar_type = MagicMock(formattedType='VARCHAR(45)', characterSetName='', collationName='')
+        self.assertEquals('VARCHAR(45)', obj.get(varchar_type))
+        self.assertEquals(['String as VARCHAR'], list(obj.sqla))
+
+        varchar_type = MagicMock(formattedType='VARCHAR(64)', characterSetName='ascii', collationName='ascii_bin')
+        self.assertEquals('VARCHAR(64, charset="ascii", collation="ascii_bin")', obj.get(varchar_type))
+        nvarchar_type = MagicMock(formattedType='NVARCHAR(10)', characterSetName='utf8', collationName='utf8_bin')
+        self.assertEquals('NVARCHAR(10, collation="utf8_bin")', obj.get(nvarchar_type))
+        int_type = MagicMock(formattedType='INT(11)', characterSetName='utf8', collationName='utf8_bin')
+        self.assertEquals('INTEGER', obj.get(int_type))
+
+        self.assertEquals(['NVARCHAR', 'VARCHAR'], sorted(obj.collated))
+        self.assertEquals(['BigInteger', 'Integer', 'String', 'Unicode'], sorted(obj.sqla))
+        self.assertEquals('String(*args)', obj.getPortable('VARCHAR'))
+
     def test_bool(self):
         obj = SqlaType()
         self.assertEquals(0, len(obj.mysql))
@@ -204,6 +293,24 @@ class TestColumnObject(unittest.TestCase):
             str(column_obj)
         )
 
+    def test_generated(self):
+        column_obj = ColumnObject(get_grt_column(
+            'name_length', 'test_table', 'INT(11)', defaultValue='0', isNotNull=1,
+            generated=1, generatedStorage='VIRTUAL', expression='CHAR_LENGTH(`name`)'
+        ), index=True)
+
+        self.assertEquals(
+            '    name_length = Column(INTEGER, Computed("CHAR_LENGTH(`name`)", persisted=False), nullable=False, index=True)',
+            str(column_obj)
+        )
+
+        column_obj._column.generatedStorage = 'STORED'
+        column_obj._column.expression = 'data->>"$.name"'
+        self.assertEquals(
+            '    name_length = Column(INTEGER, Computed("data->>\\"$.name\\"", persisted=True), nullable=False, index=True)',
+            str(column_obj)
+        )
+
     def test_backref(self):
         column_obj = ColumnObject(
             get_grt_column('test', 'tables', 'INTEGER', comment="remote_side=remote_test;use_alter=True")
@@ -232,6 +339,63 @@ class TestColumnObject(unittest.TestCase):
             str(column_obj)
         )
 
+    def test_server_defaults(self):
+        column_obj = ColumnObject(
+            get_grt_column('created', 'test_table', 'DATETIME', defaultValue='CURRENT_TIMESTAMP'),
+            server_defaults=True
+        )
+        self.assertEquals('    created = Column(DATETIME, server_default=text("CURRENT_TIMESTAMP"))', str(column_obj))
+
+        column_obj._column.defaultValue = 'CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'
+        self.assertEquals(
+            '    created = Column(DATETIME, server_default=text("CURRENT_TIMESTAMP"), onupdate=datetime.datetime.utcnow)',
+            str(column_obj)
+        )
+
+        column_obj._column.defaultValue = '0'
+        self.assertFalse(column_obj.hasServerDefault())
+        self.assertEquals('    created = Column(DATETIME, default=0)', str(column_obj))
+
+    def test_factory(self):
+        factories = dict([
+            (sql_type, ColumnObject(get_grt_column('test', 'tables', sql_type)).getFactory())
+            for sql_type in ['INT(11)', 'TINYINT(4)', 'BIGINT(20)', 'DECIMAL(5,2)', 'DATETIME', 'VARCHAR(45)', 'TEXT',
+                             'BLOB', "ENUM('a','b','c')"]
+        ])
+        self.assertEquals({
+            'INT(11)': 'i % 2147483647 + 1',
+            'TINYINT(4)': 'i % 127 + 1',
+            'BIGINT(20)': 'i + 1',
+            'DECIMAL(5,2)': 'decimal.Decimal(i % 1000)',
+            'DATETIME': 'datetime.datetime(2000, 1, 1) + datetime.timedelta(seconds=i)',
+            'VARCHAR(45)': "('test-%s' % i)[-45:]",
+            'TEXT': "'test-%s' % i",
+            'BLOB': "('%s' % i).encode('utf-8')",
+            "ENUM('a','b','c')": "('a','b','c',)[i % 3]",
+        }, factories)
+
+        generated = get_grt_column('test', 'tables', 'INT(11)', generated=1, expression='a + b')
+        self.assertIsNone(ColumnObject(generated).getFactory())
+
+    def test_backref_lazy(self):
+        column_obj = ColumnObject(get_grt_column('test', 'tables', 'INTEGER'), lazy='selectin')
+        column_ref = get_grt_column('ref', 'table_refs', 'INTEGER')
+        column_obj.setForeignKey(get_grt_foreignKey('fk_test', referencedColumns=[column_ref]))
+
+        self.assertEquals(
+            '    tableRef = relationship(\n'
+            '        "TableRef", foreign_keys=[test], backref=backref("tables", lazy="selectin"), lazy="selectin"\n'
+            '    )',
+            column_obj.getBackref()
+        )
+
+        column_obj = ColumnObject(get_grt_column('test', 'tables', 'INTEGER', comment="lazy=raise"), lazy='selectin')
+        column_obj.setForeignKey(get_grt_foreignKey('fk_test', referencedColumns=[column_ref]))
+        self.assertEquals(
+            '    tableRef = relationship("TableRef", foreign_keys=[test], backref=backref("tables", lazy="raise"), lazy="raise")',
+            column_obj.getBackref()
+        )
+
     def test_backref_ignore(self):
         column_obj = ColumnObject(get_grt_column('test', 'tables', 'INTEGER', comment="relation=False"))
         column_ref = get_grt_column('ref', 'table_refs', 'INTEGER')
@@ -258,6 +422,18 @@ class TestColumnObject(unittest.TestCase):
 
 class TestTableObject(unittest.TestCase):
 
+    def test_primary_keys(self):
+        id_col = get_grt_column('id_table', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+        name_col = get_grt_column('name', 'table_test', 'VARCHAR(145)')
+        table = get_grt_table('table_test', columns=[id_col, name_col], indices=[
+            get_grt_index('PRIMARY', columns=[id_col])
+        ])
+        for column in table.columns:
+            # the primary key is counted once by the table, not through the owner of every column
+            column.owner = MagicMock(spec=['name'])
+            column.owner.name = 'table_test'
+        self.assertEquals(['id', 'name'], [column.name for column in TableObject(table).columns])
+
     def test_basics(self):
         id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
         name_col = get_grt_column('name', 'table_test', 'VARCHAR(145)', isNotNull=1, comment="toprint=True")
@@ -432,8 +608,8 @@ class TestTableObject(unittest.TestCase):
                 get_grt_index('i_primary', columns=[id_col]),
                 get_grt_index('i_unique_single', 'UNIQUE', columns=[name_col]),
                 get_grt_index('i_index_single', 'INDEX', columns=[description_col]),
-                get_grt_index('i_unique_multi', 'UNIQUE', columns=[unique_1, unique_2]),
-                get_grt_index('i_index_multi', 'INDEX', columns=[index_1, index_2]),
+                get_grt_index('i_unique_multi', 'UNIQUE', columns=[unique_2, unique_1]),
+                get_grt_index('i_index_multi', 'INDEX', columns=[index_2, index_1]),
             ]
         )
         self.maxDiff = None
@@ -442,9 +618,9 @@ class TestTableObject(unittest.TestCase):
             '\n'
             '    __tablename__ = \'table_test\'\n'
             '    __table_args__ = (\n'
-            '        {\'mysql_charset\': \'utf8\', \'sqlite_autoincrement\': True},\n'
             '        UniqueConstraint("unique_1", "unique_2", name="i_unique_multi"),\n'
-            '        Index("index_1", "index_2", name="i_index_multi")\n'
+            '        Index("i_index_multi", "index_2", "index_1"),\n'
+            '        {\'mysql_charset\': \'utf8\', \'sqlite_autoincrement\': True}\n'
             '    )\n'
             '\n'
             '    id = Column(INTEGER, nullable=False, autoincrement=True, primary_key=True)  # pylint: disable=invalid-name\n'
@@ -462,3 +638,1540 @@ class TestTableObject(unittest.TestCase):
             '        return "<TableTest(%(id)s, %(name)s)>" % self.__dict__',
             str(TableObject(table))
         )
+
+    def test_mapper_args(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+        version_col = get_grt_column('row_version', 'table_test', 'INT(11)', isNotNull=1, comment="alias=version")
+
+        table = get_grt_table(
+            'table_test',
+            columns=[id_col, version_col],
+            indices=[get_grt_index('i_test', columns=[id_col])],
+            comment="version=row_version;eager_defaults=True"
+        )
+
+        self.maxDiff = None
+        self.assertEquals(
+            'class TableTest(DECLARATIVE_BASE):\n'
+            '\n'
+            '    __tablename__ = \'table_test\'\n'
+            '    __table_args__ = (\n'
+            '        {\'mysql_charset\': \'utf8\', \'sqlite_autoincrement\': True}\n'
+            '    )\n'
+            '\n'
+            '    id = Column(INTEGER, nullable=False, autoincrement=True, primary_key=True)  # pylint: disable=invalid-name\n'
+            '    version = Column("row_version", INTEGER, nullable=False)\n'
+            '\n'
+            '    __mapper_args__ = {\'version_id_col\': version, \'eager_defaults\': True}\n'
+            '\n'
+            '    def __repr__(self):\n'
+            '        return self.__str__()\n'
+            '\n'
+            '    def __str__(self):\n'
+            '        return "<TableTest(%(id)s)>" % self.__dict__',
+            str(TableObject(table))
+        )
+
+        table.comment = "version=row_version;version_generator=uuid;confirm_deleted_rows=False"
+        self.assertEquals(
+            {
+                'version_id_col': 'version',
+                'version_id_generator': 'lambda version: uuid.uuid4().hex',
+                'confirm_deleted_rows': 'False'
+            },
+            TableObject(table).mapper_args
+        )
+
+        table.comment = "version=row_version;version_generator=server;eager_defaults=auto;confirm_deleted_rows=x()"
+        table_obj = TableObject(table)
+        self.assertEquals(
+            {
+                'version_id_col': 'version',
+                'version_id_generator': 'False',
+                'eager_defaults': "'auto'",
+                'confirm_deleted_rows': "'x()'"
+            },
+            table_obj.mapper_args
+        )
+        self.assertEquals(
+            '    version = Column(\n'
+            '        "row_version", INTEGER, nullable=False, server_default=FetchedValue(), server_onupdate=FetchedValue()\n'
+            '    )',
+            str(table_obj.columns[1])
+        )
+        self.assertTrue(table_obj.types.IMPORT_FETCHED_VALUE)
+
+        table.comment = "version=unknown"
+        table_obj = TableObject(table)
+        self.assertEquals({}, table_obj.mapper_args)
+        self.assertEquals(['Version column unknown not found'], table_obj.comments)
+
+    def test_cache(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+
+        table = get_grt_table(
+            'table_test',
+            columns=[id_col],
+            indices=[get_grt_index('i_test', columns=[id_col])],
+            comment="cache=300"
+        )
+
+        self.assertEquals(
+            'class TableTest(DECLARATIVE_BASE, CachedMixin):\n'
+            '\n'
+            '    __tablename__ = \'table_test\'\n'
+            '    __table_args__ = (\n'
+            '        {\'mysql_charset\': \'utf8\', \'sqlite_autoincrement\': True}\n'
+            '    )\n'
+            '    __cache_ttl__ = 300\n'
+            '\n'
+            '    id = Column(INTEGER, nullable=False, autoincrement=True, primary_key=True)  # pylint: disable=invalid-name\n'
+            '\n'
+            '    def __repr__(self):\n'
+            '        return self.__str__()\n'
+            '\n'
+            '    def __str__(self):\n'
+            '        return "<TableTest(%(id)s)>" % self.__dict__',
+            str(TableObject(table))
+        )
+
+    def test_storage_options(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+
+        table = get_grt_table(
+            'table_test',
+            columns=[id_col],
+            indices=[get_grt_index('i_test', columns=[id_col])],
+            comment="key_block_size=4;checksum=0",
+            rowFormat='COMPRESSED',
+            keyBlockSize='8',
+            checksum=1,
+            statsSamplePages=20
+        )
+        table_obj = TableObject(table)
+        self.assertEquals('COMPRESSED', table_obj.table_args['mysql_row_format'])
+        self.assertEquals('4', table_obj.table_args['mysql_key_block_size'])
+        self.assertEquals('0', table_obj.table_args['mysql_checksum'])
+        self.assertEquals('20', table_obj.table_args['mysql_stats_sample_pages'])
+        self.assertNotIn('mysql_pack_keys', table_obj.table_args)
+        self.assertNotIn('mysql_delay_key_write', table_obj.table_args)
+
+    def test_collation(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+        token = get_grt_column('token', 'table_test', 'CHAR(32)', characterSetName='ascii', collationName='ascii_bin')
+
+        table = get_grt_table(
+            'table_test', columns=[id_col, token], indices=[get_grt_index('i_test', columns=[id_col])],
+            charset='utf8mb4', defaultCollationName='utf8mb4_unicode_ci'
+        )
+        table_obj = TableObject(table)
+        self.assertEquals('utf8mb4', table_obj.table_args['mysql_charset'])
+        self.assertEquals('utf8mb4_unicode_ci', table_obj.table_args['mysql_collate'])
+        self.assertEquals('CHAR(32, charset="ascii", collation="ascii_bin")', table_obj.columns[1].column_type)
+
+        table = get_grt_table('table_test', columns=[id_col], indices=[get_grt_index('i_test', columns=[id_col])],
+                              charset='')
+        get_grt_schema('test', tables=[table]).defaultCollationName = 'utf8_bin'
+        self.assertEquals('utf8_bin', TableObject(table).table_args['mysql_collate'])
+
+    def test_partitions(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+
+        table = get_grt_table(
+            'table_test',
+            columns=[id_col],
+            indices=[get_grt_index('i_test', columns=[id_col])],
+            partitionType='HASH',
+            partitionExpression='id',
+            partitionCount=4
+        )
+        table_obj = TableObject(table)
+        self.assertEquals('HASH(id)', table_obj.table_args['mysql_partition_by'])
+        self.assertEquals('4', table_obj.table_args['mysql_partitions'])
+        self.assertNotIn('mysql_subpartition_by', table_obj.table_args)
+
+        table = get_grt_table(
+            'table_test',
+            columns=[id_col],
+            indices=[get_grt_index('i_test', columns=[id_col])],
+            partitionType='RANGE',
+            partitionExpression='TO_DAYS(created)',
+            partitionCount=2,
+            partitionDefinitions=[
+                get_grt_partition('p201901', "TO_DAYS('2019-02-01')", subpartitions=['s0', 's1']),
+                get_grt_partition('pmax', 'MAXVALUE', subpartitions=['s2', 's3']),
+            ],
+            subpartitionType='HASH',
+            subpartitionExpression='id',
+            subpartitionCount=2
+        )
+        table_obj = TableObject(table)
+        self.assertEquals('RANGE(TO_DAYS(created))', table_obj.table_args['mysql_partition_by'])
+        self.assertNotIn('mysql_partitions', table_obj.table_args)
+        self.assertEquals('HASH(id)', table_obj.table_args['mysql_subpartition_by'])
+        self.assertEquals(
+            "2 (PARTITION p201901 VALUES LESS THAN (TO_DAYS('2019-02-01')) (SUBPARTITION s0, SUBPARTITION s1), "
+            "PARTITION pmax VALUES LESS THAN MAXVALUE (SUBPARTITION s2, SUBPARTITION s3))",
+            table_obj.table_args['mysql_subpartitions']
+        )
+
+    def test_rowtype(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+        name_col = get_grt_column('name', 'table_test', 'VARCHAR(145)', isNotNull=1)
+        price_col = get_grt_column('price', 'table_test', 'DECIMAL(10,2)')
+
+        table = get_grt_table(
+            'table_test',
+            columns=[id_col, name_col, price_col],
+            indices=[get_grt_index('i_test', columns=[id_col])],
+            comment="rowtype=True"
+        )
+
+        self.maxDiff = None
+        self.assertEquals(
+            'class TableTestRow(NamedTuple):\n'
+            '\n'
+            '    id: int\n'
+            '    name: str\n'
+            '    price: Optional[decimal.Decimal]\n'
+            '\n'
+            '    @staticmethod\n'
+            '    def select(*whereclause):\n'
+            '        return select(TableTest.id, TableTest.name, TableTest.price).where(*whereclause)\n'
+            '\n'
+            '    @classmethod\n'
+            '    def fetch(cls, connection, *whereclause):\n'
+            '        return [cls._make(row) for row in connection.execute(cls.select(*whereclause))]',
+            TableObject(table).rowTypeStr()
+        )
+
+    def test_json(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+        name_col = get_grt_column('name', 'table_test', 'VARCHAR(145)', isNotNull=1, comment='alias=label')
+        created_col = get_grt_column('created', 'table_test', 'DATETIME', isNotNull=1)
+        price_col = get_grt_column('price', 'table_test', 'DECIMAL(10,2)')
+
+        table = get_grt_table(
+            'table_test',
+            columns=[id_col, name_col, created_col, price_col],
+            indices=[get_grt_index('i_test', columns=[id_col])],
+            comment="json=True"
+        )
+
+        self.maxDiff = None
+        self.assertEquals(
+            '    def to_json_dict(self):\n'
+            '        return {\n'
+            "            'id': self.id,\n"
+            "            'label': self.label,\n"
+            "            'created': self.created.isoformat(),\n"
+            "            'price': None if self.price is None else str(self.price),\n"
+            '        }\n'
+            '\n'
+            '    def to_json(self):\n'
+            '        return json_dumps(self.to_json_dict())\n'
+            '\n'
+            '    @staticmethod\n'
+            '    def json_row(row):\n'
+            '        return {\n'
+            "            'id': row[0],\n"
+            "            'label': row[1],\n"
+            "            'created': row[2].isoformat(),\n"
+            "            'price': None if row[3] is None else str(row[3]),\n"
+            '        }\n'
+            '\n'
+            '    @classmethod\n'
+            '    def json_batch(cls, results):\n'
+            '        return json_dumps([\n'
+            '            result.to_json_dict() if isinstance(result, cls) else cls.json_row(result)\n'
+            '            for result in results\n'
+            '        ])',
+            TableObject(table).jsonStr()
+        )
+
+    def test_pages(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+        created_col = get_grt_column('created', 'table_test', 'DATETIME', isNotNull=1)
+        name_col = get_grt_column('name', 'table_test', 'VARCHAR(45)', isNotNull=1, comment='alias=label')
+        indices = [
+            get_grt_index('PRIMARY', columns=[id_col]),
+            get_grt_index('i_name_created', index_type='INDEX', columns=[name_col, created_col]),
+        ]
+
+        table = get_grt_table('table_test', columns=[id_col, created_col, name_col], indices=indices,
+                              comment='paginate=i_name_created')
+        self.assertEquals(
+            '    @classmethod\n'
+            '    def page(cls, session, cursor=None, size=100, where=()):\n'
+            '        return keyset_page(session, cls, (cls.id,), cursor, size, where)\n'
+            '\n'
+            '    @classmethod\n'
+            '    def page_by_i_name_created(cls, session, cursor=None, size=100, where=()):\n'
+            '        return keyset_page(session, cls, (cls.label, cls.created, cls.id), cursor, size, where)',
+            TableObject(table).pagesStr()
+        )
+
+        table = get_grt_table('table_test', columns=[id_col, created_col, name_col], indices=indices)
+        self.assertEquals([], TableObject(table).pages)
+
+        table = get_grt_table('table_test', columns=[id_col, created_col, name_col], indices=indices,
+                              comment='paginate=i_unknown')
+        table_obj = TableObject(table)
+        self.assertEquals(['page'], [name for name, _ in table_obj.pages])
+        self.assertEquals(['Pagination index i_unknown not found'], table_obj.comments)
+
+        code_col = get_grt_column('code', 'table_test', 'VARCHAR(45)')
+        table = get_grt_table('table_test', columns=[id_col, created_col, code_col], comment='paginate=i_code', indices=[
+            indices[0], get_grt_index('i_code', index_type='INDEX', columns=[code_col, created_col])
+        ])
+        table_obj = TableObject(table)
+        self.assertEquals(['page'], [name for name, _ in table_obj.pages])
+        self.assertEquals(['Pagination index i_code ignored, code nullable'], table_obj.comments)
+
+        table = get_grt_table('table_test', columns=[id_col, created_col, name_col], indices=indices[1:],
+                              comment='paginate=True')
+        table_obj = TableObject(table)
+        self.assertEquals([], table_obj.pages)
+        self.assertEquals(['Pagination ignored, no primary key'], table_obj.comments)
+
+    def test_upsert(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+        email_col = get_grt_column('email', 'table_test', 'VARCHAR(145)', isNotNull=1)
+        tenant_col = get_grt_column('tenant', 'table_test', 'INT(11)', isNotNull=1, comment='alias=tenant_id')
+        indices = [
+            get_grt_index('PRIMARY', columns=[id_col]),
+            get_grt_index('u_tenant_email', index_type='UNIQUE', columns=[tenant_col, email_col]),
+        ]
+
+        table = get_grt_table('table_test', columns=[id_col, email_col, tenant_col], indices=indices)
+        self.assertEquals([], TableObject(table).upsert_key)
+
+        table = get_grt_table('table_test', columns=[id_col, email_col, tenant_col], indices=indices,
+                              comment='upsert=True')
+        self.assertEquals(
+            '    @classmethod\n'
+            '    def upsert(cls, bind, rows, update=None, batch_size=1000):\n'
+            "        return upsert(bind, cls, rows, ('tenant_id', 'email'), update, batch_size)",
+            TableObject(table).upsertStr()
+        )
+
+        table = get_grt_table('table_test', columns=[id_col, email_col, tenant_col], indices=indices,
+                              comment='upsert=PRIMARY')
+        self.assertEquals(['id'], TableObject(table).upsert_key)
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_schema(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_locality_customer = get_grt_column('id_locality', 'customers', 'INT(11)', isNotNull=1)
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_country = get_grt_column('id', 'countries', 'INT(11)', isNotNull=1)
+        get_grt_table('countries', columns=[id_country])
+
+        tables = [
+            get_grt_table(
+                'customers', columns=[id_customer, id_locality_customer],
+                indices=[get_grt_index('i_c', columns=[id_customer])],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_customers_localities', columns=[id_locality_customer], referencedColumns=[id_locality]
+                )], partitionType='HASH', partitionDefinitions=[get_grt_partition('p0', subpartitions=['s0'])]
+            ),
+            get_grt_table(
+                'localities', columns=[id_locality], indices=[get_grt_index('i_l', columns=[id_locality])],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_localities_countries', columns=[id_locality], referencedColumns=[id_country]
+                )]
+            ),
+        ]
+        snapshot = SchemaSnapshot(get_grt_schema('test', tables=tables, comment='asyncio=True'))
+        customers, localities = snapshot.tables
+
+        self.assertEquals(['customers', 'localities'], [t.name for t in snapshot.tables])
+        self.assertIs(snapshot, customers.owner)
+        self.assertEquals('asyncio=True', customers.owner.comment)
+        self.assertIs(customers, customers.columns[0].owner)
+        self.assertIs(customers.columns[0], customers.indices[0].columns[0].referencedColumn)
+        self.assertIs(customers.columns[1], customers.foreignKeys[0].columns[0])
+        self.assertIs(localities.columns[0], customers.foreignKeys[0].referencedColumns[0])
+        self.assertEquals('countries', localities.foreignKeys[0].referencedColumns[0].owner.name)
+        self.assertEquals(['s0'], [p.name for p in customers.partitionDefinitions[0].subpartitionDefinitions])
+        self.assertIs(sys.intern('id_locality'), customers.columns[1].name)
+
+        with self.assertRaises(AttributeError):
+            customers.name = 'other'
+        with self.assertRaises(AttributeError):
+            customers.columns[0].extra = True
+
+        table_obj = TableObject(customers)
+        self.assertEquals(str(TableObject(tables[0])), str(table_obj))
+
+    def test_cache(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', comment='', isNotNull=1, autoIncrement=1)
+        id_locality_customer = get_grt_column('id_locality', 'customers', 'INT(11)', comment='alias=locality_id')
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', comment='', isNotNull=1, autoIncrement=1)
+        id_country = get_grt_column('id', 'countries', 'INT(11)', comment='', isNotNull=1)
+        get_grt_table('countries', columns=[id_country], comment='')
+
+        tables = [
+            get_grt_table(
+                'customers', columns=[id_customer, id_locality_customer], comment='rowtype=True',
+                indices=[get_grt_index('i_c', columns=[id_customer])],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_customers_localities', columns=[id_locality_customer], referencedColumns=[id_locality]
+                )], partitionType='HASH', partitionDefinitions=[get_grt_partition('p0', subpartitions=['s0'])]
+            ),
+            get_grt_table(
+                'localities', columns=[id_locality], comment='', indices=[get_grt_index('i_l', columns=[id_locality])],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_localities_countries', columns=[id_locality], referencedColumns=[id_country]
+                )]
+            ),
+        ]
+        snapshot = SchemaSnapshot(get_grt_schema('test', tables=tables, comment='asyncio=True'))
+
+        loaded = loadSnapshot(dumpSnapshot(snapshot))
+        self.assertEquals('asyncio=True', loaded.comment)
+        self.assertEquals([str(TableObject(t)) for t in snapshot.tables], [str(TableObject(t)) for t in loaded.tables])
+        self.assertIs(loaded.tables[1].columns[0], loaded.tables[0].foreignKeys[0].referencedColumns[0])
+        self.assertEquals('countries', loaded.tables[1].foreignKeys[0].referencedColumns[0].owner.name)
+        self.assertEquals(['s0'], [p.name for p in loaded.tables[0].partitionDefinitions[0].subpartitionDefinitions])
+
+        directory = tempfile.mkdtemp()
+        try:
+            model = os.path.join(directory, 'model.mwb')
+            with open(model, 'w') as model_file:
+                model_file.write('model')
+            loader = MagicMock(return_value=snapshot)
+            cache = SnapshotCache(os.path.join(directory, 'cache'))
+
+            self.assertIs(snapshot, cache.get(model, loader))
+            cached = cache.get(model, loader)
+            self.assertEquals(1, loader.call_count)
+            self.assertEquals(['customers', 'localities'], [t.name for t in cached.tables])
+
+            with open(model, 'w') as model_file:
+                model_file.write('model changed')
+            cache.max_size = 0
+            cache.get(model, loader)
+            self.assertEquals(2, loader.call_count)
+            self.assertEquals([os.path.basename(cache.getPath(model))], os.listdir(cache.directory))
+
+            data = dumpSnapshot(snapshot)
+            old_layouts = [marshal.dumps(layout) for layout in [
+                ([], [(('t',),)], []),
+                ([], [(('t',), [], [('i', 'INDEX', [('t', 'x')])], [], [])], []),
+                ([], [], [(0, 5, 0, 0)]),
+                ([], [((1,), [], [], [], [])], []),
+            ]]
+            for content in [b'', data[:len(data) // 2], b'corrupt' + data] + old_layouts:
+                with open(cache.getPath(model), 'wb') as snapshot_file:
+                    snapshot_file.write(content)
+                calls = loader.call_count
+                self.assertIs(snapshot, cache.get(model, loader))
+                self.assertEquals(calls + 1, loader.call_count)
+                self.assertEquals(
+                    ['customers', 'localities'], [t.name for t in cache.get(model, loader).tables]
+                )
+                self.assertEquals(calls + 1, loader.call_count)
+
+            with patch('sqlalchemy_grt.ForeignKeySnapshot.FIELDS', ('name', 'deleteRule')):
+                self.assertNotEquals(os.path.basename(cache.getPath(model)), os.listdir(cache.directory)[0])
+            with patch('sqlalchemy_grt.PartitionSnapshot.FIELDS', ('name',)):
+                self.assertNotEquals(os.path.basename(cache.getPath(model)), os.listdir(cache.directory)[0])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_ddl(self):
+        script = [
+            '-- MySQL dump\n',
+            '/*!40101 SET NAMES utf8 */;\n',
+            'CREATE TABLE `customers` (\n',
+            "  `id` int(11) unsigned NOT NULL AUTO_INCREMENT COMMENT 'a; b',\n",
+            "  `id_locality` int(11) unsigned NOT NULL COMMENT 'alias=locality_id', # comment\n",
+            "  `total` decimal(10,2) NOT NULL DEFAULT '0.00',\n",
+            '  `token` char(32) CHARACTER SET ascii COLLATE ascii_bin DEFAULT NULL,\n',
+            '  `doubled` decimal(10,2) GENERATED ALWAYS AS ((`total` * 2)) STORED,\n',
+            '  PRIMARY KEY (`id`),\n',
+            '  KEY `fk_customers_localities` (`id_locality`),\n',
+            '  CONSTRAINT `fk_customers_localities` FOREIGN KEY (`id_locality`) REFERENCES `localities` (`id`)\n',
+            '    ON DELETE CASCADE\n',
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin ROW_FORMAT=COMPRESSED COMMENT='cache=300';\n",
+            'DELIMITER ;;\n',
+            'CREATE TRIGGER t BEFORE INSERT ON customers FOR EACH ROW BEGIN SET NEW.total = 1; END ;;\n',
+            'DELIMITER ;\n',
+            'CREATE TABLE localities (id int(11) unsigned NOT NULL PRIMARY KEY, name varchar(45) UNIQUE,\n',
+            '  code varchar(100), name_length int AS (char_length (`name`)), data json, UNIQUE KEY u_code (code(10)))',
+        ]
+        self.assertEquals(
+            ['CREATE TABLE `customers`', 'CREATE TRIGGER t', 'CREATE TABLE localities'],
+            [' '.join(statement.split()[:3]) for statement in iterStatements(script)]
+        )
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'shop.sql')
+            with open(path, 'w') as script_file:
+                script_file.writelines(script)
+            snapshot = ddlSnapshot(path)
+        finally:
+            shutil.rmtree(directory)
+
+        self.assertEquals('shop', snapshot.name)
+        self.assertEquals(['customers', 'localities'], [t.name for t in snapshot.tables])
+        customers, localities = snapshot.tables
+        self.assertEquals('a; b', customers.columns[0].comment)
+        self.assertEquals(('UNSIGNED',), customers.columns[0].flags)
+        self.assertEquals("'0.00'", customers.columns[2].defaultValue)
+        self.assertEquals(
+            [('PRIMARY', 'PRIMARY'), ('name', 'UNIQUE'), ('u_code', 'UNIQUE')],
+            [(i.name, i.indexType) for i in localities.indices]
+        )
+        self.assertEquals([0, 0, 10], [i.columns[0].columnLength for i in localities.indices])
+        self.assertEquals(10, loadSnapshot(dumpSnapshot(snapshot)).tables[1].indices[2].columns[0].columnLength)
+        self.assertEquals('char_length(`name`)', localities.columns[3].expression)
+        locality = str(TableObject(localities))
+        self.assertIn(
+            '    __table_args__ = (\n'
+            '        Index("u_code", "code", unique=True, mysql_length={"code": 10}),\n'
+            '        {}\n'
+            '    )\n',
+            locality
+        )
+        self.assertIn('    code = Column(VARCHAR(100))\n', locality)
+        self.assertIn('    data = Column(JSON)\n', locality)
+        self.assertIsNone(localities.defaultCharacterSetName)
+        self.assertIs(localities.columns[0], customers.foreignKeys[0].referencedColumns[0])
+        self.assertEquals(
+            'class Customer(DECLARATIVE_BASE, CachedMixin):\n'
+            '\n'
+            '    __tablename__ = \'customers\'\n'
+            '    __table_args__ = (\n'
+            '        {\'mysql_engine\': \'InnoDB\', \'mysql_charset\': \'utf8mb4\', \'mysql_collate\': \'utf8mb4_bin\', '
+            '\'sqlite_autoincrement\': True, \'mysql_row_format\': \'COMPRESSED\'},\n'
+            '    )\n'
+            '    __cache_ttl__ = 300\n'
+            '\n'
+            '    id = Column(  # pylint: disable=invalid-name\n'
+            '        INTEGER(unsigned=True), nullable=False, autoincrement=True, primary_key=True\n'
+            '    )\n'
+            '    locality_id = Column(\n'
+            '        "id_locality", INTEGER(unsigned=True),\n'
+            '        ForeignKey("localities.id", name="fk_customers_localities", ondelete="CASCADE"), nullable=False, '
+            'index=True\n'
+            '    )\n'
+            '    total = Column(DECIMAL(10,2), nullable=False, default=\'0.00\')\n'
+            '    token = Column(CHAR(32, charset="ascii", collation="ascii_bin"))\n'
+            '    doubled = Column(DECIMAL(10,2), Computed("(`total` * 2)", persisted=True))\n'
+            '\n'
+            '    locality = relationship("Locality", foreign_keys=[locality_id], backref="customers")\n'
+            '\n'
+            '    def __repr__(self):\n'
+            '        return self.__str__()\n'
+            '\n'
+            '    def __str__(self):\n'
+            '        return "<Customer(%(id)s)>" % self.__dict__',
+            str(TableObject(customers))
+        )
+
+
+class TestSchemaAdvisor(unittest.TestCase):
+
+    def test_report(self):
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+        code = get_grt_column('code', 'localities', 'VARCHAR(20)', isNotNull=1)
+        name = get_grt_column('name', 'localities', 'VARCHAR(300)', isNotNull=1)
+        id_locality_customer = get_grt_column('id_locality', 'customers', 'BIGINT(20)', isNotNull=1)
+        email = get_grt_column('email', 'customers', 'VARCHAR(45)', isNotNull=1)
+        amount = get_grt_column('amount', 'customers', 'DECIMAL(10,2)')
+
+        tables = [
+            get_grt_table(
+                'customers', columns=[id_locality_customer, email, amount],
+                indices=[
+                    get_grt_index('i_l', 'INDEX', columns=[id_locality_customer]),
+                    get_grt_index('i_le', 'INDEX', columns=[id_locality_customer, email]),
+                ],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_customers_localities', columns=[id_locality_customer], referencedColumns=[id_locality]
+                )]
+            ),
+            get_grt_table(
+                'localities', columns=[id_locality, code, name], charset='utf8mb4',
+                indices=[get_grt_index('p', columns=[code]), get_grt_index('u', 'UNIQUE', columns=[name])]
+            ),
+        ]
+        for table in tables:
+            for column in table.columns:
+                column.owner = table
+
+        advisor = SchemaAdvisor(tables)
+        self.assertEquals([
+            ('customers', 'no_primary_key'),
+            ('customers', 'redundant_index'),
+            ('customers', 'foreign_key_mismatch'),
+            ('localities', 'wide_primary_key'),
+            ('localities', 'variable_primary_key'),
+            ('localities', 'oversized_index_column'),
+        ], [(issue['table'], issue['check']) for issue in advisor.issues])
+        self.assertEquals({
+            'customers': {'row_width': 149, 'index_widths': {'i_l': 14, 'i_le': 150}},
+            'localities': {'row_width': 1287, 'index_widths': {'p': 81, 'u': 1283}},
+        }, json.loads(advisor.toJson())['tables'])
+        self.assertEquals(
+            'customers: row ~149 bytes, index entries i_l ~14 bytes, i_le ~150 bytes\n'
+            '    [no_primary_key] no primary key, InnoDB clusters rows on a hidden 6 bytes row id\n'
+            '    [redundant_index] index i_l is a left prefix of i_le\n'
+            '    [foreign_key_mismatch] id_locality is BIGINT(20) while localities.id is INT(11)',
+            str(advisor).split('\nlocalities')[0]
+        )
+
+    def test_foreign_schema(self):
+        schema = DdlSchema('shop')
+        schema.read([
+            'CREATE TABLE customers (id int NOT NULL PRIMARY KEY, code varchar(10),\n',
+            '  CONSTRAINT fk_country FOREIGN KEY (code) REFERENCES countries (code)) DEFAULT CHARSET=utf8;\n',
+        ])
+        snapshot = schema.getSnapshot()
+        country = snapshot.tables[0].foreignKeys[0].referencedColumns[0]
+        self.assertIsNone(country.owner.owner)
+
+        advisor = SchemaAdvisor(snapshot.tables)
+        self.assertEquals(None, advisor.columnCharset(country))
+        self.assertEquals(41, advisor.columnWidth(country))
+        self.assertEquals([], [issue['check'] for issue in advisor.issues if issue['table'] == 'customers'])
+
+    def test_charsets(self):
+        code = get_grt_column('code', 'localities', 'CHAR(10)', characterSetName='ascii')
+        name = get_grt_column('name', 'localities', 'CHAR(10)')
+        latin = get_grt_table('localities', columns=[code, name], charset='latin1')
+        inherited = get_grt_table('countries', columns=[get_grt_column('name', 'countries', 'CHAR(10)')], charset='')
+        unknown = get_grt_table('regions', columns=[get_grt_column('name', 'regions', 'CHAR(10)')], charset='')
+        get_grt_schema('test', tables=[latin, inherited])
+        unknown.owner = MagicMock(defaultCharacterSetName='')
+        for table in (latin, inherited, unknown):
+            for column in table.columns:
+                column.owner = table
+
+        advisor = SchemaAdvisor([latin, inherited, unknown])
+        self.assertEquals(
+            [('ascii', 10), ('latin1', 10), ('utf8', 30), (None, 40)],
+            [(advisor.columnCharset(c), advisor.columnWidth(c)) for c in
+             [code, name] + inherited.columns + unknown.columns]
+        )
+
+
+class TestSchemaCatalog(unittest.TestCase):
+
+    def setUp(self):
+        schema = DdlSchema('shop', comment='lazy=selectin')
+        schema.read([
+            'CREATE TABLE localities (id int(11) NOT NULL AUTO_INCREMENT PRIMARY KEY, name varchar(45));\n',
+            'CREATE TABLE `groups` (id int(11) NOT NULL PRIMARY KEY);\n',
+            'CREATE TABLE customers (\n',
+            "  id_customer int(11) unsigned NOT NULL AUTO_INCREMENT COMMENT 'toprint=True',\n",
+            "  id_locality int(11) DEFAULT NULL COMMENT 'fkname=town;backrefname=people',\n",
+            "  email varchar(45) NOT NULL,\n",
+            "  created datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,\n",
+            '  PRIMARY KEY (id_customer),\n',
+            '  UNIQUE KEY u_email (email),\n',
+            '  CONSTRAINT fk_locality FOREIGN KEY (id_locality) REFERENCES localities (id) ON DELETE SET NULL\n',
+            ") COMMENT='upsert=True';\n",
+            'CREATE TABLE customers_groups (\n',
+            '  id_customer int(11) unsigned NOT NULL, id_group int(11) NOT NULL,\n',
+            '  PRIMARY KEY (id_customer, id_group),\n',
+            '  FOREIGN KEY (id_customer) REFERENCES customers (id_customer),\n',
+            '  FOREIGN KEY (id_group) REFERENCES `groups` (id)\n',
+            ');\n',
+        ])
+        self.schema = schema.getSnapshot()
+
+    def test_catalog(self):
+        described = SchemaCatalog(self.schema)
+        export = '\n'.join(generateExport(self.schema))
+        self.assertEquals(schemaFingerprint(export.split('\n')), described.catalog['fingerprint'])
+        with patch('sqlalchemy_grt.generateExport') as generate_export:
+            self.assertEquals('f' * 40, SchemaCatalog(self.schema, fingerprint='f' * 40).catalog['fingerprint'])
+        self.assertFalse(generate_export.called)
+        self.assertEquals({'lazy': 'selectin'}, described.catalog['options'])
+
+        tables = dict([(table['name'], table) for table in described.catalog['tables']])
+        self.assertEquals(
+            ['localities', 'groups', 'customers', 'customers_groups'],
+            [table['name'] for table in described.catalog['tables']]
+        )
+        customers = tables['customers']
+        self.assertEquals('Customer', customers['class'])
+        self.assertEquals({'upsert': 'True'}, customers['options'])
+        self.assertEquals(['id_customer'], customers['primary_key'])
+        self.assertEquals([
+            {'name': 'PRIMARY', 'type': 'PRIMARY', 'columns': ['id_customer']},
+            {'name': 'u_email', 'type': 'UNIQUE', 'columns': ['email']},
+        ], customers['indices'])
+        self.assertEquals([{
+            'name': 'fk_locality', 'columns': ['id_locality'], 'table': 'localities', 'referenced_columns': ['id'],
+            'on_delete': 'SET NULL', 'on_update': 'NO ACTION', 'use_alter': False,
+        }], customers['foreign_keys'])
+        self.assertEquals({
+            'name': 'id_customer', 'attribute': 'id', 'type': 'INTEGER(unsigned=True)', 'sql_type': 'INT(11) UNSIGNED',
+            'python_type': 'int', 'nullable': False, 'primary_key': True, 'autoincrement': True, 'unique': False,
+            'index': False, 'default': None, 'computed': None, 'options': {'toprint': 'True'},
+        }, customers['columns'][0])
+        self.assertEquals('CURRENT_TIMESTAMP', customers['columns'][3]['default'])
+        self.assertEquals([{
+            'name': 'town', 'class': 'Locality', 'table': 'localities', 'foreign_keys': ['id_locality'],
+            'secondary': None, 'uselist': False, 'backref': 'people', 'backref_uselist': True,
+        }, {
+            'name': 'groups', 'class': 'Group', 'table': 'groups', 'foreign_keys': [], 'secondary': 'customers_groups',
+            'uselist': True, 'backref': 'customers', 'backref_uselist': True,
+        }], customers['relationships'])
+        self.assertTrue(tables['customers_groups']['association'])
+        self.assertEquals([], tables['customers_groups']['relationships'])
+
+    def test_loader(self):
+        described = SchemaCatalog(self.schema)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'shop.mwb.catalog')
+            described.write(path)
+            self.assertEquals(['shop.mwb.catalog.json'], os.listdir(directory))
+            from_json = catalog.load(path)
+            described.write(path, binary=True)
+            from_binary = catalog.load(path)
+            self.assertEquals(described.catalog, from_json.data)
+            self.assertEquals(described.catalog, from_binary.data)
+
+            # a JSON only write drops the binary catalog of a previous one
+            described.write(path)
+            self.assertEquals(['shop.mwb.catalog.json'], os.listdir(directory))
+            described.write(path, binary=True)
+
+            with open('%s.marshal' % path, 'r+b') as binary:
+                binary.seek(len(catalog.MAGIC))
+                binary.write(bytes([255]))
+            self.assertEquals(described.catalog, catalog.load(path).data)
+            self.assertRaises(ValueError, catalog.load, '%s.marshal' % path)
+
+            output = subprocess.check_output([sys.executable, '-c', (
+                'import sys; sys.path.insert(0, %r); import catalog; catalog.load(%r); '
+                'print(sorted(set(["sqlalchemy", "sqlalchemy_grt"]) & set(sys.modules)))'
+            ) % (os.path.dirname(os.path.abspath(catalog.__file__)), path)])
+            self.assertEquals('[]', output.decode('utf-8').strip())
+
+            with patch('sqlalchemy_grt.grt.root') as root, patch('sys.stdout'):
+                root.wb.docPath = os.path.join(directory, 'model.mwb')
+                export = generateExport(self.schema, verbose=False)
+                writeSchemaCatalog(self.schema, export)
+            self.assertEquals(
+                schemaFingerprint(export), catalog.load(os.path.join(directory, 'model.mwb.catalog')).fingerprint
+            )
+        finally:
+            shutil.rmtree(directory)
+
+        shop = from_json
+        self.assertEquals(4, len(shop))
+        self.assertEquals(shop['customers'], shop['Customer'])
+        self.assertIn('CustomersGroup', shop)
+        self.assertEquals('id_customer', shop.column('Customer', 'id')['name'])
+        self.assertIsNone(shop.column('customers', 'missing'))
+        self.assertEquals(['customers'], [table['name'] for table in shop.referencing('localities')])
+        self.assertEquals(['customers_groups'], [table['name'] for table in shop.referencing('Customer')])
+        self.assertRaises(ValueError, catalog.Catalog, dict(described.catalog, format=catalog.FORMAT + 1))
+
+
+@unittest.skipIf(sqlalchemy is None, 'sqlalchemy is required to execute the generated code')
+class TestGeneratedCode(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def engine(self, name):
+        return sqlalchemy.create_engine('sqlite:///%s' % os.path.join(self.directory, '%s.db' % name))
+
+    def test_portable_types(self):
+        columns = [
+            get_grt_column('id', 'samples', 'INT(11)', isNotNull=1, autoIncrement=1, flags=['UNSIGNED']),
+            get_grt_column('flag', 'samples', 'TINYINT(1)'),
+            get_grt_column('small', 'samples', 'SMALLINT(6)', flags=['UNSIGNED']),
+            get_grt_column('big', 'samples', 'BIGINT(20)'),
+            get_grt_column('year', 'samples', 'YEAR(4)'),
+            get_grt_column('amount', 'samples', 'DECIMAL(10,2)'),
+            get_grt_column('price', 'samples', 'DOUBLE'),
+            get_grt_column('name', 'samples', 'VARCHAR(45)', characterSetName='ascii', collationName='ascii_bin'),
+            get_grt_column('body', 'samples', 'TEXT'),
+            get_grt_column('created', 'samples', 'DATETIME(6)'),
+            get_grt_column('status', 'samples', "ENUM('new','done')"),
+            get_grt_column('tags', 'samples', "SET('red','green','blue')"),
+            get_grt_column('state', 'samples', "ENUM('on','off')", characterSetName='ascii'),
+        ]
+        schema = get_grt_schema('test', tables=[
+            get_grt_table('samples', columns=columns, indices=[get_grt_index('PRIMARY', columns=columns[:1])])
+        ])
+        with patch.dict(os.environ, {'DB_TYPE': 'SQLite'}):
+            module = generate(schema)
+
+        engine = self.engine('portable')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+        self.assertEquals(
+            [('id', 'INTEGER'), ('flag', 'INTEGER'), ('small', 'INTEGER'), ('big', 'INTEGER'), ('year', 'INTEGER'),
+             ('amount', 'NUMERIC(10, 2)'), ('price', 'DOUBLE'), ('name', 'VARCHAR(45)'), ('body', 'TEXT'),
+             ('created', 'DATETIME'), ('status', 'VARCHAR(4)'), ('tags', 'VARCHAR(14)'), ('state', 'VARCHAR(3)')],
+            [(c['name'], str(c['type'])) for c in sqlalchemy.inspect(engine).get_columns('samples')]
+        )
+
+        table = module.Sample.__table__
+        with engine.begin() as connection:
+            connection.execute(table.insert(), [{'big': 2 ** 62, 'amount': decimal.Decimal('1.50')}])
+            self.assertEquals(
+                [(1, 2 ** 62, decimal.Decimal('1.50'))],
+                list(connection.execute(sqlalchemy.select(table.c.id, table.c.big, table.c.amount)))
+            )
+
+        from sqlalchemy.dialects import postgresql
+        self.assertEquals(
+            ['BIGINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'SMALLINT', 'NUMERIC(10, 2)', 'DOUBLE PRECISION', 'VARCHAR(45)',
+             'TEXT', 'TIMESTAMP WITHOUT TIME ZONE', 'samples_status', 'VARCHAR(14)', 'samples_state'],
+            [c.type.compile(dialect=postgresql.dialect()) for c in table.columns]
+        )
+        ddl = []
+        mock = sqlalchemy.create_mock_engine('postgresql://', lambda sql, *args, **kwargs: ddl.append(
+            str(sql.compile(dialect=mock.dialect)).strip()
+        ))
+        module.DECLARATIVE_BASE.metadata.create_all(mock, checkfirst=False)
+        self.assertEquals([
+            "CREATE TYPE samples_status AS ENUM ('new', 'done')", "CREATE TYPE samples_state AS ENUM ('on', 'off')"
+        ], ddl[:2])
+
+        with patch.dict(os.environ, {'DB_TYPE': 'MySQL'}):
+            module = generate(schema)
+        from sqlalchemy.dialects import mysql
+        self.assertEquals(
+            ["ENUM('new','done')", "SET('red','green','blue')", "ENUM('on','off') CHARACTER SET ascii"],
+            [c.type.compile(dialect=mysql.dialect()) for c in module.Sample.__table__.columns][-3:]
+        )
+
+    def test_server_version(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        version = get_grt_column('row_version', 'customers', 'INT(11)', defaultValue='1', isNotNull=1)
+        name = get_grt_column('name', 'customers', 'VARCHAR(45)')
+        schema = get_grt_schema('test', tables=[get_grt_table(
+            'customers', columns=[id_customer, version, name], indices=[get_grt_index('PRIMARY', columns=[id_customer])],
+            comment='version=row_version;version_generator=server'
+        )])
+        module = generate(schema)
+
+        engine = self.engine('version')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                'CREATE TRIGGER versions AFTER UPDATE OF name ON customers BEGIN '
+                'UPDATE customers SET row_version = row_version + 1 WHERE id = NEW.id; END'
+            )
+
+        session = sqlalchemy.orm.Session(engine)
+        customer = module.Customer(name='A')
+        session.add(customer)
+        session.commit()
+        self.assertEquals(1, customer.row_version)
+        customer.name = 'B'
+        session.commit()
+        self.assertEquals(2, customer.row_version)
+
+        with engine.begin() as connection:
+            connection.exec_driver_sql("UPDATE customers SET name = 'C'")
+        customer.name = 'D'
+        self.assertRaises(sqlalchemy.orm.exc.StaleDataError, session.commit)
+        session.close()
+
+        updated = get_grt_column(
+            'updated', 'customers', 'TIMESTAMP', defaultValue='CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP', isNotNull=1
+        )
+        schema = get_grt_schema('test', tables=[get_grt_table(
+            'customers', columns=[id_customer, updated], indices=[get_grt_index('PRIMARY', columns=[id_customer])],
+            comment='version=updated;version_generator=server'
+        )])
+        with patch.dict(os.environ, {'DB_TYPE': 'MySQL'}):
+            module = generate(schema)
+        ddl = []
+        mock = sqlalchemy.create_mock_engine('mysql://', lambda sql, *args, **kwargs: ddl.append(
+            str(sql.compile(dialect=mock.dialect)).strip()
+        ))
+        module.DECLARATIVE_BASE.metadata.create_all(mock, checkfirst=False)
+        self.assertIn('updated TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP', ddl[0])
+        self.assertIsInstance(module.Customer.__table__.c.updated.server_onupdate, sqlalchemy.FetchedValue)
+
+    def test_routing_session(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+        name = get_grt_column('name', 'localities', 'VARCHAR(45)')
+
+        schema = get_grt_schema('test', tables=[
+            get_grt_table('customers', columns=[id_customer], indices=[get_grt_index('i_c', columns=[id_customer])]),
+            get_grt_table(
+                'localities', columns=[id_locality, name], indices=[get_grt_index('i_l', columns=[id_locality])],
+                comment='bind=replica'
+            ),
+        ])
+        module = generate(schema)
+        self.assertEquals({'bind': 'replica'}, module.Locality.__table__.info)
+
+        engines = {'primary': self.engine('primary'), 'replica': self.engine('replica')}
+        for engine in engines.values():
+            module.DECLARATIVE_BASE.metadata.create_all(engine)
+        with engines['replica'].begin() as connection:
+            connection.execute(module.Locality.__table__.insert(), [{'id': 1, 'name': 'replicated'}])
+
+        session = module.RoutingSession(engines=engines)
+        session.add_all([module.Customer(id=1), module.Locality(id=2, name='written')])
+        session.commit()
+
+        self.assertEquals([1], [c.id for c in session.query(module.Customer)])
+        self.assertEquals(['replicated'], [l.name for l in session.query(module.Locality)])
+        with engines['primary'].connect() as connection:
+            self.assertEquals(
+                [(2, 'written')], list(connection.execute(module.Locality.__table__.select()))
+            )
+        session.close()
+
+    def test_sharding(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        tenant_customer = get_grt_column('tenant_id', 'customers', 'INT(11)', isNotNull=1)
+        id_invoice = get_grt_column('id', 'invoices', 'INT(11)', isNotNull=1, autoIncrement=1)
+        tenant_invoice = get_grt_column('id_tenant', 'invoices', 'INT(11)', isNotNull=1, comment='alias=tenant')
+        id_customer_invoice = get_grt_column('id_customer', 'invoices', 'INT(11)', isNotNull=1)
+
+        schema = get_grt_schema('test', tables=[
+            get_grt_table(
+                'customers', columns=[id_customer, tenant_customer],
+                indices=[get_grt_index('i_c', columns=[id_customer])], comment='shard_key=tenant_id'
+            ),
+            get_grt_table(
+                'invoices', columns=[id_invoice, tenant_invoice, id_customer_invoice],
+                indices=[get_grt_index('i_i', columns=[id_invoice])], comment='shard_key=id_tenant',
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_invoices_customers', columns=[id_customer_invoice], referencedColumns=[id_customer]
+                )]
+            ),
+        ])
+        module = generate(schema)
+        self.assertEquals({module.Customer: 'tenant_id', module.Invoice: 'tenant'}, module.SHARD_KEYS)
+
+        shards = dict([('shard%s' % i, self.engine('shard%s' % i)) for i in range(3)])
+        for engine in shards.values():
+            module.DECLARATIVE_BASE.metadata.create_all(engine)
+
+        session = module.sharded_session(shards)
+        for tenant in range(1, 7):
+            customer = module.Customer(id=tenant, tenant_id=tenant)
+            session.add_all([customer, module.Invoice(id=tenant, tenant=tenant, id_customer=tenant)])
+        session.commit()
+
+        for shard_id, engine in shards.items():
+            with engine.connect() as connection:
+                self.assertEquals(
+                    sorted([t for t in range(1, 7) if module.shard_for(t, sorted(shards)) == shard_id]),
+                    [row.tenant_id for row in connection.execute(module.Customer.__table__.select())]
+                )
+
+        query = session.query(module.Customer).filter(module.Customer.tenant_id == 4)
+        self.assertEquals([4], [c.id for c in query])
+        self.assertEquals([4], [i.tenant for i in query.one().invoices])
+        self.assertEquals(
+            [2, 5], sorted([c.id for c in session.query(module.Customer).filter(module.Customer.tenant_id.in_([2, 5]))])
+        )
+        self.assertEquals(6, len(session.query(module.Customer).all()))
+        session.close()
+
+        chosen = []
+        session = module.sharded_session(shards)
+        execute_chooser = session.execute_chooser
+        session.execute_chooser = lambda context: chosen.append(execute_chooser(context)) or chosen[-1]
+        session.query(module.Invoice).filter(module.Invoice.tenant == 3, module.Invoice.id > 0).all()
+        session.query(module.Invoice).filter(module.Invoice.id == 3).all()
+        self.assertEquals([[module.shard_for(3, sorted(shards))], sorted(shards)], chosen)
+        session.close()
+
+    @unittest.skipIf(aiosqlite is None, 'aiosqlite is required to run the asyncio models')
+    def test_asyncio(self):
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_locality_customer = get_grt_column('id_locality', 'customers', 'INT(11)', isNotNull=1)
+        created = get_grt_column('created', 'customers', 'DATETIME', defaultValue='CURRENT_TIMESTAMP')
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+        name = get_grt_column('name', 'localities', 'VARCHAR(45)')
+
+        schema = get_grt_schema('test', comment='asyncio=True', tables=[
+            get_grt_table(
+                'customers', columns=[id_customer, id_locality_customer, created],
+                indices=[get_grt_index('i_c', columns=[id_customer])],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_customers_localities', columns=[id_locality_customer], referencedColumns=[id_locality]
+                )]
+            ),
+            get_grt_table('localities', columns=[id_locality, name], indices=[get_grt_index('i_l', columns=[id_locality])]),
+        ])
+        module = generate(schema)
+        self.assertEquals({'eager_defaults': True}, module.Customer.__mapper_args__)
+
+        async def run():
+            engine = create_async_engine('sqlite+aiosqlite:///%s' % os.path.join(self.directory, 'async.db'))
+            async with engine.begin() as connection:
+                await connection.run_sync(module.DECLARATIVE_BASE.metadata.create_all)
+
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                customer = module.Customer(id=1, id_locality=1)
+                session.add_all([module.Locality(id=1, name='here'), customer])
+                await session.commit()
+                self.assertIsNotNone(customer.created)
+
+            async with AsyncSession(engine) as session:
+                result = await session.execute(sqlalchemy.select(module.Customer))
+                customer = result.scalars().one()
+                self.assertEquals('here', customer.locality.name)
+                self.assertEquals([1], [c.id for c in await customer.locality.awaitable_attrs.customers])
+
+            await engine.dispose()
+
+        asyncio.run(run())
+
+    def test_cache(self):
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+        name = get_grt_column('name', 'localities', 'VARCHAR(45)')
+
+        schema = get_grt_schema('test', tables=[
+            get_grt_table(
+                'localities', columns=[id_locality, name], indices=[get_grt_index('i_l', columns=[id_locality])],
+                comment='cache=300'
+            ),
+        ])
+        module = generate(schema)
+
+        engine = self.engine('cache')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+        statements = []
+        sqlalchemy.event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        session = sqlalchemy.orm.Session(engine)
+        session.add(module.Locality(id=1, name='here'))
+        session.commit()
+        session.close()
+
+        del statements[:]
+        for _ in range(3):
+            session = sqlalchemy.orm.Session(engine)
+            self.assertEquals('here', module.Locality.get_cached(session, 1).name)
+            session.close()
+        self.assertEquals(1, len([s for s in statements if s.startswith('SELECT')]))
+
+        session = sqlalchemy.orm.Session(engine)
+        locality = module.Locality.get_cached(session, 1)
+        locality.name = 'there'
+        session.commit()
+        session.close()
+
+        session = sqlalchemy.orm.Session(engine)
+        self.assertEquals('there', module.Locality.get_cached(session, 1).name)
+        self.assertIsNone(module.Locality.get_cached(session, 2))
+        session.close()
+
+        cache = module.MemoryCache(maxsize=2)
+        for key in 'abc':
+            cache.set(key, key)
+        self.assertIsNone(cache.get('a'))
+        self.assertEquals('b', cache.get('b', expiration_time=300))
+        self.assertIsNone(cache.get('b', expiration_time=-1))
+
+    def test_instrumentation(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_locality_customer = get_grt_column('id_locality', 'customers', 'INT(11)', isNotNull=1)
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+
+        schema = get_grt_schema('test', tables=[
+            get_grt_table(
+                'customers', columns=[id_customer, id_locality_customer],
+                indices=[get_grt_index('i_c', columns=[id_customer])],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_customers_localities', columns=[id_locality_customer], referencedColumns=[id_locality]
+                )]
+            ),
+            get_grt_table('localities', columns=[id_locality], indices=[get_grt_index('i_l', columns=[id_locality])]),
+        ])
+        plain = generate(schema)
+        self.assertEquals([], [name for name in ('instrument', 'INSTRUMENTED', 'weakref') if hasattr(plain, name)])
+
+        schema.comment = 'instrument=True'
+        module = generate(schema)
+        other = generate(schema)
+        engine = self.engine('instrumentation')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+
+        listeners = module.instrument(engine, sqlalchemy.orm.Session, n_plus_one=3)
+        try:
+            self.assertEquals(5, len(listeners))
+            self.assertEquals([], module.instrument(engine, sqlalchemy.orm.Session))
+            self.assertEquals(0, len(other.INSTRUMENTED))
+            self.assertFalse(sqlalchemy.event.contains(sqlalchemy.engine.Engine, 'before_cursor_execute', (
+                listeners[0][2]
+            )))
+
+            session = sqlalchemy.orm.Session(engine)
+            session.add_all([module.Locality(id=i) for i in range(5)])
+            session.add_all([module.Customer(id=i, id_locality=i) for i in range(5)])
+            session.commit()
+            module.reset_instrumentation()
+
+            for customer in session.query(module.Customer):
+                customer.locality
+            session.commit()
+
+            # a failing statement leaves no start time behind
+            with engine.connect() as connection:
+                self.assertRaises(sqlalchemy.exc.OperationalError, connection.exec_driver_sql, 'SELECT * FROM missing')
+                self.assertEquals([], connection.info['instrumentation_start'])
+            session.close()
+
+            stats = module.instrumentation_stats()
+            self.assertEquals({'Customer': 1, 'Locality': 5}, stats['statements'])
+            self.assertEquals(set(['Customer', 'Locality']), set(stats['time']))
+            self.assertEquals({'Customer.locality': 5}, stats['lazy_loads'])
+            self.assertEquals({'Customer.locality': 1}, stats['n_plus_one'])
+
+            # other engines are not instrumented
+            unrelated = self.engine('unrelated')
+            module.DECLARATIVE_BASE.metadata.create_all(unrelated)
+            with unrelated.connect() as connection:
+                connection.execute(module.Customer.__table__.select()).all()
+            self.assertEquals({'Customer': 1, 'Locality': 5}, module.instrumentation_stats()['statements'])
+        finally:
+            for listener in listeners:
+                sqlalchemy.event.remove(*listener)
+
+    def test_ddl_script(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_locality_customer = get_grt_column('id_locality', 'customers', 'INT(11)', isNotNull=1)
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+        name = get_grt_column('name', 'localities', 'VARCHAR(45)')
+
+        tables = [
+            get_grt_table(
+                'customers', columns=[id_customer, id_locality_customer],
+                indices=[get_grt_index('i_c', columns=[id_customer])],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_customers_localities', columns=[id_locality_customer], referencedColumns=[id_locality]
+                )]
+            ),
+            get_grt_table('localities', columns=[id_locality], indices=[get_grt_index('i_l', columns=[id_locality])]),
+        ]
+        plain = generate(get_grt_schema('test', tables=tables))
+        self.assertEquals([], [name for name in ('ddl_script', 'SCHEMA_FINGERPRINT', 'tempfile', 'create_mock_engine')
+                               if hasattr(plain, name)])
+        module = generate(get_grt_schema('test', tables=tables, comment='ddl_script=True'))
+        self.assertEquals(40, len(module.SCHEMA_FINGERPRINT))
+
+        ddl = module.ddl_script('mysql://')
+        self.assertTrue(ddl.index('CREATE TABLE localities') < ddl.index('CREATE TABLE customers'))
+        self.assertIs(ddl, module.ddl_script('mysql://'))
+        self.assertEquals({('MySQL', 'mysql'): ddl}, module.DDL_SCRIPTS)
+
+        self.assertEquals(ddl, module.ddl_script('mysql://', self.directory))
+        path = os.path.join(self.directory, 'schema_%s_MySQL_mysql.sql' % module.SCHEMA_FINGERPRINT)
+        with open(path) as script:
+            self.assertEquals('-- SCHEMA_FINGERPRINT %s MySQL mysql\n%s' % (
+                module.SCHEMA_FINGERPRINT, ddl
+            ), script.read())
+        self.assertEquals(ddl, module.ddl_script('mysql://', self.directory))
+
+        # a script without the header of this export, or writable by others, is rendered again
+        for header, mode in [('-- planted\n', 0o600), ('-- SCHEMA_FINGERPRINT %s MySQL mysql\n' % (
+            module.SCHEMA_FINGERPRINT
+        ), 0o666)]:
+            with open(path, 'w') as script:
+                script.write(header + 'DROP TABLE customers;\n\n')
+            os.chmod(path, mode)
+            self.assertEquals(ddl, module.ddl_script('mysql://', self.directory))
+
+        engine = self.engine('ddl')
+        module.create_all_fast(engine, self.directory)
+        self.assertEquals(['customers', 'localities'], sorted(sqlalchemy.inspect(engine).get_table_names()))
+        self.assertEquals(
+            ['schema_%s_MySQL_%s.sql' % (module.SCHEMA_FINGERPRINT, dialect) for dialect in ('mysql', 'sqlite')],
+            sorted([f for f in os.listdir(self.directory) if f.endswith('.sql')])
+        )
+
+        # every line of the export is fingerprinted, not only the classes
+        with patch('sqlalchemy_grt.grt.root') as root:
+            schema = get_grt_schema('test', tables=tables, comment='ddl_script=True')
+            root.wb.doc.physicalModels.__getitem__.return_value.catalog.schemata.__getitem__.return_value = schema
+            export = generateExport()
+        self.assertIn("SCHEMA_FINGERPRINT = '%s'" % module.SCHEMA_FINGERPRINT, export)
+        self.assertEquals(module.SCHEMA_FINGERPRINT, schemaFingerprint(export))
+        export[export.index("DECLARATIVE_BASE = declarative_base()")] = "DECLARATIVE_BASE = declarative_base(name='B')"
+        self.assertNotEquals(module.SCHEMA_FINGERPRINT, schemaFingerprint(export))
+
+        tables[1].columns.append(name)
+        name.owner = tables[1]
+        updated = generate(get_grt_schema('test', tables=tables, comment='ddl_script=True'))
+        self.assertNotEquals(module.SCHEMA_FINGERPRINT, updated.SCHEMA_FINGERPRINT)
+
+    def test_bulk_load(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_locality_customer = get_grt_column('id_locality', 'customers', 'INT(11)', isNotNull=1)
+        id_referrer = get_grt_column('id_referrer', 'customers', 'INT(11)', comment='remote_side=id;backrefname=referred')
+        email = get_grt_column('email', 'customers', 'VARCHAR(45)', isNotNull=1)
+        created = get_grt_column('created', 'customers', 'DATETIME')
+        code_locality_customer = get_grt_column('code_locality', 'customers', 'INT(11)')
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+        code = get_grt_column('code', 'localities', 'INT(11)', generated=1, expression='id * 10')
+
+        tables = [
+            get_grt_table(
+                'customers', columns=[id_customer, id_locality_customer, id_referrer, email, created,
+                                      code_locality_customer],
+                indices=[get_grt_index('i_c', columns=[id_customer]), get_grt_index('u_e', 'UNIQUE', columns=[email])],
+                foreignKeys=[
+                    get_grt_foreignKey(
+                        'fk_customers_localities', columns=[id_locality_customer], referencedColumns=[id_locality]
+                    ),
+                    get_grt_foreignKey('fk_customers_referrers', columns=[id_referrer], referencedColumns=[id_customer]),
+                    get_grt_foreignKey('fk_customers_codes', columns=[code_locality_customer], referencedColumns=[code]),
+                ]
+            ),
+            get_grt_table(
+                'localities', columns=[id_locality, code], indices=[get_grt_index('i_l', columns=[id_locality])]
+            ),
+        ]
+        self.assertFalse(hasattr(generate(get_grt_schema('test', tables=tables)), 'FACTORIES'))
+
+        module = generate(get_grt_schema('test', tables=tables, comment='factories=True'))
+        self.assertEquals(
+            ['id', 'id_locality', 'id_referrer', 'email', 'created', 'code_locality'],
+            list(module.FACTORIES[module.Customer])
+        )
+        self.assertEquals(['id'], list(module.FACTORIES[module.Locality]))
+
+        engine = self.engine('load')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+        module.bulk_load(engine, {module.Customer: 25, module.Locality: 4}, batch_size=10)
+
+        session = sqlalchemy.orm.Session(engine)
+        customers = session.query(module.Customer).order_by(module.Customer.id).all()
+        self.assertEquals(25, len(customers))
+        self.assertEquals(25, len(set([customer.email for customer in customers])))
+        self.assertEquals([1, 2, 3, 4, 1], [customer.id_locality for customer in customers[:5]])
+        self.assertEquals([1, 1, 2, 3, 4], [customer.id_referrer for customer in customers[:5]])
+        self.assertEquals(datetime.datetime(2000, 1, 1, 0, 0, 24), customers[-1].created)
+        self.assertEquals(set([None]), set([customer.code_locality for customer in customers]))
+        self.assertEquals(4, session.query(module.Locality).count())
+        session.close()
+
+    def test_indices(self):
+        id_col = get_grt_column('id', 'table_test', 'INT(16)', isNotNull=1, autoIncrement=1)
+        unique_1 = get_grt_column('unique_1', 'table_test', 'INT(16)')
+        unique_2 = get_grt_column('unique_2', 'table_test', 'INT(16)')
+        index_1 = get_grt_column('index_1', 'table_test', 'INT(16)')
+        index_2 = get_grt_column('index_2', 'table_test', 'INT(16)')
+        schema = get_grt_schema('test', tables=[get_grt_table(
+            'table_test', columns=[id_col, unique_1, unique_2, index_1, index_2],
+            indices=[
+                get_grt_index('i_primary', columns=[id_col]),
+                get_grt_index('i_unique_multi', 'UNIQUE', columns=[unique_2, unique_1]),
+                get_grt_index('i_index_multi', 'INDEX', columns=[index_2, index_1]),
+            ]
+        )])
+        table = generate(schema).TableTest.__table__
+
+        self.assertEquals(
+            [('i_index_multi', ['index_2', 'index_1'])], [(i.name, [c.name for c in i.columns]) for i in table.indexes]
+        )
+        self.assertEquals(
+            [('i_unique_multi', ['unique_1', 'unique_2'])],
+            [(c.name, [column.name for column in c.columns]) for c in table.constraints
+             if isinstance(c, sqlalchemy.UniqueConstraint)]
+        )
+        engine = self.engine('indices')
+        table.metadata.create_all(engine)
+        self.assertEquals(
+            [{'name': 'i_index_multi', 'column_names': ['index_2', 'index_1'], 'unique': 0}],
+            [dict([(k, v) for k, v in i.items() if k in ('name', 'column_names', 'unique')])
+             for i in sqlalchemy.inspect(engine).get_indexes('table_test')]
+        )
+
+    def test_foreign_key_graph(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_locality_customer = get_grt_column('id_locality', 'customers', 'INT(11)')
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_mayor_locality = get_grt_column('id_mayor', 'localities', 'INT(11)', comment='backrefname=mayor_of')
+        id_group = get_grt_column('id', 'groups', 'INT(11)', isNotNull=1, autoIncrement=1)
+        id_member = get_grt_column('id_customer', 'customers_groups', 'INT(11)', isNotNull=1)
+        id_group_member = get_grt_column('id_group', 'customers_groups', 'INT(11)', isNotNull=1)
+
+        tables = [
+            get_grt_table(
+                'customers_groups', columns=[id_member, id_group_member],
+                indices=[get_grt_index('i_cg', columns=[id_member, id_group_member])],
+                foreignKeys=[
+                    get_grt_foreignKey('fk_cg_customers', columns=[id_member], referencedColumns=[id_customer]),
+                    get_grt_foreignKey('fk_cg_groups', columns=[id_group_member], referencedColumns=[id_group]),
+                ]
+            ),
+            get_grt_table(
+                'customers', columns=[id_customer, id_locality_customer],
+                indices=[get_grt_index('i_c', columns=[id_customer])],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_customers_localities', columns=[id_locality_customer], referencedColumns=[id_locality]
+                )]
+            ),
+            get_grt_table(
+                'localities', columns=[id_locality, id_mayor_locality],
+                indices=[get_grt_index('i_l', columns=[id_locality])],
+                foreignKeys=[get_grt_foreignKey(
+                    'fk_localities_customers', columns=[id_mayor_locality], referencedColumns=[id_customer]
+                )]
+            ),
+            get_grt_table('groups', columns=[id_group], indices=[get_grt_index('i_g', columns=[id_group])]),
+        ]
+        graph = ForeignKeyGraph(tables)
+        self.assertEquals(['localities', 'customers', 'groups', 'customers_groups'], [t.name for t in graph.order()])
+        self.assertEquals([tables[2].foreignKeys[0]], graph.cycles)
+        self.assertEquals({'customers_groups': ('customers', 'groups')}, graph.associations)
+        self.assertEquals(['customers_groups'], [source for source, _, _ in graph.incoming['groups']])
+
+        module = generate(get_grt_schema('test', tables=tables))
+        self.assertTrue(list(module.Locality.__table__.c.id_mayor.foreign_keys)[0].use_alter)
+        self.assertFalse(hasattr(module.CustomersGroup, 'customer'))
+
+        engine = self.engine('graph')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+        session = sqlalchemy.orm.Session(engine)
+        customer = module.Customer(id=1, groups=[module.Group(id=1), module.Group(id=2)])
+        session.add(customer)
+        session.commit()
+        self.assertEquals(2, session.query(module.CustomersGroup).count())
+        self.assertEquals([1], [c.id for c in session.get(module.Group, 2).customers])
+        session.close()
+
+        tables[0].comment = 'association=False'
+        self.assertEquals({}, ForeignKeyGraph(tables).associations)
+
+        tables[0].comment = ''
+        id_locality_customer.comment = 'fkname=groups'
+        graph = ForeignKeyGraph(tables)
+        self.assertEquals({}, graph.associations)
+        self.assertEquals({'customers_groups': 'customers.groups'}, graph.collisions)
+        self.assertIn(
+            '    # Association ignored, customers.groups already exists', str(TableObject(tables[0], graph)).split('\n')
+        )
+
+    def test_json(self):
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', isNotNull=1, autoIncrement=1)
+        name = get_grt_column('name', 'localities', 'VARCHAR(45)', comment='alias=label')
+        created = get_grt_column('created', 'localities', 'DATETIME', isNotNull=1)
+        amount = get_grt_column('amount', 'localities', 'DECIMAL(10,2)')
+        data = get_grt_column('data', 'localities', 'BLOB')
+
+        schema = get_grt_schema('test', tables=[get_grt_table(
+            'localities', columns=[id_locality, name, created, amount, data],
+            indices=[get_grt_index('i_l', columns=[id_locality])]
+        )], comment='json=True')
+        module = generate(schema)
+
+        locality = module.Locality(
+            id=1, label='Paris', created=datetime.datetime(2020, 1, 2, 3, 4, 5), amount=decimal.Decimal('1.50'),
+            data=b'data'
+        )
+        expected = {'id': 1, 'label': 'Paris', 'created': '2020-01-02T03:04:05', 'amount': '1.50', 'data': 'ZGF0YQ=='}
+        self.assertEquals(expected, locality.to_json_dict())
+        self.assertEquals(expected, json.loads(locality.to_json()))
+
+        engine = self.engine('json')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+        session = sqlalchemy.orm.Session(engine)
+        session.add_all([locality, module.Locality(id=2, created=datetime.datetime(2020, 1, 1))])
+        session.commit()
+
+        with engine.connect() as connection:
+            rows = connection.execute(sqlalchemy.select(module.Locality.__table__).order_by('id')).all()
+        self.assertEquals(expected, module.Locality.json_row(rows[0]))
+        batch = [expected, {'id': 2, 'label': None, 'created': '2020-01-01T00:00:00', 'amount': None, 'data': None}]
+        self.assertEquals(batch, json.loads(module.Locality.json_batch(rows)))
+        self.assertEquals(batch, json.loads(module.Locality.json_batch(session.query(module.Locality).order_by('id'))))
+        session.close()
+
+    def test_upsert(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        email = get_grt_column('email', 'customers', 'VARCHAR(45)', isNotNull=1)
+        name = get_grt_column('name', 'customers', 'VARCHAR(45)')
+        visits = get_grt_column('visits', 'customers', 'INT(11)')
+
+        schema = get_grt_schema('test', tables=[get_grt_table(
+            'customers', columns=[id_customer, email, name, visits], comment='upsert=True', indices=[
+                get_grt_index('PRIMARY', columns=[id_customer]),
+                get_grt_index('u_email', index_type='UNIQUE', columns=[email]),
+            ]
+        )])
+        module = generate(schema)
+
+        engine = self.engine('upsert')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+        rows = [{'email': 'a@b.c', 'name': 'A', 'visits': 1}, {'email': 'd@e.f', 'name': 'D', 'visits': 1}]
+        self.assertEquals(2, module.Customer.upsert(engine, iter(rows), batch_size=1))
+
+        rows = [{'email': 'a@b.c', 'name': 'A2', 'visits': 2}, {'email': 'g@h.i', 'name': 'G', 'visits': 1}]
+        self.assertEquals(2, module.Customer.upsert(engine, rows, update=['visits']))
+        self.assertEquals(1, module.Customer.upsert(engine, [{'email': 'd@e.f'}]))
+
+        table = module.Customer.__table__
+        with engine.connect() as connection:
+            self.assertEquals(
+                [(1, 'a@b.c', 'A', 2), (2, 'd@e.f', 'D', 1), (4, 'g@h.i', 'G', 1)],
+                list(connection.execute(sqlalchemy.select(table).order_by(table.c.id)))
+            )
+
+        # a Connection or a Session runs in the transaction of the caller
+        with engine.connect() as connection:
+            with connection.begin():
+                self.assertEquals(1, module.Customer.upsert(connection, [{'email': 'j@k.l', 'visits': 1}]))
+                self.assertEquals(4, connection.execute(sqlalchemy.select(sqlalchemy.func.count()).select_from(
+                    table
+                )).scalar())
+        session = sqlalchemy.orm.Session(engine)
+        self.assertEquals(1, module.Customer.upsert(session, [{'email': 'a@b.c', 'visits': 10}]))
+        self.assertEquals(10, session.query(module.Customer).filter_by(email='a@b.c').one().visits)
+        session.rollback()
+        self.assertEquals(2, session.query(module.Customer).filter_by(email='a@b.c').one().visits)
+        session.close()
+
+        with self.assertRaises(ValueError) as context:
+            module.Customer.upsert(engine, [{'email': 'm@n.o', 'visits': 1}, {'email': 'p@q.r'}])
+        self.assertIn("row 1 has ['email'] instead of ['email', 'visits']", str(context.exception))
+
+        from sqlalchemy.dialects import mysql
+        bind = MagicMock(spec=['dialect', 'execute'])
+        bind.dialect.name = 'mysql'
+        module.Customer.upsert(bind, rows, update=['visits'])
+        module.Customer.upsert(bind, [{'email': 'd@e.f'}])
+        statements = [str(call[0][0].compile(dialect=mysql.dialect())) for call in bind.execute.call_args_list]
+        self.assertTrue(statements[0].endswith('ON DUPLICATE KEY UPDATE visits = VALUES(visits)'))
+        self.assertTrue(statements[1].startswith('INSERT IGNORE INTO customers'))
+
+    def test_keyset_pagination(self):
+        id_customer = get_grt_column('id', 'customers', 'INT(11)', isNotNull=1, autoIncrement=1)
+        created = get_grt_column('created', 'customers', 'DATETIME', isNotNull=1)
+        amount = get_grt_column('amount', 'customers', 'DECIMAL(10,2)', isNotNull=1)
+
+        schema = get_grt_schema('test', tables=[get_grt_table(
+            'customers', columns=[id_customer, created, amount], comment='paginate=i_created', indices=[
+                get_grt_index('PRIMARY', columns=[id_customer]),
+                get_grt_index('i_created', index_type='INDEX', columns=[created, amount]),
+            ]
+        )])
+        module = generate(schema)
+
+        engine = self.engine('keyset')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(module.Customer.__table__.insert(), [{
+                'created': datetime.datetime(2020, 1, 1) + datetime.timedelta(days=i % 7),
+                'amount': decimal.Decimal(i % 3) / 2
+            } for i in range(250)])
+
+        statements = []
+        sqlalchemy.event.listen(engine, 'before_cursor_execute', lambda c, cursor, statement, parameters, *a: (
+            statements.append((statement, parameters))
+        ))
+        session = sqlalchemy.orm.Session(engine)
+        for method, key in [
+            (module.Customer.page, lambda c: c.id),
+            (module.Customer.page_by_i_created, lambda c: (c.created, c.amount, c.id)),
+        ]:
+            pages, cursor = [], None
+            while cursor is not None or not len(pages):
+                page, cursor = method(session, cursor, size=100)
+                pages.append([key(customer) for customer in page])
+            self.assertEquals([100, 100, 50], [len(page) for page in pages])
+            self.assertEquals(sorted(sum(pages, [])), sum(pages, []))
+
+        with engine.connect() as connection:
+            plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN %s' % statements[-1][0], statements[-1][1]).all()
+        self.assertIn('INDEX i_created (created>?)', plan[0][-1])
+        self.assertNotIn('TEMP B-TREE', ' '.join([row[-1] for row in plan]))
+        session.close()
+
+        amount.isNotNull = 0
+        module = generate(schema)
+        self.assertFalse(hasattr(module.Customer, 'page_by_i_created'))
+        engine = self.engine('keyset_nullable')
+        module.DECLARATIVE_BASE.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(module.Customer.__table__.insert(), [
+                {'created': datetime.datetime(2020, 1, 1), 'amount': None if i == 1 else decimal.Decimal(i)}
+                for i in range(5)
+            ])
+        session = sqlalchemy.orm.Session(engine)
+        page, cursor = module.Customer.page(session, size=2)
+        page, cursor = module.Customer.page(session, cursor, size=2)
+        self.assertEquals([3, 4], [customer.id for customer in page])
+        session.close()
+
+    def test_benchmark(self):
+        results = benchmark.run([12], repeat=1)
+        self.assertEquals(['12'], list(results))
+        self.assertEquals(['configure_mappers', 'import', 'rss', 'sqlalchemy'], sorted(results['12']))
+        self.assertEquals([], benchmark.regressions(results, {'12': dict(results['12'])}))
+        self.assertEquals(
+            ['12 tables, import'], [r.split(':')[0] for r in benchmark.regressions(results, {'12': {'import': 1e-9}})]
+        )
+
+    def test_generation_server(self):
+        id_locality = get_grt_column('id', 'localities', 'INT(11)', comment='', isNotNull=1, autoIncrement=1)
+        schema = SchemaSnapshot(get_grt_schema('test', comment='', tables=[get_grt_table(
+            'localities', columns=[id_locality], comment='', indices=[get_grt_index('i_l', columns=[id_locality])]
+        )]))
+        model = os.path.join(self.directory, 'model.mwb')
+        with open(model, 'w') as model_file:
+            model_file.write('model')
+
+        loader = MagicMock(return_value=schema)
+        server = GenerationServer(('127.0.0.1', 0), loader, os.path.join(self.directory, 'cache'))
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        def request(body):
+            connection = http.client.HTTPConnection(*server.server_address)
+            connection.request('POST', '/generate', json.dumps(body))
+            response = connection.getresponse()
+            return response.status, response.read().decode('utf-8')
+
+        try:
+            exports = []
+            threads = [threading.Thread(target=lambda: exports.append(request({'model': model}))) for _ in range(8)]
+            with patch('sys.stdout') as stdout:
+                for request_thread in threads:
+                    request_thread.start()
+                for request_thread in threads:
+                    request_thread.join()
+            self.assertFalse(stdout.write.called)
+            self.assertEquals(set([(200, '\n'.join(generateExport(schema, verbose=False)))]), set(exports))
+
+            status, export = request({'model': model, 'options': 'asyncio=True'})
+            self.assertEquals(200, status)
+            self.assertIn('DECLARATIVE_BASE = declarative_base(cls=AsyncAttrs)', export)
+            self.assertEquals(400, request({'model': os.path.join(self.directory, 'missing.mwb')})[0])
+            self.assertEquals(1, loader.call_count)
+
+            broken = os.path.join(self.directory, 'broken.mwb')
+            with open(broken, 'w') as model_file:
+                model_file.write('broken')
+            loader.side_effect = RuntimeError('broken model')
+            status, error = request({'model': broken})
+            self.assertEquals(500, status)
+            self.assertIn('RuntimeError: broken model', error)
+            self.assertEquals(200, request({'model': model})[0])
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()